@@ -1,4 +1,20 @@
 # -*- coding: utf-8 -*-
+import logging
+
+from odoo.modules.db import has_trigram
 
 from . import controllers
 from . import models
+
+_logger = logging.getLogger(__name__)
+
+
+def pre_init_hook(env):
+    # pg_trgm antes de que el ORM cree las tablas: los campos index='trigram'
+    # solo se indexan con GIN si la extensión ya existe
+    try:
+        with env.cr.savepoint(flush=False):
+            env.cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except Exception:
+        _logger.warning("No se pudo instalar pg_trgm: la búsqueda aproximada queda desactivada")
+    env.registry.has_trigram = has_trigram(env.cr)
@@ -15,7 +15,7 @@ Long description of module's purpose
     # Check https://github.com/odoo/odoo/blob/15.0/odoo/addons/base/data/ir_module_category_data.xml
     # for the full list
     'category': 'Uncategorized',
-    'version': '0.1',
+    'version': '0.3',
 
     # any module necessary for this one to work correctly
     'depends': ['base'],
@@ -25,10 +25,17 @@ Long description of module's purpose
         'security/ir.model.access.csv',
         'views/autor_views.xml',
         'views/libro_views.xml',
+        'views/ejemplar_views.xml',
         'views/multa_views.xml',
         'views/personal_views.xml',
         'views/prestamo_views.xml',
         'views/usuario_views.xml',
+        'views/reserva_views.xml',
+        'views/recordatorio_views.xml',
+        'views/reporte_views.xml',
+        'views/archivo_views.xml',
+        'views/instrumentacion_views.xml',
+        'views/importacion_views.xml',
         'views/menus.xml',
         'data/sequences.xml',
         'data/cron.xml',
@@ -38,6 +45,7 @@ Long description of module's purpose
     #'demo': [
     #    'demo/demo.xml',
     #],
+    'pre_init_hook': 'pre_init_hook',
     'application': True,
     'license': 'AGPL-3' 
 }
\ No newline at end of file
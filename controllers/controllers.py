@@ -1,22 +1,112 @@
 # -*- coding: utf-8 -*-
-# from odoo import http
+from odoo import http, _
+from odoo.http import request
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
 
+# Caché en memoria de las respuestas públicas del catálogo
+_OPAC_CACHE = OrderedDict()
+_OPAC_LOCK = threading.Lock()
+_OPAC_MAX_ENTRADAS = 5000
+_OPAC_TTL_BUSQUEDA = 60
 
-# class Biblioteca(http.Controller):
-#     @http.route('/biblioteca/biblioteca', auth='public')
-#     def index(self, **kw):
-#         return "Hello, world"
 
-#     @http.route('/biblioteca/biblioteca/objects', auth='public')
-#     def list(self, **kw):
-#         return http.request.render('biblioteca.listing', {
-#             'root': '/biblioteca/biblioteca',
-#             'objects': http.request.env['biblioteca.biblioteca'].search([]),
-#         })
+def _opac_leer(clave):
+    with _OPAC_LOCK:
+        entrada = _OPAC_CACHE.get(clave)
+        if entrada:
+            _OPAC_CACHE.move_to_end(clave)
+        return entrada
 
-#     @http.route('/biblioteca/biblioteca/objects/<model("biblioteca.biblioteca"):obj>', auth='public')
-#     def object(self, obj, **kw):
-#         return http.request.render('biblioteca.object', {
-#             'object': obj
-#         })
 
+def _opac_guardar(clave, entrada):
+    with _OPAC_LOCK:
+        _OPAC_CACHE[clave] = entrada
+        _OPAC_CACHE.move_to_end(clave)
+        while len(_OPAC_CACHE) > _OPAC_MAX_ENTRADAS:
+            _OPAC_CACHE.popitem(last=False)
+
+
+class BibliotecaApi(http.Controller):
+
+    # Préstamos en lote desde los kioscos
+    # {"personal_codigo": "...", "prestamos": [{"cedula": "...", "isbns": ["..."]}]}
+    @http.route('/biblioteca/api/prestar', type='json', auth='user', methods=['POST'])
+    def prestar(self, prestamos=None, personal_codigo=None, **kw):
+        personal = request.env['biblioteca.personal'].search([('codigo', '=', personal_codigo)], limit=1)
+        if not personal:
+            return {'error': _("Personal no encontrado.")}
+        resultados = request.env['biblioteca.prestamo'].prestar_en_lote(prestamos or [], personal.id)
+        return {'resultados': resultados}
+
+    # Devoluciones en lote (buzón de devolución)
+    # {"devoluciones": [{"cedula": "...", "isbns": ["..."]}]}
+    @http.route('/biblioteca/api/devolver', type='json', auth='user', methods=['POST'])
+    def devolver(self, devoluciones=None, **kw):
+        resultados = request.env['biblioteca.prestamo'].devolver_en_lote(devoluciones or [])
+        return {'resultados': resultados}
+
+    # Lectura del código de barras de un ejemplar: ejemplar, libro y préstamo abierto
+    # {"codigo": "..."}
+    @http.route('/biblioteca/api/escanear', type='json', auth='user', methods=['POST'])
+    def escanear(self, codigo=None, **kw):
+        resultado = request.env['biblioteca.ejemplar'].escanear(codigo)
+        if not resultado:
+            return {'error': _("Código de barras no encontrado.")}
+        return resultado
+
+
+class BibliotecaOpac(http.Controller):
+
+    def _responder(self, contenido, etag, max_age):
+        """Respuesta JSON con ETag; 304 si el cliente ya tiene esta versión."""
+        headers = [
+            ('ETag', '"%s"' % etag),
+            ('Cache-Control', 'public, max-age=%s' % max_age),
+        ]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response('', headers=headers, status=304)
+        return request.make_response(contenido, headers=headers + [('Content-Type', 'application/json')])
+
+    # Disponibilidad de un libro por ISBN
+    @http.route('/biblioteca/opac/isbn/<string:isbn>', type='http', auth='public', methods=['GET'])
+    def disponibilidad(self, isbn, **kw):
+        Libro = request.env['biblioteca.libro'].sudo()
+        version = Libro.version_opac(isbn)
+        if not version:
+            return request.make_response(
+                json.dumps({'error': _("Libro no encontrado.")}),
+                headers=[('Content-Type', 'application/json')], status=404)
+
+        # La versión es la fecha de escritura del libro, que cambia al recalcular sus contadores
+        libro_id, write_date = version
+        etag = '%s-%s' % (libro_id, write_date.timestamp())
+        clave = (request.env.cr.dbname, 'isbn', libro_id)
+        entrada = _opac_leer(clave)
+        if not entrada or entrada[0] != etag:
+            contenido = json.dumps(Libro.browse(libro_id).datos_opac()[0])
+            entrada = (etag, contenido)
+            _opac_guardar(clave, entrada)
+        return self._responder(entrada[1], etag, max_age=30)
+
+    # Búsqueda en el catálogo
+    @http.route('/biblioteca/opac/buscar', type='http', auth='public', methods=['GET'])
+    def buscar(self, q='', pagina=1, **kw):
+        try:
+            pagina = max(int(pagina), 1)
+        except ValueError:
+            pagina = 1
+        q = q.strip()[:200]
+        clave = (request.env.cr.dbname, 'buscar', q, pagina)
+        entrada = _opac_leer(clave)
+        if not entrada or entrada[2] < time.monotonic():
+            Libro = request.env['biblioteca.libro'].sudo()
+            libros = Libro.browse(Libro._ids_catalogo(q, limite=20, desplazamiento=(pagina - 1) * 20)) if q else Libro
+            contenido = json.dumps({'q': q, 'pagina': pagina, 'resultados': libros.datos_opac()})
+            etag = hashlib.sha1(contenido.encode()).hexdigest()
+            entrada = (etag, contenido, time.monotonic() + _OPAC_TTL_BUSQUEDA)
+            _opac_guardar(clave, entrada)
+        return self._responder(entrada[1], entrada[0], max_age=_OPAC_TTL_BUSQUEDA)
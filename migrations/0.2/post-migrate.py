@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""``ejemplares`` pasa de ser lo que queda en estantería a ser el total de ejemplares.
+
+Hasta la 0.1 prestar restaba uno a ``ejemplares`` y devolver lo sumaba; ahora
+el préstamo solo mueve los contadores. A cada libro sin ejemplares físicos se
+le suman sus préstamos sin devolver y se recalculan los contadores.
+"""
+import logging
+
+from odoo import api, SUPERUSER_ID
+
+_logger = logging.getLogger(__name__)
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    cr.execute("""
+        UPDATE biblioteca_libro l
+           SET ejemplares = coalesce(l.ejemplares, 0) + abiertos.cantidad
+          FROM (
+            SELECT rel.libro_id, COUNT(*) AS cantidad
+              FROM prestamo_libro_rel rel
+              JOIN biblioteca_prestamo p ON p.id = rel.prestamo_id
+             WHERE p.estado IN ('prestado', 'multa')
+               AND p.fecha_devolucion IS NULL
+          GROUP BY rel.libro_id
+          ) abiertos
+         WHERE abiertos.libro_id = l.id
+           AND NOT EXISTS (SELECT 1 FROM biblioteca_ejemplar e WHERE e.libro_id = l.id)
+     RETURNING l.id
+    """)
+    ids = [fila[0] for fila in cr.fetchall()]
+    _logger.info("biblioteca 0.2: ejemplares corregidos en %s libros con préstamos abiertos", len(ids))
+
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['biblioteca.libro'].search([]).recalcular_contadores()
+    env.flush_all()
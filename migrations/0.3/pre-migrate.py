@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""pg_trgm se instala antes de actualizar los modelos.
+
+Hasta la 0.2 la extensión se creaba en ``init()``, cuando el ORM ya había
+creado los índices de los campos index='trigram' como btree. Se instala la
+extensión y se borran esos índices para que el ORM los cree con GIN.
+"""
+import logging
+
+from odoo.modules.db import has_trigram
+from odoo.modules.registry import Registry
+
+_logger = logging.getLogger(__name__)
+
+INDICES_TRIGRAMA = ['biblioteca_libro__name_index', 'biblioteca_autor__name_index']
+
+
+def migrate(cr, version):
+    if not version:
+        return
+    try:
+        with cr.savepoint(flush=False):
+            cr.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except Exception:
+        _logger.warning("No se pudo instalar pg_trgm: la búsqueda aproximada queda desactivada")
+        return
+    Registry(cr.dbname).has_trigram = has_trigram(cr)
+
+    cr.execute("""
+        SELECT indexname
+          FROM pg_indexes
+         WHERE indexname IN %s
+           AND indexdef NOT LIKE '%%gin_trgm_ops%%'
+    """, [tuple(INDICES_TRIGRAMA)])
+    for (indice,) in cr.fetchall():
+        cr.execute('DROP INDEX "%s"' % indice)
+        _logger.info("biblioteca 0.3: índice %s se vuelve a crear con trigramas", indice)
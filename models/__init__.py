@@ -1,8 +1,17 @@
 # -*- coding: utf-8 -*-
 
+from . import instrumentacion
 from . import autor
 from . import libro
+from . import ejemplar
 from . import usuario
 from . import personal
 from . import prestamo
-from . import multa
\ No newline at end of file
+from . import multa
+from . import openlibrary_cache
+from . import openlibrary_dump
+from . import importacion
+from . import reserva
+from . import recordatorio
+from . import archivo
+from . import reportes
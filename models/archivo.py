@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from datetime import timedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+ESTADOS_PRESTAMO = [
+    ('borrador', 'Borrador'),
+    ('prestado', 'Prestado'),
+    ('devuelto', 'Devuelto'),
+    ('multa', 'Multa'),
+]
+
+
+class BibliotecaPrestamoArchivo(models.Model):
+    _name = 'biblioteca.prestamo.archivo'
+    _description = 'Archivo de préstamos cerrados'
+    _rec_name = 'name'
+    _order = 'fecha_devolucion desc, id desc'
+
+    prestamo_original_id = fields.Integer(string='Id original', readonly=True, index=True)
+    name = fields.Char(string='Referencia del préstamo', readonly=True)
+    fecha_prestamo = fields.Datetime(string='Fecha de préstamo', readonly=True)
+    fecha_max_devolucion = fields.Datetime(string='Fecha máxima de devolución', readonly=True)
+    fecha_devolucion = fields.Datetime(string='Fecha de devolución', readonly=True, index=True)
+    libro_ids = fields.Many2many(
+        'biblioteca.libro',
+        'prestamo_archivo_libro_rel',
+        'prestamo_archivo_id',
+        'libro_id',
+        string='Libros',
+        readonly=True
+    )
+    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', readonly=True, index=True)
+    personal_id = fields.Many2one('biblioteca.personal', string='Personal que presta', readonly=True)
+    estado = fields.Selection(ESTADOS_PRESTAMO, string='Estado', readonly=True)
+    multa_total = fields.Float(string='Total multa', readonly=True)
+    multa_ids = fields.One2many('biblioteca.multa.archivo', 'prestamo_id', string='Multas', readonly=True)
+
+    @api.model
+    def _cron_archivar(self, dias=None, tamano_lote=5000, limite_segundos=1800):
+        """Mueve al archivo los préstamos devueltos hace más de ``dias`` días.
+
+        Solo se archivan los préstamos sin multas por pagar, así el saldo de
+        cada usuario sigue en las tablas activas. Cada lote copia préstamos,
+        libros y multas a las tablas de archivo y los borra de las tablas
+        activas en una sola transacción, que se confirma antes de pasar al
+        siguiente lote. Los reportes leen también las tablas de archivo.
+        """
+        if dias is None:
+            dias = int(self.env['ir.config_parameter'].sudo().get_param('biblioteca.archivo.dias', 730))
+        limite = fields.Datetime.now() - timedelta(days=dias)
+        cr = self.env.cr
+        inicio = time.perf_counter()
+        total = 0
+
+        while time.perf_counter() - inicio < limite_segundos:
+            t_lote = time.perf_counter()
+            self.env.flush_all()
+            cr.execute("""
+                SELECT id
+                  FROM biblioteca_prestamo p
+                 WHERE estado IN ('devuelto', 'multa')
+                   AND fecha_devolucion < %s
+                   AND NOT EXISTS (
+                        SELECT 1 FROM biblioteca_multa m
+                         WHERE m.prestamo_id = p.id AND m.pagada IS NOT TRUE
+                   )
+              ORDER BY id
+                 LIMIT %s
+                   FOR UPDATE SKIP LOCKED
+            """, [limite, tamano_lote])
+            ids = tuple(fila[0] for fila in cr.fetchall())
+            if not ids:
+                break
+
+            cr.execute("""
+                INSERT INTO biblioteca_prestamo_archivo
+                       (prestamo_original_id, name, fecha_prestamo, fecha_max_devolucion, fecha_devolucion,
+                        usuario_id, personal_id, estado, multa_total,
+                        create_uid, create_date, write_uid, write_date)
+                SELECT id, name, fecha_prestamo, fecha_max_devolucion, fecha_devolucion,
+                       usuario_id, personal_id, estado, multa_total,
+                       %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+                  FROM biblioteca_prestamo
+                 WHERE id IN %(ids)s
+            """, {'ids': ids, 'uid': self.env.uid})
+            cr.execute("""
+                INSERT INTO prestamo_archivo_libro_rel (prestamo_archivo_id, libro_id)
+                SELECT a.id, rel.libro_id
+                  FROM prestamo_libro_rel rel
+                  JOIN biblioteca_prestamo_archivo a ON a.prestamo_original_id = rel.prestamo_id
+                 WHERE rel.prestamo_id IN %s
+            """, [ids])
+            cr.execute("""
+                INSERT INTO biblioteca_multa_archivo
+                       (multa_original_id, prestamo_id, usuario_id, tipo, valor, fecha, descripcion, fecha_pago,
+                        create_uid, create_date, write_uid, write_date)
+                SELECT m.id, a.id, m.usuario_id, m.tipo, m.valor, m.fecha, m.descripcion, m.fecha_pago,
+                       %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+                  FROM biblioteca_multa m
+                  JOIN biblioteca_prestamo_archivo a ON a.prestamo_original_id = m.prestamo_id
+                 WHERE m.prestamo_id IN %(ids)s
+            """, {'ids': ids, 'uid': self.env.uid})
+            # El libro de devengos se conserva: pasa a las multas archivadas
+            cr.execute("""
+                UPDATE biblioteca_multa_devengo d
+                   SET multa_archivo_id = ma.id, multa_id = NULL, prestamo_id = NULL
+                  FROM biblioteca_multa_archivo ma
+                  JOIN biblioteca_prestamo_archivo a ON a.id = ma.prestamo_id
+                 WHERE a.prestamo_original_id IN %s
+                   AND d.multa_id = ma.multa_original_id
+            """, [ids])
+
+            cr.execute("SELECT DISTINCT usuario_id FROM biblioteca_prestamo WHERE id IN %s", [ids])
+            usuario_ids = [fila[0] for fila in cr.fetchall()]
+            cr.execute("DELETE FROM biblioteca_multa WHERE prestamo_id IN %s", [ids])
+            # prestamo_libro_rel se borra en cascada
+            cr.execute("DELETE FROM biblioteca_prestamo WHERE id IN %s", [ids])
+
+            # Los resúmenes de cuenta dependen de los préstamos y multas borrados
+            self.env.invalidate_all()
+            self.env['biblioteca.usuarios'].browse(usuario_ids)._compute_resumen_cuenta()
+            self.env.flush_all()
+            cr.commit()
+
+            total += len(ids)
+            duracion = time.perf_counter() - t_lote
+            _logger.info("archivar: lote de %s préstamos en %.3fs (%.0f filas/s)",
+                         len(ids), duracion, len(ids) / duracion if duracion else 0)
+
+        _logger.info("archivar: %s préstamos archivados en %.1fs", total, time.perf_counter() - inicio)
+        return total
+
+
+class BibliotecaMultaArchivo(models.Model):
+    _name = 'biblioteca.multa.archivo'
+    _description = 'Archivo de multas de préstamos cerrados'
+    _order = 'fecha desc, id desc'
+
+    multa_original_id = fields.Integer(string='Id original', readonly=True)
+    prestamo_id = fields.Many2one('biblioteca.prestamo.archivo', string='Préstamo archivado',
+                                  readonly=True, index=True, ondelete='cascade')
+    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', readonly=True, index=True)
+    tipo = fields.Selection(lambda self: self.env['biblioteca.multa'].TIPO_MULTA,
+                            string='Tipo de multa', readonly=True)
+    valor = fields.Float(string='Valor de la multa', readonly=True)
+    fecha = fields.Datetime(string='Fecha de multa', readonly=True)
+    descripcion = fields.Text(string='Descripción', readonly=True)
+    fecha_pago = fields.Datetime(string='Fecha de pago', readonly=True)
+    devengo_ids = fields.One2many('biblioteca.multa.devengo', 'multa_archivo_id', string='Devengos', readonly=True)
@@ -1,24 +1,122 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api
-import requests
+from psycopg2 import IntegrityError
+import unicodedata
+
+from .instrumentacion import instrumentar
+
+
+def normalizar_nombre(nombre):
+    """Nombre en minúsculas, sin tildes y con espacios simples."""
+    if not nombre:
+        return False
+    nombre = unicodedata.normalize('NFKD', nombre)
+    nombre = ''.join(c for c in nombre if not unicodedata.combining(c))
+    return ' '.join(nombre.lower().split())
+
 
 class BibliotecaAutor(models.Model):
     _name = 'biblioteca.autor'
     _description = 'Registro de autores'
     _rec_name = 'name'
 
-    name = fields.Char(string='Nombre', required=True)
+    name = fields.Char(string='Nombre', required=True, index='trigram')
     nacionalidad = fields.Char(string='Nacionalidad')
     fecha_nacimiento = fields.Date(string='Fecha de nacimiento')
     biografia = fields.Text(string='Biografía')
+    openlibrary_key = fields.Char(string='Open Library Key', index='btree_not_null', copy=False)
+    nombre_normalizado = fields.Char(compute='_compute_nombre_normalizado', store=True, index=True)
+
+    _sql_constraints = [
+        ('openlibrary_key_unique', 'unique(openlibrary_key)', 'El autor de Open Library ya existe.'),
+    ]
+
+    @api.depends('name')
+    def _compute_nombre_normalizado(self):
+        for record in self:
+            record.nombre_normalizado = normalizar_nombre(record.name)
+
+    @api.model
+    def resolve_or_create(self, autores, _reintento=True):
+        """Resuelve una lista de autores con una consulta y un solo create.
+
+        Cada elemento puede ser un nombre, una clave de Open Library
+        ('/authors/OL...A') o una tupla (clave, nombre). Devuelve
+        {elemento: id}; las claves sin nombre que no existan se omiten.
+        """
+        pedidos = {}
+        for autor in autores:
+            if isinstance(autor, tuple):
+                key, nombre = autor
+            elif autor and autor.startswith('/authors/'):
+                key, nombre = autor, None
+            else:
+                key, nombre = None, autor
+            if key or nombre:
+                pedidos[autor] = (key, nombre, normalizar_nombre(nombre))
+        if not pedidos:
+            return {}
+
+        keys = {key for key, _nombre, _norma in pedidos.values() if key}
+        normas = {norma for _key, _nombre, norma in pedidos.values() if norma}
+        por_key = {}
+        por_norma = {}
+        for autor in self.search(['|', ('openlibrary_key', 'in', list(keys)),
+                                  ('nombre_normalizado', 'in', list(normas))], order='id'):
+            if autor.openlibrary_key:
+                por_key[autor.openlibrary_key] = autor
+            por_norma.setdefault(autor.nombre_normalizado, autor)
+
+        resultado = {}
+        nuevos = {}
+        normas_nuevas = set()
+        # Primero los que traen clave, para no duplicarlos al resolver por nombre
+        orden = sorted(pedidos.items(), key=lambda item: not item[1][0])
+        for pedido, (key, nombre, norma) in orden:
+            autor = por_key.get(key) if key else None
+            if not autor and norma:
+                autor = por_norma.get(norma)
+                if autor and key and autor.openlibrary_key not in (False, key):
+                    # Homónimo de otro autor de Open Library
+                    autor = None
+                # Autor creado a mano: se le asigna la clave encontrada
+                if autor and key and not autor.openlibrary_key:
+                    autor.openlibrary_key = key
+                    por_key[key] = autor
+            if autor:
+                resultado[pedido] = autor.id
+            elif key and nombre:
+                nuevos.setdefault(key, {'name': nombre, 'openlibrary_key': key})
+                normas_nuevas.add(norma)
+            elif nombre and norma not in normas_nuevas:
+                nuevos[norma] = {'name': nombre, 'openlibrary_key': False}
+                normas_nuevas.add(norma)
+
+        if nuevos:
+            try:
+                with self.env.cr.savepoint():
+                    creados = self.create(list(nuevos.values()))
+            except IntegrityError:
+                # Otro proceso creó alguno de estos autores al mismo tiempo
+                if not _reintento:
+                    raise
+                return self.resolve_or_create(list(pedidos), _reintento=False)
+            for autor in creados:
+                if autor.openlibrary_key:
+                    por_key[autor.openlibrary_key] = autor
+                por_norma.setdefault(autor.nombre_normalizado, autor)
+            for pedido, (key, nombre, norma) in pedidos.items():
+                if pedido not in resultado and nombre:
+                    resultado[pedido] = (por_key.get(key) if key else por_norma[norma]).id
+
+        return resultado
 
     @api.model
     def rellenar_desde_openlibrary(self, autor_name):
         """Obtiene información de un autor desde Open Library"""
-        url = f"https://openlibrary.org/search/authors.json?q={autor_name}"
-        res = requests.get(url)
-        if res.status_code == 200:
-            data = res.json()
+        data = self.env['biblioteca.openlibrary.cache'].obtener(
+            '/search/authors.json', {'q': autor_name})
+        if data:
             if data['numFound'] > 0:
                 autor_data = data['docs'][0]
                 return {
@@ -29,8 +127,12 @@ class BibliotecaAutor(models.Model):
                 }
         return {}
 
+    @instrumentar('action_rellenar_openlibrary')
     def action_rellenar_openlibrary(self):
         """Botón que rellena el registro desde Open Library"""
+        Cache = self.env['biblioteca.openlibrary.cache']
         for record in self:
-            info = self.rellenar_desde_openlibrary(record.name)
+            info = self.with_context(
+                openlibrary_plazo=Cache.plazo_consulta()
+            ).rellenar_desde_openlibrary(record.name)
             record.update(info)
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""Validación de cédulas ecuatorianas compartida por usuarios, personal e importaciones."""
+from functools import lru_cache
+
+# Aporte de cada dígito según su posición: coeficientes 2,1,2,1,... restando 9
+# cuando el producto es de dos cifras. Se precalcula para no hacer int() por dígito.
+_COEFICIENTES = (2, 1, 2, 1, 2, 1, 2, 1, 2)
+_A0, _A1, _A2, _A3, _A4, _A5, _A6, _A7, _A8 = (
+    {str(d): d * c - 9 if d * c >= 10 else d * c for d in range(10)}
+    for c in _COEFICIENTES
+)
+_PROVINCIAS = frozenset('%02d' % provincia for provincia in range(1, 25))
+_DIGITOS = {str(d): d for d in range(10)}
+
+
+def _validar(cedula):
+    if not cedula or len(cedula) != 10 or not (cedula.isascii() and cedula.isdigit()):
+        return False
+    # Provincia 01-24 y tercer dígito menor a 6
+    if cedula[:2] not in _PROVINCIAS or cedula[2] > '5':
+        return False
+    total = (_A0[cedula[0]] + _A1[cedula[1]] + _A2[cedula[2]] + _A3[cedula[3]] + _A4[cedula[4]]
+             + _A5[cedula[5]] + _A6[cedula[6]] + _A7[cedula[7]] + _A8[cedula[8]])
+    return _DIGITOS[cedula[9]] == -total % 10
+
+
+@lru_cache(maxsize=65536)
+def validar_cedula(cedula):
+    """Valida cédula ecuatoriana estándar de 10 dígitos."""
+    return _validar(cedula)
+
+
+def validar_cedulas(cedulas):
+    """Valida una lista de cédulas; cada valor distinto pasa una sola vez por la caché compartida."""
+    resultados = {cedula: validar_cedula(cedula) for cedula in set(cedulas)}
+    return [resultados[cedula] for cedula in cedulas]
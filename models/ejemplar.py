@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+from psycopg2.errors import SerializationFailure
+
+
+class BibliotecaEjemplar(models.Model):
+    _name = 'biblioteca.ejemplar'
+    _description = 'Ejemplares físicos de los libros'
+    _rec_name = 'codigo_barras'
+    _order = 'libro_id, codigo_barras'
+
+    codigo_barras = fields.Char(
+        string='Código de barras',
+        required=True,
+        copy=False,
+        default=lambda self: self.env['ir.sequence'].next_by_code('biblioteca.ejemplar')
+    )
+    libro_id = fields.Many2one('biblioteca.libro', string='Libro', required=True, index=True, ondelete='cascade')
+    estado = fields.Selection([
+        ('disponible', 'Disponible'),
+        ('prestado', 'Prestado'),
+        ('baja', 'De baja'),
+        ('perdido', 'Perdido'),
+    ], string='Estado', default='disponible', required=True, index=True)
+    prestamo_id = fields.Many2one('biblioteca.prestamo', string='Préstamo actual', readonly=True,
+                                  index='btree_not_null')
+    ubicacion = fields.Char(string='Ubicación física')
+
+    # El índice único también sirve para la lectura del escáner
+    _sql_constraints = [
+        ('codigo_barras_unique', 'unique(codigo_barras)', 'El código de barras ya existe.'),
+    ]
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        ejemplares = super().create(vals_list)
+        # Los ejemplares nuevos atienden primero a las reservas en espera
+        self.env['biblioteca.reserva']._asignar_reservas(
+            ejemplares.filtered(lambda e: e.estado == 'disponible').libro_id)
+        return ejemplares
+
+    def write(self, vals):
+        res = super().write(vals)
+        if vals.get('estado') == 'disponible':
+            self.env['biblioteca.reserva']._asignar_reservas(self.libro_id)
+        return res
+
+    @api.model
+    def escanear(self, codigo):
+        """Ejemplar, libro y préstamo abierto de un código de barras, con una sola consulta.
+
+        Devuelve un diccionario o False si el código no existe.
+        """
+        self.flush_model(['codigo_barras', 'estado', 'libro_id', 'prestamo_id'])
+        self.env['biblioteca.prestamo'].flush_model(['name', 'usuario_id', 'estado', 'fecha_max_devolucion'])
+        self.env.cr.execute("""
+            SELECT e.id, e.codigo_barras, e.estado,
+                   l.id, l.name, l.isbn,
+                   p.id, p.name, p.estado, p.usuario_id, p.fecha_max_devolucion
+              FROM biblioteca_ejemplar e
+              JOIN biblioteca_libro l ON l.id = e.libro_id
+         LEFT JOIN biblioteca_prestamo p ON p.id = e.prestamo_id
+             WHERE e.codigo_barras = %s
+        """, [(codigo or '').strip()])
+        fila = self.env.cr.fetchone()
+        if not fila:
+            return False
+        resultado = {
+            'ejemplar_id': fila[0],
+            'codigo_barras': fila[1],
+            'estado': fila[2],
+            'libro_id': fila[3],
+            'libro': fila[4],
+            'isbn': fila[5],
+            'prestamo': False,
+        }
+        if fila[6]:
+            resultado['prestamo'] = {
+                'id': fila[6],
+                'name': fila[7],
+                'estado': fila[8],
+                'usuario_id': fila[9],
+                'fecha_max_devolucion': fields.Datetime.to_string(fila[10]),
+            }
+        return resultado
+
+    @api.model
+    def _tomar_disponibles(self, libros):
+        """Bloquea y devuelve un ejemplar disponible de cada libro.
+
+        Los ejemplares bloqueados por otra caja se saltan, así dos préstamos
+        simultáneos nunca se llevan el mismo ejemplar. Si otra caja ya
+        confirmó el préstamo de un ejemplar después de la instantánea de esta
+        transacción (REPEATABLE READ), se falla enseguida.
+        """
+        if not libros:
+            return self.browse()
+        self.flush_model(['libro_id', 'estado'])
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute("""
+                    SELECT e.id
+                      FROM unnest(%s::int[]) AS l(id)
+                CROSS JOIN LATERAL (
+                        SELECT id
+                          FROM biblioteca_ejemplar
+                         WHERE libro_id = l.id
+                           AND estado = 'disponible'
+                      ORDER BY id
+                         LIMIT 1
+                           FOR UPDATE SKIP LOCKED
+                      ) e
+                """, [libros.ids])
+                # Leer antes de liberar el savepoint, que reutiliza el cursor
+                ids = [fila[0] for fila in self.env.cr.fetchall()]
+        except SerializationFailure:
+            raise ValidationError(_("Los ejemplares se están prestando en otra caja, intente de nuevo."))
+        return self.browse(ids)
+
+    def _verificar_disponibles(self):
+        ocupados = self.filtered(lambda e: e.estado != 'disponible')
+        if ocupados:
+            raise ValidationError(
+                _("Los ejemplares no están disponibles: %s") % ", ".join(ocupados.mapped('codigo_barras'))
+            )
@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from itertools import islice
+import base64
+import csv
+import io
+import json
+import logging
+import time
+
+from .cedula import validar_cedulas
+from .libro import normalizar_isbn
+
+_logger = logging.getLogger(__name__)
+
+# Configuración de cada tipo de importación
+TIPOS = {
+    'libro': {
+        'modelo': 'biblioteca.libro',
+        'clave': 'isbn',
+        'requeridos': ['isbn'],
+        'campos': ['name', 'isbn', 'autor', 'categoria', 'ubicacion', 'ejemplares',
+                   'description', 'editorial', 'paginas', 'fecha_publicacion'],
+    },
+    'usuarios': {
+        'modelo': 'biblioteca.usuarios',
+        'clave': 'cedula',
+        'requeridos': ['nombre_completo', 'cedula'],
+        'campos': ['nombre_completo', 'cedula', 'correo', 'telefono', 'direccion'],
+    },
+    'personal': {
+        'modelo': 'biblioteca.personal',
+        'clave': 'codigo',
+        'requeridos': ['nombre', 'apellido', 'codigo', 'cedula'],
+        'campos': ['nombre', 'apellido', 'codigo', 'cedula', 'correo', 'telefono', 'direccion'],
+    },
+}
+
+
+def leer_filas(archivo, formato):
+    """Genera (número de línea, fila) de un archivo CSV o JSONL abierto en texto."""
+    if formato == 'csv':
+        lector = csv.DictReader(archivo)
+        for fila in lector:
+            yield lector.line_num, fila
+    else:
+        for numero, linea in enumerate(archivo, 1):
+            if linea.strip():
+                try:
+                    yield numero, json.loads(linea)
+                except ValueError:
+                    yield numero, None
+
+
+def en_lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+class BibliotecaImportacion(models.TransientModel):
+    _name = 'biblioteca.importacion'
+    _description = 'Importación masiva de libros, usuarios y personal'
+
+    tipo = fields.Selection([
+        ('libro', 'Libros'),
+        ('usuarios', 'Usuarios'),
+        ('personal', 'Personal'),
+    ], string='Importar', required=True, default='libro')
+    archivo = fields.Binary(string='Archivo (CSV o JSONL)', required=True)
+    nombre_archivo = fields.Char(string='Nombre del archivo')
+    tamano_lote = fields.Integer(string='Tamaño de lote', default=2000)
+
+    creados = fields.Integer(string='Creados', readonly=True)
+    actualizados = fields.Integer(string='Actualizados', readonly=True)
+    rechazados = fields.Integer(string='Rechazados', readonly=True)
+    reporte = fields.Text(string='Filas rechazadas', readonly=True)
+
+    def action_importar(self):
+        self.ensure_one()
+        formato = 'jsonl' if (self.nombre_archivo or '').lower().endswith(('.jsonl', '.json')) else 'csv'
+        with io.TextIOWrapper(self._abrir_archivo(), encoding='utf-8-sig', newline='') as archivo:
+            resumen = self.importar_archivo(self.tipo, archivo, formato, self.tamano_lote)
+        self.write({
+            'creados': resumen['creados'],
+            'actualizados': resumen['actualizados'],
+            'rechazados': len(resumen['rechazos']),
+            'reporte': '\n'.join('Línea %s: %s' % rechazo for rechazo in resumen['rechazos'][:1000]),
+            'archivo': False,
+        })
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def _abrir_archivo(self):
+        """Archivo subido, abierto en binario desde el filestore sin decodificarlo en memoria."""
+        adjunto = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_field', '=', 'archivo'),
+            ('res_id', '=', self.id),
+        ], limit=1)
+        if adjunto.store_fname:
+            return open(adjunto._full_path(adjunto.store_fname), 'rb')
+        # Adjunto guardado en la base (ir_attachment.location = db): no hay archivo que recorrer
+        return io.BytesIO(adjunto.raw or base64.b64decode(self.archivo or b''))
+
+    @api.model
+    def _importar_ruta(self, tipo, ruta, tamano_lote=2000):
+        """Importa un archivo del servidor (solo desde odoo shell o un cron, no por RPC)."""
+        formato = 'jsonl' if ruta.lower().endswith(('.jsonl', '.json')) else 'csv'
+        with open(ruta, encoding='utf-8-sig', newline='') as archivo:
+            return self.importar_archivo(tipo, archivo, formato, tamano_lote)
+
+    @api.model
+    def importar_archivo(self, tipo, archivo, formato='csv', tamano_lote=2000):
+        """Importa un archivo por lotes, sin cargarlo entero en memoria.
+
+        Las filas se validan antes de tocar el ORM y cada lote hace una
+        búsqueda de los registros existentes por su clave (ISBN, cédula o
+        código), un create para los nuevos y un write por cada existente.
+        Devuelve {'creados', 'actualizados', 'rechazos': [(línea, motivo)]}.
+        """
+        if tipo not in TIPOS:
+            raise UserError(_("Tipo de importación no válido: %s") % tipo)
+        config = TIPOS[tipo]
+        resumen = {'creados': 0, 'actualizados': 0, 'rechazos': []}
+        inicio = time.perf_counter()
+        total = 0
+
+        for lote in en_lotes(leer_filas(archivo, formato), tamano_lote):
+            validas = self._validar_lote(tipo, lote, resumen['rechazos'])
+            self._guardar_lote(tipo, validas, resumen)
+            self.env.flush_all()
+            self.env.invalidate_all()
+
+            total += len(lote)
+            duracion = time.perf_counter() - inicio
+            _logger.info(
+                "Importación %s (%s): %s filas, %s creadas, %s actualizadas, %s rechazadas (%.0f filas/min)",
+                tipo, config['modelo'], total, resumen['creados'], resumen['actualizados'],
+                len(resumen['rechazos']), total / duracion * 60 if duracion else 0,
+            )
+        return resumen
+
+    def _validar_lote(self, tipo, lote, rechazos):
+        """Valida un lote completo y devuelve {clave: (línea, vals)}."""
+        config = TIPOS[tipo]
+        Modelo = self.env[config['modelo']]
+        validas = {}
+        candidatas = []
+        for numero, fila in lote:
+            if not isinstance(fila, dict):
+                rechazos.append((numero, _("Fila mal formada.")))
+                continue
+            vals = {}
+            for campo in config['campos']:
+                valor = fila.get(campo)
+                if isinstance(valor, str):
+                    valor = valor.strip()
+                if valor in (None, ''):
+                    continue
+                tipo_campo = Modelo._fields[campo].type
+                try:
+                    if tipo_campo == 'integer':
+                        valor = int(valor)
+                    elif tipo_campo == 'float':
+                        valor = float(valor)
+                    elif tipo_campo != 'many2one':
+                        valor = str(valor)
+                except ValueError:
+                    rechazos.append((numero, _("Valor no válido en %s: %s") % (campo, valor)))
+                    break
+                vals[campo] = valor
+            else:
+                faltantes = [campo for campo in config['requeridos'] if campo not in vals]
+                if faltantes:
+                    rechazos.append((numero, _("Faltan campos: %s") % ", ".join(faltantes)))
+                    continue
+                if tipo == 'libro':
+                    vals['isbn'] = normalizar_isbn(vals['isbn'])
+                candidatas.append((numero, vals))
+
+        # Validación de cédulas de todo el lote antes del ORM
+        if 'cedula' in config['campos']:
+            correctas = validar_cedulas([vals['cedula'] for _numero, vals in candidatas])
+            filtradas = []
+            for (numero, vals), correcta in zip(candidatas, correctas):
+                if correcta:
+                    filtradas.append((numero, vals))
+                else:
+                    rechazos.append((numero, _("La cédula ingresada no es válida.")))
+            candidatas = filtradas
+
+        # Si la clave se repite en el archivo, gana la última fila
+        for numero, vals in candidatas:
+            validas[vals[config['clave']]] = (numero, vals)
+        return validas
+
+    def _guardar_lote(self, tipo, validas, resumen):
+        if not validas:
+            return
+        config = TIPOS[tipo]
+        Modelo = self.env[config['modelo']]
+        clave = config['clave']
+
+        if tipo == 'libro':
+            existentes = Modelo.buscar_por_isbns(validas)
+            # El autor llega como nombre
+            nombres = {vals['autor'] for _numero, vals in validas.values() if vals.get('autor')}
+            autor_ids = self.env['biblioteca.autor'].resolve_or_create(nombres)
+            for valor_clave, (numero, vals) in list(validas.items()):
+                if not vals.get('autor'):
+                    continue
+                if vals['autor'] not in autor_ids:
+                    # Clave de Open Library que no existe y no trae nombre
+                    resumen['rechazos'].append((numero, _("Autor no encontrado: %s") % vals['autor']))
+                    del validas[valor_clave]
+                    continue
+                vals['autor'] = autor_ids[vals['autor']]
+        else:
+            existentes = {registro[clave]: registro
+                          for registro in Modelo.search([(clave, 'in', list(validas))])}
+
+        for valor_clave, (numero, vals) in validas.items():
+            if valor_clave in existentes:
+                # Una fila que falla (p. ej. una cédula repetida) no aborta la importación
+                try:
+                    with self.env.cr.savepoint():
+                        existentes[valor_clave].write(vals)
+                    resumen['actualizados'] += 1
+                except Exception as error:
+                    resumen['rechazos'].append((numero, str(error)))
+
+        nuevos = [(numero, vals) for valor_clave, (numero, vals) in validas.items()
+                  if valor_clave not in existentes]
+        if not nuevos:
+            return
+        try:
+            with self.env.cr.savepoint():
+                Modelo.create([vals for _numero, vals in nuevos])
+            resumen['creados'] += len(nuevos)
+        except Exception:
+            # Algún registro del lote falla: se crean uno a uno para aislarlo
+            for numero, vals in nuevos:
+                try:
+                    with self.env.cr.savepoint():
+                        Modelo.create(vals)
+                    resumen['creados'] += 1
+                except Exception as error:
+                    resumen['rechazos'].append((numero, str(error)))
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from odoo.exceptions import AccessError
+from odoo.tools.sql import drop_view_if_exists
+from datetime import timedelta
+import functools
+import logging
+import threading
+import time
+
+_logger = logging.getLogger(__name__)
+
+PARAMETRO_ACTIVA = 'biblioteca.instrumentacion.activa'
+
+# Mediciones en curso del hilo (pueden anidarse: devolver_en_lote -> action_devolver)
+_local = threading.local()
+
+
+def sumar_http(segundos):
+    """Suma tiempo de peticiones HTTP salientes a las mediciones en curso."""
+    for medicion in getattr(_local, 'pila', ()):
+        medicion['http'] += segundos
+
+
+def instrumentar(accion):
+    """Registra tiempo, consultas SQL y tiempo HTTP de cada llamada al método.
+
+    Solo mide si el parámetro ``biblioteca.instrumentacion.activa`` vale
+    'True'; si no, el coste es una lectura del parámetro (en caché). Las
+    llamadas que terminan con excepción no se registran.
+    """
+    def decorador(metodo):
+        @functools.wraps(metodo)
+        def envoltura(self, *args, **kwargs):
+            if self.env['ir.config_parameter'].sudo().get_param(PARAMETRO_ACTIVA) != 'True':
+                return metodo(self, *args, **kwargs)
+
+            cr = self.env.cr
+            pila = _local.__dict__.setdefault('pila', [])
+            medicion = {'http': 0.0}
+            pila.append(medicion)
+            consultas_antes = cr.sql_log_count
+            inicio = time.perf_counter()
+            try:
+                resultado = metodo(self, *args, **kwargs)
+                # Lo que el método deja pendiente en el ORM también es suyo
+                self.env.flush_all()
+            finally:
+                pila.pop()
+            duracion = time.perf_counter() - inicio
+            self.env['biblioteca.instrumentacion']._registrar(
+                accion, self._name, len(self), duracion,
+                cr.sql_log_count - consultas_antes, medicion['http'],
+            )
+            return resultado
+        return envoltura
+    return decorador
+
+
+class BibliotecaInstrumentacion(models.Model):
+    _name = 'biblioteca.instrumentacion'
+    _description = 'Mediciones de las acciones de la biblioteca'
+    _order = 'id desc'
+    _log_access = False
+
+    fecha = fields.Datetime(string='Fecha', readonly=True, index=True)
+    accion = fields.Char(string='Acción', readonly=True, index=True)
+    modelo = fields.Char(string='Modelo', readonly=True)
+    usuario_id = fields.Many2one('res.users', string='Usuario', readonly=True)
+    registros = fields.Integer(string='Registros', readonly=True)
+    duracion_ms = fields.Float(string='Duración (ms)', readonly=True, aggregator='avg')
+    consultas = fields.Integer(string='Consultas SQL', readonly=True, aggregator='avg')
+    http_ms = fields.Float(string='HTTP (ms)', readonly=True, aggregator='avg')
+
+    @api.model
+    def _registrar(self, accion, modelo, registros, duracion, consultas, http):
+        # INSERT directo: sin pasar por el ORM ni sumar consultas a la acción medida
+        self.env.cr.execute("""
+            INSERT INTO biblioteca_instrumentacion
+                   (fecha, accion, modelo, usuario_id, registros, duracion_ms, consultas, http_ms)
+            VALUES (now() AT TIME ZONE 'UTC', %s, %s, %s, %s, %s, %s, %s)
+        """, [accion, modelo, self.env.uid, registros, duracion * 1000, consultas, http * 1000])
+
+    def _comprobar_administrador(self):
+        # Los métodos públicos se pueden llamar por RPC, no solo desde el menú
+        if not self.env.su and not self.env.user.has_group('base.group_system'):
+            raise AccessError(_("Solo los administradores pueden activar o desactivar la instrumentación."))
+
+    @api.model
+    def action_activar(self):
+        self._comprobar_administrador()
+        self.env['ir.config_parameter'].sudo().set_param(PARAMETRO_ACTIVA, 'True')
+
+    @api.model
+    def action_desactivar(self):
+        self._comprobar_administrador()
+        self.env['ir.config_parameter'].sudo().set_param(PARAMETRO_ACTIVA, 'False')
+
+    @api.model
+    def purgar(self):
+        """Borra las mediciones más antiguas que biblioteca.instrumentacion.dias (30 por defecto)."""
+        dias = int(self.env['ir.config_parameter'].sudo().get_param('biblioteca.instrumentacion.dias', 30))
+        self.env.cr.execute(
+            "DELETE FROM biblioteca_instrumentacion WHERE fecha < %s",
+            [fields.Datetime.now() - timedelta(days=dias)],
+        )
+        _logger.info("Instrumentación: %s mediciones purgadas", self.env.cr.rowcount)
+        self.invalidate_model()
+
+
+class BibliotecaInstrumentacionResumen(models.Model):
+    _name = 'biblioteca.instrumentacion.resumen'
+    _description = 'Percentiles por acción'
+    _auto = False
+    _order = 'accion'
+
+    accion = fields.Char(string='Acción', readonly=True)
+    llamadas = fields.Integer(string='Llamadas', readonly=True)
+    p50_ms = fields.Float(string='p50 (ms)', readonly=True)
+    p95_ms = fields.Float(string='p95 (ms)', readonly=True)
+    p99_ms = fields.Float(string='p99 (ms)', readonly=True)
+    max_ms = fields.Float(string='Máximo (ms)', readonly=True)
+    consultas_p50 = fields.Float(string='Consultas p50', readonly=True)
+    consultas_p95 = fields.Float(string='Consultas p95', readonly=True)
+    http_p95_ms = fields.Float(string='HTTP p95 (ms)', readonly=True)
+    registros_promedio = fields.Float(string='Registros por llamada', readonly=True)
+
+    def init(self):
+        drop_view_if_exists(self.env.cr, self._table)
+        # Id derivado de la acción (52 bits de su md5): no cambia al aparecer
+        # acciones nuevas ni al purgar mediciones antiguas
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW biblioteca_instrumentacion_resumen AS (
+                SELECT ('x' || substr(md5(accion), 1, 13))::bit(52)::bigint AS id,
+                       accion,
+                       COUNT(*) AS llamadas,
+                       percentile_cont(0.50) WITHIN GROUP (ORDER BY duracion_ms) AS p50_ms,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY duracion_ms) AS p95_ms,
+                       percentile_cont(0.99) WITHIN GROUP (ORDER BY duracion_ms) AS p99_ms,
+                       MAX(duracion_ms) AS max_ms,
+                       percentile_cont(0.50) WITHIN GROUP (ORDER BY consultas) AS consultas_p50,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY consultas) AS consultas_p95,
+                       percentile_cont(0.95) WITHIN GROUP (ORDER BY http_ms) AS http_p95_ms,
+                       AVG(registros) AS registros_promedio
+                  FROM biblioteca_instrumentacion
+              GROUP BY accion
+            )
+        """)
@@ -1,7 +1,28 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
-import requests
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools.sql import index_exists
+from psycopg2.errors import LockNotAvailable, SerializationFailure
+import logging
+
+from .instrumentacion import instrumentar
+
+_logger = logging.getLogger(__name__)
+
+
+def normalizar_isbn(isbn):
+    return (isbn or '').replace('-', '').replace(' ', '').upper()
+
+
+# Documento de búsqueda de texto completo (español + inglés). El título pesa
+# más que el resto. La misma expresión se usa en el índice y en las consultas.
+TSVECTOR_LIBRO = """(
+    setweight(to_tsvector('spanish', coalesce(name, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(name, '')), 'A')
+    || setweight(to_tsvector('spanish', coalesce(texto_busqueda, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(texto_busqueda, '')), 'B')
+)"""
+
 
 class BibliotecaLibro(models.Model):
     _name = 'biblioteca.libro'
@@ -16,43 +37,372 @@ class BibliotecaLibro(models.Model):
     ], default='b', string="Estado")
 
     # Campos principales
-    name = fields.Char(string='Nombre del libro')
-    isbn = fields.Char(string='ISBN')
+    name = fields.Char(string='Nombre del libro', index='trigram')
+    isbn = fields.Char(string='ISBN', index='btree_not_null')
     autor = fields.Many2one('biblioteca.autor', string='Autor')
     categoria = fields.Char(string='Categoría')
     ubicacion = fields.Char(string='Ubicación física')
-    ejemplares = fields.Integer(string='Ejemplares')
+    ejemplares = fields.Integer(string='Ejemplares',
+                                help="Si el libro tiene ejemplares físicos registrados, "
+                                     "la disponibilidad se calcula a partir de ellos.")
     description = fields.Text(string='Resumen')
     editorial = fields.Char(string='Editorial')
     paginas = fields.Integer(string='Páginas')
     fecha_publicacion = fields.Char(string='Fecha de Publicación')
     openlibrary_key = fields.Char(string='Open Library Key')
+    enriquecimiento_pendiente = fields.Boolean(string='Pendiente de Open Library', index=True)
+
+    # Búsqueda de catálogo
+    texto_busqueda = fields.Text(compute='_compute_texto_busqueda', store=True)
+    busqueda_catalogo = fields.Char(string='Catálogo', compute='_compute_busqueda_catalogo',
+                                    search='_search_busqueda_catalogo')
+
+    # Préstamos que incluyen el libro (inversa de biblioteca.prestamo.libro_ids)
+    prestamo_ids = fields.Many2many(
+        'biblioteca.prestamo',
+        'prestamo_libro_rel',
+        'libro_id',
+        'prestamo_id',
+        string='Préstamos'
+    )
+
+    # Ejemplares físicos
+    ejemplar_ids = fields.One2many('biblioteca.ejemplar', 'libro_id', string='Ejemplares físicos')
+
+    # Reservas (cola de espera)
+    reserva_ids = fields.One2many('biblioteca.reserva', 'libro_id', string='Reservas')
 
     # Contadores
     ejemplares_disponibles = fields.Integer(compute="_compute_counters", store=True)
     ejemplares_prestados = fields.Integer(compute="_compute_counters", store=True)
     ejemplares_en_multa = fields.Integer(compute="_compute_counters", store=True)
+    ejemplares_reservados = fields.Integer(compute="_compute_counters", store=True)
+
+    def init(self):
+        # ISBN único, sin tener en cuenta guiones ni espacios
+        if not index_exists(self.env.cr, 'biblioteca_libro_isbn_normalizado_uniq'):
+            self.env.cr.execute("""
+                SELECT upper(replace(replace(isbn, '-', ''), ' ', '')), array_agg(id ORDER BY id)
+                  FROM biblioteca_libro
+                 WHERE isbn IS NOT NULL AND isbn != ''
+              GROUP BY 1
+                HAVING COUNT(*) > 1
+            """)
+            duplicados = self.env.cr.fetchall()
+            if duplicados:
+                # Una base con duplicados no debe fallar la actualización: se
+                # indexa sin unicidad hasta que se unifiquen los libros
+                _logger.warning(
+                    "Hay %s ISBN repetidos (%s); no se crea el índice único de ISBN. "
+                    "Unifique los libros y vuelva a actualizar el módulo.",
+                    len(duplicados),
+                    ", ".join("%s: %s" % (isbn, ids) for isbn, ids in duplicados[:20]),
+                )
+                self.env.cr.execute("""
+                    CREATE INDEX IF NOT EXISTS biblioteca_libro_isbn_normalizado_idx
+                        ON biblioteca_libro (upper(replace(replace(isbn, '-', ''), ' ', '')))
+                     WHERE isbn IS NOT NULL AND isbn != ''
+                """)
+            else:
+                self.env.cr.execute("DROP INDEX IF EXISTS biblioteca_libro_isbn_normalizado_idx")
+                self.env.cr.execute("""
+                    CREATE UNIQUE INDEX biblioteca_libro_isbn_normalizado_uniq
+                        ON biblioteca_libro (upper(replace(replace(isbn, '-', ''), ' ', '')))
+                     WHERE isbn IS NOT NULL AND isbn != ''
+                """)
+
+        # Texto completo de título, autor, categoría, editorial y resumen
+        if not index_exists(self.env.cr, 'biblioteca_libro_fts_idx'):
+            self.env.cr.execute(
+                "CREATE INDEX biblioteca_libro_fts_idx ON biblioteca_libro USING gin (%s)" % TSVECTOR_LIBRO
+            )
+
+    def write(self, vals):
+        res = super().write(vals)
+        # Con más ejemplares se atienden las reservas en espera
+        if 'ejemplares' in vals:
+            self.env['biblioteca.reserva']._asignar_reservas(self)
+        return res
 
     # Cálculo de contadores
-    @api.depends('ejemplares')
+    @api.depends('ejemplares', 'prestamo_ids', 'prestamo_ids.estado', 'prestamo_ids.fecha_devolucion',
+                 'prestamo_ids.libro_devuelto_ids', 'reserva_ids.estado',
+                 'ejemplar_ids.estado', 'ejemplar_ids.prestamo_id')
     def _compute_counters(self):
-        Prestamo = self.env['biblioteca.prestamo']
+        conteos = self._contar_prestamos()
+        fisicos = self._contar_ejemplares()
+        reservados = dict(self.env['biblioteca.reserva']._read_group(
+            [('libro_id', 'in', self._origin.ids), ('estado', '=', 'asignada')],
+            ['libro_id'], ['__count'],
+        ))
         for libro in self:
-            libro.ejemplares_prestados = Prestamo.search_count([
-                ('libro_ids', 'in', libro.id),
-                ('estado', '=', 'prestado')
-            ])
-            libro.ejemplares_en_multa = Prestamo.search_count([
-                ('libro_ids', 'in', libro.id),
-                ('estado', '=', 'multa')
-            ])
-            libro.ejemplares_disponibles = max(
-                (libro.ejemplares or 0)
-                - libro.ejemplares_prestados
-                - libro.ejemplares_en_multa,
-                0
+            # Ejemplares apartados para reservas que aún no se retiraron
+            libro.ejemplares_reservados = reservados.get(libro._origin, 0)
+            if libro._origin.id in fisicos:
+                # Con ejemplares físicos manda el estado de cada uno
+                libres, prestados, en_multa = fisicos[libro._origin.id]
+            else:
+                prestados, en_multa = conteos.get(libro._origin.id, (0, 0))
+                libres = (libro.ejemplares or 0) - prestados - en_multa
+            libro.ejemplares_prestados = prestados
+            libro.ejemplares_en_multa = en_multa
+            libro.ejemplares_disponibles = max(libres - libro.ejemplares_reservados, 0)
+
+    def _contar_ejemplares(self):
+        """Cuenta los ejemplares físicos por estado con una sola consulta agrupada.
+
+        Devuelve {libro_id: (disponibles, prestados, en_multa)} solo para los
+        libros que tienen ejemplares registrados.
+        """
+        ids = tuple(self._origin.ids)
+        if not ids:
+            return {}
+        self.env['biblioteca.ejemplar'].flush_model(['libro_id', 'estado', 'prestamo_id'])
+        self.env['biblioteca.prestamo'].flush_model(['estado'])
+        self.env.cr.execute("""
+            SELECT e.libro_id,
+                   COUNT(*) FILTER (WHERE e.estado = 'disponible'),
+                   COUNT(*) FILTER (WHERE e.estado = 'prestado' AND p.estado IS DISTINCT FROM 'multa'),
+                   COUNT(*) FILTER (WHERE e.estado = 'prestado' AND p.estado = 'multa')
+              FROM biblioteca_ejemplar e
+         LEFT JOIN biblioteca_prestamo p ON p.id = e.prestamo_id
+             WHERE e.libro_id IN %s
+          GROUP BY e.libro_id
+        """, [ids])
+        return {libro_id: (libres, prestados, en_multa)
+                for libro_id, libres, prestados, en_multa in self.env.cr.fetchall()}
+
+    def _contar_prestamos(self):
+        """Cuenta préstamos sin devolver (prestados y en multa) por libro con una sola consulta.
+
+        Los libros ya recibidos de un préstamo devuelto en parte no cuentan.
+
+        Devuelve un diccionario {libro_id: (prestados, en_multa)}.
+        """
+        ids = tuple(self._origin.ids)
+        if not ids:
+            return {}
+        self.env['biblioteca.prestamo'].flush_model(['estado', 'fecha_devolucion', 'libro_ids', 'libro_devuelto_ids'])
+        self.env.cr.execute("""
+            SELECT rel.libro_id,
+                   COUNT(*) FILTER (WHERE p.estado = 'prestado'),
+                   COUNT(*) FILTER (WHERE p.estado = 'multa')
+              FROM prestamo_libro_rel rel
+              JOIN biblioteca_prestamo p ON p.id = rel.prestamo_id
+             WHERE rel.libro_id IN %s
+               AND p.estado IN ('prestado', 'multa')
+               AND p.fecha_devolucion IS NULL
+               AND NOT EXISTS (
+                    SELECT 1 FROM prestamo_libro_devuelto_rel dev
+                     WHERE dev.prestamo_id = rel.prestamo_id AND dev.libro_id = rel.libro_id
+               )
+          GROUP BY rel.libro_id
+        """, [ids])
+        return {libro_id: (prestados, en_multa)
+                for libro_id, prestados, en_multa in self.env.cr.fetchall()}
+
+    # Reservar un ejemplar de cada libro (préstamo)
+    def _reservar_ejemplares(self):
+        """Descuenta un ejemplar disponible de cada libro con un solo UPDATE.
+
+        El UPDATE solo afecta a los libros con ejemplares disponibles, así
+        que dos cajas no pueden prestar el último ejemplar a la vez. Si otra
+        caja tiene bloqueado alguno de los libros, o ya confirmó un préstamo
+        después de la instantánea de esta transacción (REPEATABLE READ), se
+        falla enseguida en lugar de esperar o dejar que Odoo repita la
+        petición.
+        """
+        if not self:
+            return
+        contadores = ['ejemplares_disponibles', 'ejemplares_prestados']
+        ids = tuple(self.ids)
+        try:
+            with self.env.cr.savepoint(flush=False):
+                self.env.cr.execute(
+                    "SELECT id FROM biblioteca_libro WHERE id IN %s FOR NO KEY UPDATE NOWAIT",
+                    [ids],
+                )
+        except (LockNotAvailable, SerializationFailure):
+            raise ValidationError(_("Los libros se están prestando en otra caja, intente de nuevo."))
+
+        # Con el bloqueo tomado, escribir los contadores pendientes ya no choca con otra caja
+        self.flush_recordset(contadores)
+
+        self.env.cr.execute("""
+            UPDATE biblioteca_libro
+               SET ejemplares_disponibles = ejemplares_disponibles - 1,
+                   ejemplares_prestados = ejemplares_prestados + 1
+             WHERE id IN %s
+               AND ejemplares_disponibles > 0
+         RETURNING id
+        """, [ids])
+        reservados = {fila[0] for fila in self.env.cr.fetchall()}
+        self.invalidate_recordset(contadores)
+
+        faltantes = self.filtered(lambda libro: libro.id not in reservados)
+        if faltantes:
+            raise ValidationError(
+                _("No hay ejemplares disponibles del libro: %s. Puede registrar una reserva.")
+                % ", ".join(faltantes.mapped("name"))
             )
 
+    # -----------------------------
+    # BÚSQUEDA DE CATÁLOGO
+    # -----------------------------
+    @api.depends('autor.name', 'categoria', 'editorial', 'description')
+    def _compute_texto_busqueda(self):
+        for libro in self:
+            partes = [libro.autor.name, libro.categoria, libro.editorial, libro.description]
+            libro.texto_busqueda = " ".join(parte for parte in partes if parte)
+
+    def _compute_busqueda_catalogo(self):
+        self.busqueda_catalogo = False
+
+    def _search_busqueda_catalogo(self, operator, value):
+        if operator not in ('ilike', '='):
+            raise UserError(_("Operador no soportado en la búsqueda de catálogo: %s") % operator)
+        # Como ilike con texto vacío: todos los libros
+        if not value:
+            return []
+        return [('id', 'in', self._ids_catalogo(value))]
+
+    def _ids_catalogo(self, texto, limite=None, desplazamiento=0):
+        """Ids de libros que coinciden con ``texto``, del más al menos relevante.
+
+        Combina texto completo (título, autor, categoría, editorial y resumen,
+        en español e inglés) con similitud de trigramas sobre el título y
+        el nombre del autor cuando pg_trgm está disponible.
+        """
+        self.flush_model(['name', 'texto_busqueda', 'autor'])
+        self.env['biblioteca.autor'].flush_model(['name'])
+        consultas = ["""
+            SELECT l.id, ts_rank_cd(%s, q.consulta) * 2 AS rango
+              FROM biblioteca_libro l,
+                   (SELECT websearch_to_tsquery('spanish', %%(texto)s)
+                           || websearch_to_tsquery('english', %%(texto)s) AS consulta) q
+             WHERE %s @@ q.consulta
+        """ % (TSVECTOR_LIBRO, TSVECTOR_LIBRO)]
+        if self.env.registry.has_trigram:
+            consultas.append("""
+                SELECT l.id, similarity(l.name, %(texto)s) AS rango
+                  FROM biblioteca_libro l
+                 WHERE l.name %% %(texto)s
+            """)
+            consultas.append("""
+                SELECT l.id, similarity(a.name, %(texto)s) AS rango
+                  FROM biblioteca_autor a
+                  JOIN biblioteca_libro l ON l.autor = a.id
+                 WHERE a.name %% %(texto)s
+            """)
+        self.env.cr.execute("""
+            SELECT id
+              FROM (%s) resultados
+          GROUP BY id
+          ORDER BY max(rango) DESC, id
+             LIMIT %%(limite)s OFFSET %%(desplazamiento)s
+        """ % " UNION ALL ".join(consultas),
+            {'texto': texto, 'limite': limite, 'desplazamiento': desplazamiento})
+        return [fila[0] for fila in self.env.cr.fetchall()]
+
+    @api.model
+    def buscar_catalogo(self, texto, limite=20, desplazamiento=0):
+        """Búsqueda de catálogo ordenada por relevancia y paginada."""
+        ids = self._ids_catalogo(texto, limite, desplazamiento)
+        libros = self.browse(ids)
+        return [{
+            'id': libro.id,
+            'name': libro.name,
+            'isbn': libro.isbn,
+            'autor': libro.autor.name,
+            'ejemplares_disponibles': libro.ejemplares_disponibles,
+        } for libro in libros]
+
+    # -----------------------------
+    # CATÁLOGO PÚBLICO (OPAC)
+    # -----------------------------
+    @api.model
+    def version_opac(self, isbn):
+        """Devuelve (id, write_date) del libro con ese ISBN, o None.
+
+        Es una lectura directa del índice único de ISBN, que sirve para
+        saber si la respuesta pública guardada en caché sigue vigente.
+        """
+        self.env.cr.execute("""
+            SELECT id, write_date
+              FROM biblioteca_libro
+             WHERE isbn IS NOT NULL AND isbn != ''
+               AND upper(replace(replace(isbn, '-', ''), ' ', '')) = %s
+        """, [normalizar_isbn(isbn)])
+        return self.env.cr.fetchone()
+
+    def datos_opac(self):
+        """Campos públicos de los libros (sin datos internos)."""
+        return [{
+            'isbn': libro.isbn,
+            'titulo': libro.name,
+            'autor': libro.autor.name or None,
+            'editorial': libro.editorial or None,
+            'ubicacion': libro.ubicacion or None,
+            'ejemplares': libro.ejemplares,
+            'ejemplares_disponibles': libro.ejemplares_disponibles,
+        } for libro in self]
+
+    # Buscar libros por ISBN normalizado (usa el índice único)
+    @api.model
+    def buscar_por_isbns(self, isbns):
+        """Devuelve {isbn normalizado: libro} para los ISBN existentes."""
+        normalizados = tuple({normalizar_isbn(isbn) for isbn in isbns} - {''})
+        if not normalizados:
+            return {}
+        self.flush_model(['isbn'])
+        self.env.cr.execute("""
+            SELECT upper(replace(replace(isbn, '-', ''), ' ', '')), id
+              FROM biblioteca_libro
+             WHERE isbn IS NOT NULL AND isbn != ''
+               AND upper(replace(replace(isbn, '-', ''), ' ', '')) IN %s
+        """, [normalizados])
+        return {isbn: self.browse(libro_id) for isbn, libro_id in self.env.cr.fetchall()}
+
+    # Recalcular contadores de todo el recordset (p. ej. después de una importación)
+    def recalcular_contadores(self):
+        libros = self or self.search([])
+        # Se marcan para recalcular y se escriben juntos: un cálculo agrupado y
+        # UPDATE en lote, no un write por libro y campo
+        contadores = ['ejemplares_disponibles', 'ejemplares_prestados', 'ejemplares_en_multa', 'ejemplares_reservados']
+        for nombre in contadores:
+            self.env.add_to_compute(self._fields[nombre], libros)
+        libros.flush_recordset(contadores)
+        return True
+
+    # Registrar ejemplares físicos
+    def action_generar_ejemplares(self):
+        """Registra como ejemplares físicos los que el libro tiene solo como número.
+
+        Se crean los que faltan hasta ``ejemplares``; los préstamos abiertos
+        del libro que aún no tienen ejemplar se quedan con uno de los nuevos
+        y el resto queda disponible (y se asigna a las reservas en espera).
+        """
+        abiertos = self.env['biblioteca.prestamo'].search([
+            ('libro_ids', 'in', self.ids),
+            ('estado', 'in', ('prestado', 'multa')),
+            ('fecha_devolucion', '=', False),
+        ])
+        vals_list = []
+        for libro in self:
+            en_uso = libro.ejemplar_ids.filtered(lambda e: e.estado not in ('baja', 'perdido'))
+            faltan = max((libro.ejemplares or 0) - len(en_uso), 0)
+            sin_ejemplar = abiertos.filtered(
+                lambda p: libro in p.libro_ids - p.libro_devuelto_ids - p.ejemplar_ids.libro_id)[:faltan]
+            vals_list += [{'libro_id': libro.id, 'ubicacion': libro.ubicacion,
+                           'estado': 'prestado', 'prestamo_id': prestamo.id}
+                          for prestamo in sin_ejemplar]
+            vals_list += [{'libro_id': libro.id, 'ubicacion': libro.ubicacion}
+                          for _i in range(faltan - len(sin_ejemplar))]
+        nuevos = self.env['biblioteca.ejemplar'].create(vals_list)
+        for ejemplar in nuevos.filtered('prestamo_id'):
+            ejemplar.prestamo_id.ejemplar_ids = [(4, ejemplar.id)]
+        return True
+
     # Guardar
     def guardarLibro(self):
         for libro in self:
@@ -69,8 +419,12 @@ class BibliotecaLibro(models.Model):
         return True
 
     # Búsqueda general
+    @instrumentar('buscarLibro')
     def buscarLibro(self):
+        Cache = self.env["biblioteca.openlibrary.cache"]
         for libro in self:
+            # Plazo total para todas las peticiones de este libro
+            libro = libro.with_context(openlibrary_plazo=Cache.plazo_consulta())
             encontrado = False
             if libro.isbn:
                 encontrado = libro.buscarPorIsbn()
@@ -83,49 +437,20 @@ class BibliotecaLibro(models.Model):
     # Buscar por ISBN
     def buscarPorIsbn(self):
         self.ensure_one()
-        url = f"https://openlibrary.org/isbn/{self.isbn}.json"
+        Cache = self.env["biblioteca.openlibrary.cache"]
 
         try:
-            respuesta = requests.get(url, timeout=10)
-            if respuesta.status_code != 200:
+            datos = Cache.obtener(f"/isbn/{self.isbn}.json")
+            if not datos:
                 return False
 
-            datos = respuesta.json()
-
-            # Título
-            self.name = datos.get("title") or self.name
-
-            # Editorial
-            publishers = datos.get("publishers") or []
-            if publishers:
-                self.editorial = publishers[0]
-
-            # Páginas
-            paginas = datos.get("number_of_pages") or datos.get("number_of_pages_median")
-            if paginas:
-                self.paginas = paginas
-
-            # Año
-            if datos.get("publish_date"):
-                self.fecha_publicacion = datos["publish_date"]
+            vals = self._vals_desde_edicion(datos)
 
-            # WORK
-            works = datos.get("works") or []
-            if works:
-                workKey = works[0].get("key")
-                self.openlibrary_key = workKey
+            # WORK: descripción y categoría
+            if vals.get("openlibrary_key"):
+                vals.update(self._vals_desde_work(self.obtenerWork(vals["openlibrary_key"])))
 
-                # Descripción
-                descripcion = self.obtenerDescripcion(workKey)
-                if descripcion:
-                    self.description = descripcion
-
-                # Categoría
-                detalles = self.obtenerWork(workKey)
-                if detalles:
-                    subjects = detalles.get("subjects") or []
-                    if subjects:
-                        self.categoria = subjects[0]
+            self.write(vals)
 
             # Autor
             autores = datos.get("authors") or []
@@ -140,85 +465,213 @@ class BibliotecaLibro(models.Model):
     # Buscar por título
     def buscarPorTitulo(self):
         self.ensure_one()
-        titulo = self.name.replace(" ", "+")
-        url = f"https://openlibrary.org/search.json?q={titulo}&limit=1"
+        Cache = self.env["biblioteca.openlibrary.cache"]
 
         try:
-            respuesta = requests.get(url, timeout=10)
-            if respuesta.status_code != 200:
+            respuesta = Cache.obtener("/search.json", {"q": self.name, "limit": 1})
+            if not respuesta:
                 return False
 
-            docs = respuesta.json().get("docs")
+            docs = respuesta.get("docs")
             if not docs:
                 return False
 
             libroData = docs[0]
-
-            # Título
-            self.name = libroData.get("title") or self.name
-
-            # Editorial
-            publishers = libroData.get("publisher") or []
-            if publishers:
-                self.editorial = publishers[0]
-
-            # Año
-            if libroData.get("first_publish_year"):
-                self.fecha_publicacion = str(libroData["first_publish_year"])
-
-            # Páginas
-            paginas = libroData.get("number_of_pages_median")
-            if paginas:
-                self.paginas = paginas
-
-            # ISBN sugerido
-            isbns = libroData.get("isbn") or []
-            if isbns and not self.isbn:
-                self.isbn = isbns[0]
+            vals = self._vals_desde_busqueda(libroData)
 
             # Autor
             autores = libroData.get("author_name") or []
             if autores:
                 self.guardarAutor(autores[0])
 
-            # WORK KEY
-            workKey = libroData.get("key")
-
-            # Normalizar: asegurar que sea un /works/ válido
-            if workKey and not workKey.startswith("/works/"):
-                workId = workKey.split("/")[-1]
-                workKey = f"/works/{workId}"
-
             # Cargar WORK
-            if workKey and workKey.startswith("/works/"):
-                self.openlibrary_key = workKey
-                detalles = self.obtenerWork(workKey)
-
-                if detalles:
-                    subjects = detalles.get("subjects") or []
-                    if subjects:
-                        self.categoria = subjects[0]
-
-                    descripcion = detalles.get("description")
-                    if isinstance(descripcion, dict):
-                        self.description = descripcion.get("value")
-                    elif isinstance(descripcion, str):
-                        self.description = descripcion
+            if vals.get("openlibrary_key"):
+                vals.update(self._vals_desde_work(self.obtenerWork(vals["openlibrary_key"])))
 
+            self.write(vals)
             return True
 
         except Exception:
             return False
 
+    # Valores a partir de una edición (/isbn/<isbn>.json)
+    def _vals_desde_edicion(self, datos):
+        vals = {}
+
+        # Título
+        if datos.get("title"):
+            vals["name"] = datos["title"]
+
+        # Editorial
+        publishers = datos.get("publishers") or []
+        if publishers:
+            vals["editorial"] = publishers[0]
+
+        # Páginas
+        paginas = datos.get("number_of_pages") or datos.get("number_of_pages_median")
+        if paginas:
+            vals["paginas"] = paginas
+
+        # Año
+        if datos.get("publish_date"):
+            vals["fecha_publicacion"] = datos["publish_date"]
+
+        # WORK
+        works = datos.get("works") or []
+        if works and works[0].get("key"):
+            vals["openlibrary_key"] = works[0]["key"]
+
+        return vals
+
+    # Valores a partir de un resultado de /search.json
+    def _vals_desde_busqueda(self, libroData):
+        vals = {}
+
+        # Título
+        if libroData.get("title"):
+            vals["name"] = libroData["title"]
+
+        # Editorial
+        publishers = libroData.get("publisher") or []
+        if publishers:
+            vals["editorial"] = publishers[0]
+
+        # Año
+        if libroData.get("first_publish_year"):
+            vals["fecha_publicacion"] = str(libroData["first_publish_year"])
+
+        # Páginas
+        paginas = libroData.get("number_of_pages_median")
+        if paginas:
+            vals["paginas"] = paginas
+
+        # ISBN sugerido
+        isbns = libroData.get("isbn") or []
+        if isbns and not self.isbn:
+            vals["isbn"] = isbns[0]
+
+        # WORK KEY. Normalizar: asegurar que sea un /works/ válido
+        workKey = libroData.get("key")
+        if workKey and not workKey.startswith("/works/"):
+            workId = workKey.split("/")[-1]
+            workKey = f"/works/{workId}"
+        if workKey:
+            vals["openlibrary_key"] = workKey
+
+        return vals
+
+    # Valores a partir de un WORK
+    def _vals_desde_work(self, detalles):
+        vals = {}
+        if not detalles:
+            return vals
+
+        # Categoría
+        subjects = detalles.get("subjects") or []
+        if subjects:
+            vals["categoria"] = subjects[0]
+
+        # Descripción
+        descripcion = detalles.get("description")
+        if isinstance(descripcion, dict):
+            descripcion = descripcion.get("value")
+        if isinstance(descripcion, str) and descripcion:
+            vals["description"] = descripcion
+
+        return vals
+
+    # -----------------------------
+    # ENRIQUECIMIENTO EN LOTE
+    # -----------------------------
+    def enriquecer_en_lote(self):
+        """Completa varios libros a la vez con datos de Open Library.
+
+        Las ediciones, works y autores se descargan en paralelo y sin
+        repetir claves compartidas; después se crean los autores que falten
+        y se escriben los libros. Devuelve los libros sin resultados.
+        """
+        Cache = self.env["biblioteca.openlibrary.cache"]
+        if not self.env.context.get("openlibrary_plazo"):
+            # Plazo total del lote, para que un Retry-After largo no retenga el cron
+            return self.with_context(openlibrary_plazo=Cache.plazo_lote()).enriquecer_en_lote()
+        vals_por_libro = {}
+        autor_key = {}
+        autor_nombre = {}
+
+        # 1. Ediciones por ISBN
+        con_isbn = self.filtered("isbn")
+        ediciones = Cache.obtener_varios([f"/isbn/{libro.isbn}.json" for libro in con_isbn])
+        for libro in con_isbn:
+            datos = ediciones.get(f"/isbn/{libro.isbn}.json")
+            if datos:
+                vals_por_libro[libro] = libro._vals_desde_edicion(datos)
+                autores = datos.get("authors") or []
+                if autores and autores[0].get("key"):
+                    autor_key[libro] = autores[0]["key"]
+
+        # 2. Búsqueda por título para los demás
+        por_titulo = self.filtered(lambda l: l not in vals_por_libro and l.name)
+        claves = {libro: Cache.normalizar_clave("/search.json", {"q": libro.name, "limit": 1})
+                  for libro in por_titulo}
+        busquedas = Cache.obtener_varios(claves.values())
+        for libro, clave in claves.items():
+            docs = (busquedas.get(clave) or {}).get("docs")
+            if docs:
+                vals_por_libro[libro] = libro._vals_desde_busqueda(docs[0])
+                autores = docs[0].get("author_name") or []
+                if autores:
+                    autor_nombre[libro] = autores[0]
+
+        # 3. Works y autores, cada clave una sola vez
+        works = Cache.obtener_varios(
+            f"{vals['openlibrary_key']}.json"
+            for vals in vals_por_libro.values() if vals.get("openlibrary_key")
+        )
+        for vals in vals_por_libro.values():
+            if vals.get("openlibrary_key"):
+                vals.update(self._vals_desde_work(works.get(f"{vals['openlibrary_key']}.json")))
+
+        autores = Cache.obtener_varios(f"{key}.json" for key in autor_key.values())
+        for libro, key in autor_key.items():
+            nombre = (autores.get(f"{key}.json") or {}).get("name")
+            if nombre:
+                autor_nombre[libro] = (key, nombre)
+
+        # 4. Autores: una búsqueda y un create para todo el lote
+        autor_ids = self.env["biblioteca.autor"].resolve_or_create(set(autor_nombre.values()))
+        for libro, autor in autor_nombre.items():
+            vals_por_libro[libro]["autor"] = autor_ids[autor]
+
+        # 5. Escritura
+        for libro, vals in vals_por_libro.items():
+            libro.write(vals)
+
+        return self.filtered(lambda l: l not in vals_por_libro)
+
+    def action_enriquecer_en_segundo_plano(self):
+        """Encola los libros para que el cron los enriquezca."""
+        self.write({"enriquecimiento_pendiente": True})
+        self.env.ref("biblioteca.cron_enriquecer_libros")._trigger()
+        return True
+
+    @api.model
+    def _cron_enriquecer_pendientes(self, tamano_lote=200):
+        while True:
+            libros = self.search([("enriquecimiento_pendiente", "=", True)], limit=tamano_lote)
+            if not libros:
+                break
+            no_encontrados = libros.enriquecer_en_lote()
+            if no_encontrados:
+                _logger.info("Sin datos en Open Library para los libros %s", no_encontrados.ids)
+            libros.write({"enriquecimiento_pendiente": False})
+            self.env.cr.commit()
+
     # Obtener WORK
     def obtenerWork(self, workKey):
         if not workKey:
             return None
         try:
-            respuesta = requests.get(f"https://openlibrary.org{workKey}.json", timeout=10)
-            if respuesta.status_code != 200:
-                return None
-            return respuesta.json()
+            return self.env["biblioteca.openlibrary.cache"].obtener(f"{workKey}.json")
         except:
             return None
 
@@ -227,27 +680,19 @@ class BibliotecaLibro(models.Model):
         if not authorKey:
             return
         try:
-            respuesta = requests.get(f"https://openlibrary.org{authorKey}.json", timeout=10)
-            if respuesta.status_code != 200:
+            datos = self.env["biblioteca.openlibrary.cache"].obtener(f"{authorKey}.json")
+            if not datos:
                 return
-            datos = respuesta.json()
             nombre = datos.get("name")
             if not nombre:
                 return
 
-            Autor = self.env["biblioteca.autor"]
-            autor = Autor.search([("name", "=", nombre)], limit=1)
-            if not autor:
-                autor = Autor.create({"name": nombre})
-
-            self.autor = autor.id
+            autor_ids = self.env["biblioteca.autor"].resolve_or_create([(authorKey, nombre)])
+            self.autor = autor_ids[(authorKey, nombre)]
         except:
             return
 
     # Guardar autor por nombre
     def guardarAutor(self, nombre):
-        Autor = self.env["biblioteca.autor"]
-        autor = Autor.search([("name", "=", nombre)], limit=1)
-        if not autor:
-            autor = Autor.create({"name": nombre})
-        self.autor = autor.id
\ No newline at end of file
+        autor_ids = self.env["biblioteca.autor"].resolve_or_create([nombre])
+        self.autor = autor_ids[nombre]
\ No newline at end of file
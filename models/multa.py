@@ -1,5 +1,11 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from odoo.tools.sql import create_index
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
 
 
 class BibliotecaMulta(models.Model):
@@ -13,26 +19,41 @@ class BibliotecaMulta(models.Model):
         ('no_devolucion', 'No devolución'),
     ]
 
-    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', required=True)
-    prestamo_id = fields.Many2one('biblioteca.prestamo', string='Préstamo relacionado', required=True)
+    VALORES_BASE = {
+        'retraso': 5.0,    # por cada día o fijo, según tu criterio
+        'danio': 10.0,
+        'perdida': 20.0,
+        'no_devolucion': 50.0,
+    }
+
+    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', required=True, index=True)
+    prestamo_id = fields.Many2one('biblioteca.prestamo', string='Préstamo relacionado', required=True, index=True)
 
     tipo = fields.Selection(TIPO_MULTA, string='Tipo de multa', required=True)
     valor = fields.Float(string='Valor de la multa', compute="_compute_valor", store=True)
     fecha = fields.Datetime(string='Fecha de multa', default=fields.Datetime.now)
     descripcion = fields.Text(string='Descripción')
+    devengo_ids = fields.One2many('biblioteca.multa.devengo', 'multa_id', string='Devengos')
+    pagada = fields.Boolean(string='Pagada', default=False, readonly=True, copy=False)
+    fecha_pago = fields.Datetime(string='Fecha de pago', readonly=True, copy=False)
+
+    def init(self):
+        # Multas de retraso (devengo diario)
+        create_index(
+            self.env.cr, 'biblioteca_multa_retraso_idx', self._table,
+            ['prestamo_id'],
+            where="tipo = 'retraso'",
+        )
 
     @api.depends('tipo', 'prestamo_id.fecha_max_devolucion', 'prestamo_id.fecha_devolucion')
     def _compute_valor(self):
-        valores_base = {
-            'retraso': 5.0,    # por cada día o fijo, según tu criterio
-            'danio': 10.0,
-            'perdida': 20.0,
-            'no_devolucion': 50.0,
-        }
+        valores_base = self.VALORES_BASE
+        # Una sola fecha de referencia para todo el recordset
+        ahora = self.env.context.get('multa_fecha_ref') or fields.Datetime.now()
         for record in self:
             if record.tipo == 'retraso' and record.prestamo_id:
                 fecha_lim = record.prestamo_id.fecha_max_devolucion
-                fecha_real = record.prestamo_id.fecha_devolucion or fields.Datetime.now()
+                fecha_real = record.prestamo_id.fecha_devolucion or ahora
                 if fecha_lim and fecha_real > fecha_lim:
                     dias_retraso = (fecha_real - fecha_lim).days
                     # aquí puedes usar por día, o fijo:
@@ -42,10 +63,131 @@ class BibliotecaMulta(models.Model):
             else:
                 record.valor = valores_base.get(record.tipo, 0.0)
 
-    @api.model
-    def create(self, vals):
-        recs = super().create(vals)
-        for multa in recs:
-            if multa.prestamo_id:
-                multa.prestamo_id.estado = 'multa'
+    @api.model_create_multi
+    def create(self, vals_list):
+        recs = super().create(vals_list)
+        # Un solo write para todos los préstamos afectados
+        prestamos = recs.prestamo_id.filtered(lambda p: p.estado != 'multa')
+        if prestamos:
+            prestamos.estado = 'multa'
         return recs
+
+    def action_pagar(self):
+        # La multa de retraso crece mientras el préstamo siga abierto
+        abiertas = self.filtered(lambda m: m.tipo == 'retraso' and not m.prestamo_id.fecha_devolucion)
+        if abiertas:
+            raise UserError(_("Las multas por retraso se pagan una vez devuelto el préstamo: %s")
+                            % ", ".join(abiertas.prestamo_id.mapped('name')))
+        self.filtered(lambda m: not m.pagada).write({'pagada': True, 'fecha_pago': fields.Datetime.now()})
+
+    @api.model
+    def create_batch(self, vals_list, tamano_lote=5000, fecha_ref=None):
+        """Crea multas en lotes grandes.
+
+        Todas las multas usan la misma fecha de referencia para el cálculo
+        del valor, y los totales de los préstamos se recalculan una vez por
+        lote al hacer flush.
+        """
+        Multa = self.with_context(multa_fecha_ref=fecha_ref or fields.Datetime.now())
+        multas = self.browse()
+        for i in range(0, len(vals_list), tamano_lote):
+            lote = Multa.create(vals_list[i:i + tamano_lote])
+            Multa.env.flush_all()
+            multas |= lote
+        return multas.with_env(self.env)
+
+    @api.model
+    def devengar(self, fecha_ref=None):
+        """Actualiza el valor de las multas de retraso de préstamos sin devolver.
+
+        Un solo UPDATE recalcula todas las multas abiertas desde la fecha
+        máxima de devolución (igual que ``_compute_valor``) y deja cada
+        incremento en el libro de devengos. Después se recalculan con una
+        consulta agrupada el total de multa de los préstamos y el total de
+        multas por pagar de los usuarios afectados.
+        """
+        ahora = fecha_ref or fields.Datetime.now()
+        cr = self.env.cr
+        inicio = time.perf_counter()
+        self.env.flush_all()
+
+        cr.execute("""
+            WITH nuevos AS (
+                SELECT m.id,
+                       m.valor AS anterior,
+                       (%(base)s * GREATEST(EXTRACT(DAY FROM %(ahora)s - p.fecha_max_devolucion), 1))::float8 AS valor
+                  FROM biblioteca_multa m
+                  JOIN biblioteca_prestamo p ON p.id = m.prestamo_id
+                 WHERE m.tipo = 'retraso'
+                   AND m.pagada IS NOT TRUE
+                   AND p.estado IN ('prestado', 'multa')
+                   AND p.fecha_devolucion IS NULL
+                   AND p.fecha_max_devolucion < %(ahora)s
+            ), actualizadas AS (
+                UPDATE biblioteca_multa m
+                   SET valor = n.valor,
+                       write_uid = %(uid)s,
+                       write_date = now() AT TIME ZONE 'UTC'
+                  FROM nuevos n
+                 WHERE m.id = n.id
+                   AND m.valor IS DISTINCT FROM n.valor
+             RETURNING m.id, m.prestamo_id, m.usuario_id, n.anterior, n.valor
+            )
+            INSERT INTO biblioteca_multa_devengo (multa_id, prestamo_id, usuario_id, fecha,
+                                                  valor_anterior, incremento, valor)
+            SELECT id, prestamo_id, usuario_id, %(ahora)s,
+                   COALESCE(anterior, 0), valor - COALESCE(anterior, 0), valor
+              FROM actualizadas
+         RETURNING prestamo_id, usuario_id
+        """, {'ahora': ahora, 'base': self.VALORES_BASE['retraso'], 'uid': self.env.uid})
+        filas = cr.fetchall()
+        prestamo_ids = tuple({fila[0] for fila in filas})
+        usuario_ids = tuple({fila[1] for fila in filas})
+
+        if prestamo_ids:
+            cr.execute("""
+                UPDATE biblioteca_prestamo p
+                   SET multa_total = t.total
+                  FROM (SELECT prestamo_id, SUM(valor) AS total
+                          FROM biblioteca_multa
+                         WHERE prestamo_id IN %s
+                      GROUP BY prestamo_id) t
+                 WHERE p.id = t.prestamo_id
+            """, [prestamo_ids])
+            cr.execute("""
+                UPDATE biblioteca_usuarios u
+                   SET total_multas = t.total
+                  FROM (SELECT usuario_id, SUM(valor) AS total
+                          FROM biblioteca_multa
+                         WHERE usuario_id IN %s
+                           AND pagada IS NOT TRUE
+                      GROUP BY usuario_id) t
+                 WHERE u.id = t.usuario_id
+            """, [usuario_ids])
+            self.invalidate_model(['valor'])
+            self.env['biblioteca.prestamo'].invalidate_model(['multa_total'])
+            self.env['biblioteca.usuarios'].invalidate_model(['total_multas'])
+
+        _logger.info("devengar: %s multas actualizadas en %s préstamos en %.3fs",
+                     len(filas), len(prestamo_ids), time.perf_counter() - inicio)
+        return len(filas)
+
+
+class BibliotecaMultaDevengo(models.Model):
+    _name = 'biblioteca.multa.devengo'
+    _description = 'Libro de devengos diarios de multas'
+    _order = 'fecha desc, id desc'
+    _log_access = False
+
+    # Al archivar el préstamo el devengo pasa a apuntar a la multa archivada;
+    # una multa con devengos no se puede borrar
+    multa_id = fields.Many2one('biblioteca.multa', string='Multa', readonly=True,
+                               index='btree_not_null', ondelete='restrict')
+    multa_archivo_id = fields.Many2one('biblioteca.multa.archivo', string='Multa archivada', readonly=True,
+                                       index='btree_not_null', ondelete='restrict')
+    prestamo_id = fields.Many2one('biblioteca.prestamo', string='Préstamo', readonly=True)
+    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', readonly=True)
+    fecha = fields.Datetime(string='Fecha', readonly=True, index=True)
+    valor_anterior = fields.Float(string='Valor anterior', readonly=True)
+    incremento = fields.Float(string='Incremento', readonly=True)
+    valor = fields.Float(string='Valor', readonly=True)
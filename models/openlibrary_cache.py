@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlencode
+import json
+import threading
+import time
+
+from .instrumentacion import sumar_http
+from .openlibrary_client import OPENLIBRARY_URL, obtener_cliente
+
+# Caché en memoria del proceso (LRU), compartida entre peticiones
+_LRU = OrderedDict()
+_LRU_LOCK = threading.Lock()
+_ESTADISTICAS = {'hits_memoria': 0, 'hits_bd': 0, 'misses': 0}
+
+
+class BibliotecaOpenLibraryCache(models.Model):
+    _name = 'biblioteca.openlibrary.cache'
+    _description = 'Caché de respuestas de Open Library'
+    _rec_name = 'clave'
+    _order = 'fecha desc'
+
+    clave = fields.Char(string='Ruta normalizada', required=True, index=True)
+    codigo_http = fields.Integer(string='Código HTTP')
+    contenido = fields.Text(string='Respuesta JSON')
+    fecha = fields.Datetime(string='Fecha de consulta', required=True, index=True)
+
+    _sql_constraints = [
+        ('clave_unique', 'unique(clave)', 'La ruta ya está en caché.'),
+    ]
+
+    # -----------------------------
+    # CONFIGURACIÓN
+    # -----------------------------
+    def _parametro(self, nombre, defecto):
+        valor = self.env['ir.config_parameter'].sudo().get_param(
+            'biblioteca.openlibrary_cache.%s' % nombre, defecto)
+        return int(valor)
+
+    def _ttl(self, codigo_http):
+        """Segundos de validez de una entrada (las 404 duran menos)."""
+        if codigo_http == 404:
+            return self._parametro('ttl_404', 3600)
+        return self._parametro('ttl', 7 * 24 * 3600)
+
+    @api.model
+    def normalizar_clave(self, ruta, params=None):
+        """Ruta de Open Library sin dominio, con los parámetros ordenados."""
+        if ruta.startswith(OPENLIBRARY_URL):
+            ruta = ruta[len(OPENLIBRARY_URL):]
+        if not ruta.startswith('/'):
+            ruta = '/' + ruta
+        if params:
+            ruta = '%s?%s' % (ruta, urlencode(sorted(params.items())))
+        return ruta
+
+    # -----------------------------
+    # CONSULTA
+    # -----------------------------
+    @api.model
+    def obtener(self, ruta, params=None):
+        """Devuelve el JSON de Open Library para la ruta, usando la caché.
+
+        Devuelve None si la respuesta no es 200 (las 404 también se guardan
+        en caché para no repetir la consulta).
+        """
+        clave = self.normalizar_clave(ruta, params)
+        return self.obtener_varios([clave])[clave]
+
+    @api.model
+    def obtener_varios(self, claves, max_hilos=None):
+        """Como obtener(), pero para muchas rutas normalizadas a la vez.
+
+        La caché se consulta con una sola query y las rutas que falten se
+        descargan en paralelo. Devuelve {clave: json o None}.
+        """
+        claves = list(dict.fromkeys(claves))
+        ahora = fields.Datetime.now()
+        dbname = self.env.cr.dbname
+        resultados = {}
+
+        # 1. Memoria del proceso
+        with _LRU_LOCK:
+            for clave in claves:
+                entrada = _LRU.get((dbname, clave))
+                if entrada and entrada[0] > ahora:
+                    _LRU.move_to_end((dbname, clave))
+                    _ESTADISTICAS['hits_memoria'] += 1
+                    resultados[clave] = entrada[1]
+        pendientes = [clave for clave in claves if clave not in resultados]
+
+        # 2. Tabla en base de datos
+        if pendientes:
+            self.env.cr.execute("""
+                SELECT clave, codigo_http, contenido, fecha
+                  FROM biblioteca_openlibrary_cache
+                 WHERE clave IN %s
+            """, [tuple(pendientes)])
+            for clave, codigo_http, contenido, fecha in self.env.cr.fetchall():
+                expira = fecha + timedelta(seconds=self._ttl(codigo_http))
+                if expira > ahora:
+                    datos = json.loads(contenido) if contenido else None
+                    self._guardar_en_memoria((dbname, clave), expira, datos)
+                    _ESTADISTICAS['hits_bd'] += 1
+                    resultados[clave] = datos
+            pendientes = [clave for clave in pendientes if clave not in resultados]
+
+        # 3. Consulta remota (en paralelo si hay varias)
+        if pendientes:
+            _ESTADISTICAS['misses'] += len(pendientes)
+            cliente = obtener_cliente()
+            plazo = self.env.context.get('openlibrary_plazo')
+            inicio_http = time.perf_counter()
+            if len(pendientes) == 1:
+                respuestas = [cliente.get(pendientes[0], plazo=plazo)]
+            else:
+                hilos = min(max_hilos or cliente.max_por_host, len(pendientes))
+                with ThreadPoolExecutor(max_workers=hilos) as executor:
+                    respuestas = list(executor.map(
+                        lambda clave: cliente.get(clave, plazo=plazo), pendientes))
+            sumar_http(time.perf_counter() - inicio_http)
+            nuevas = []
+            for clave, respuesta in zip(pendientes, respuestas):
+                codigo_http, datos = self._leer_respuesta(respuesta)
+                if codigo_http in (200, 404):
+                    nuevas.append((clave, codigo_http, datos, ahora))
+                    expira = ahora + timedelta(seconds=self._ttl(codigo_http))
+                    self._guardar_en_memoria((dbname, clave), expira, datos)
+                resultados[clave] = datos
+            self._guardar(nuevas)
+
+        return resultados
+
+    @api.model
+    def plazo_consulta(self):
+        """Instante límite (time.monotonic) para una consulta completa."""
+        return time.monotonic() + self._parametro('plazo', 30)
+
+    @api.model
+    def plazo_lote(self):
+        """Instante límite (time.monotonic) para un lote de enriquecimiento."""
+        return time.monotonic() + self._parametro('plazo_lote', 300)
+
+    def _leer_respuesta(self, respuesta):
+        """Devuelve (código, json o None) de una respuesta HTTP."""
+        if respuesta is None:
+            return None, None
+        if respuesta.status_code != 200:
+            return respuesta.status_code, None
+        try:
+            return 200, respuesta.json()
+        except ValueError:
+            return None, None
+
+    def _guardar(self, filas):
+        """Guarda [(clave, código, datos, fecha)] en su propia transacción.
+
+        Así las respuestas (también los 404) quedan en caché aunque la
+        operación que las pidió falle y deshaga su transacción.
+        """
+        if not filas:
+            return
+        with self.env.registry.cursor() as cr:
+            for clave, codigo_http, datos, fecha in filas:
+                contenido = json.dumps(datos) if datos is not None else None
+                cr.execute("""
+                    INSERT INTO biblioteca_openlibrary_cache (clave, codigo_http, contenido, fecha)
+                    VALUES (%s, %s, %s, %s)
+                    ON CONFLICT (clave) DO UPDATE
+                       SET codigo_http = EXCLUDED.codigo_http,
+                           contenido = EXCLUDED.contenido,
+                           fecha = EXCLUDED.fecha
+                """, [clave, codigo_http, contenido, fecha])
+
+    def _guardar_en_memoria(self, lru_clave, expira, datos):
+        maximo = self._parametro('max_memoria', 2000)
+        with _LRU_LOCK:
+            _LRU[lru_clave] = (expira, datos)
+            _LRU.move_to_end(lru_clave)
+            while len(_LRU) > maximo:
+                _LRU.popitem(last=False)
+
+    # -----------------------------
+    # MANTENIMIENTO
+    # -----------------------------
+    @api.model
+    def purgar(self):
+        """Elimina entradas vencidas y las más antiguas si se supera el máximo."""
+        ahora = fields.Datetime.now()
+        self.env.cr.execute("""
+            DELETE FROM biblioteca_openlibrary_cache
+             WHERE (codigo_http = 404 AND fecha < %s)
+                OR fecha < %s
+        """, [ahora - timedelta(seconds=self._ttl(404)),
+              ahora - timedelta(seconds=self._ttl(200))])
+        self.env.cr.execute("""
+            DELETE FROM biblioteca_openlibrary_cache
+             WHERE id IN (
+                SELECT id FROM biblioteca_openlibrary_cache
+              ORDER BY fecha DESC
+                OFFSET %s
+             )
+        """, [self._parametro('max_entradas', 100000)])
+        self.invalidate_model()
+        return True
+
+    @api.model
+    def estadisticas(self):
+        """Contadores de aciertos y fallos de la caché en este proceso."""
+        with _LRU_LOCK:
+            return dict(_ESTADISTICAS, entradas_memoria=len(_LRU))
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""Cliente HTTP compartido para Open Library.
+
+Usa una única requests.Session con conexiones persistentes, limita las
+peticiones simultáneas por host y reintenta con espera exponencial las
+respuestas 429/5xx, sin pasarse nunca del plazo total de la consulta.
+"""
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+import logging
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_logger = logging.getLogger(__name__)
+
+OPENLIBRARY_URL = "https://openlibrary.org"
+CODIGOS_REINTENTO = (429, 500, 502, 503, 504)
+
+
+class ClienteOpenLibrary:
+
+    def __init__(self, max_por_host=4, reintentos=3, pausa_base=0.5, timeout=10, max_espera=60):
+        self.max_por_host = max_por_host
+        self.reintentos = reintentos
+        self.pausa_base = pausa_base
+        self.timeout = timeout
+        self.max_espera = max_espera
+
+        self.session = requests.Session()
+        self.session.headers['User-Agent'] = 'biblioteca-odoo/0.1'
+        adaptador = HTTPAdapter(pool_connections=4, pool_maxsize=max_por_host)
+        self.session.mount('https://', adaptador)
+        self.session.mount('http://', adaptador)
+
+        self._semaforos = {}
+        self._lock = threading.Lock()
+
+    def _semaforo(self, host):
+        with self._lock:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self.max_por_host)
+            return self._semaforos[host]
+
+    def _espera(self, respuesta, intento):
+        """Segundos a esperar antes del siguiente intento (como mucho ``max_espera``)."""
+        return min(self._espera_pedida(respuesta, intento), self.max_espera)
+
+    def _espera_pedida(self, respuesta, intento):
+        retry_after = respuesta is not None and respuesta.headers.get('Retry-After')
+        if retry_after:
+            try:
+                return float(retry_after)
+            except ValueError:
+                try:
+                    fecha = parsedate_to_datetime(retry_after)
+                    return max(fecha.timestamp() - time.time(), 0)
+                except (TypeError, ValueError):
+                    pass
+        return self.pausa_base * (2 ** intento) * (1 + random.random() / 2)
+
+    def get(self, url, params=None, plazo=None):
+        """GET con reintentos.
+
+        ``plazo`` es un instante de time.monotonic() a partir del cual no se
+        hacen más intentos. Devuelve la última respuesta o None si no hubo
+        ninguna (error de red o plazo agotado).
+        """
+        if url.startswith('/'):
+            url = OPENLIBRARY_URL + url
+        semaforo = self._semaforo(urlparse(url).netloc)
+        respuesta = None
+
+        for intento in range(self.reintentos + 1):
+            restante = plazo - time.monotonic() if plazo else self.timeout
+            if restante <= 0:
+                break
+            if not semaforo.acquire(timeout=restante):
+                break
+            try:
+                respuesta = self.session.get(url, params=params, timeout=min(self.timeout, restante))
+            except (requests.ConnectionError, requests.Timeout) as error:
+                _logger.debug("Open Library: error de red en %s: %s", url, error)
+                respuesta = None
+            finally:
+                semaforo.release()
+
+            if respuesta is not None and respuesta.status_code not in CODIGOS_REINTENTO:
+                return respuesta
+            if intento == self.reintentos:
+                break
+
+            espera = self._espera(respuesta, intento)
+            if plazo and time.monotonic() + espera >= plazo:
+                break
+            time.sleep(espera)
+
+        return respuesta
+
+
+_cliente = None
+_cliente_lock = threading.Lock()
+
+
+def obtener_cliente():
+    """Cliente compartido por todo el proceso."""
+    global _cliente
+    with _cliente_lock:
+        if _cliente is None:
+            _cliente = ClienteOpenLibrary()
+        return _cliente
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from odoo import models, api
+import gzip
+import json
+import logging
+import time
+
+from .libro import normalizar_isbn
+
+_logger = logging.getLogger(__name__)
+
+
+def leer_dump(ruta):
+    """Recorre un dump de Open Library (TSV con JSON, gzip o no).
+
+    Genera (tipo, clave, linea) sin decodificar el JSON, para que el
+    filtrado barato se haga antes de json.loads.
+    """
+    abrir = gzip.open if ruta.endswith('.gz') else open
+    with abrir(ruta, 'rt', encoding='utf-8') as archivo:
+        for linea in archivo:
+            partes = linea.split('\t', 4)
+            if len(partes) == 5:
+                yield partes[0], partes[1], partes[4]
+
+
+def filtrar_ediciones(registros, isbns):
+    """Ediciones cuyo ISBN-10 o ISBN-13 está en ``isbns``: (isbn, datos)."""
+    for tipo, _clave, contenido in registros:
+        if tipo != '/type/edition' or '"isbn_' not in contenido:
+            continue
+        datos = json.loads(contenido)
+        for isbn in (datos.get('isbn_13') or []) + (datos.get('isbn_10') or []):
+            isbn = normalizar_isbn(isbn)
+            if isbn in isbns:
+                yield isbn, datos
+                break
+
+
+def filtrar_por_clave(registros, tipo_buscado, claves):
+    """Registros de un tipo cuya clave está en ``claves``: (clave, datos)."""
+    for tipo, clave, contenido in registros:
+        if tipo == tipo_buscado and clave in claves:
+            yield clave, json.loads(contenido)
+
+
+class BibliotecaOpenLibraryDump(models.AbstractModel):
+    _name = 'biblioteca.openlibrary.dump'
+    _description = 'Importación desde los dumps de Open Library'
+
+    @api.model
+    def _importar(self, ruta_ediciones, ruta_works=None, ruta_autores=None,
+                 isbns=None, tamano_lote=1000):
+        """Completa el catálogo desde los dumps, sin usar la red.
+
+        Se enriquecen los libros existentes con ISBN y, si se pasa ``isbns``,
+        se crean los libros que aún no existan. Cada archivo se lee una sola
+        vez y en memoria solo se guardan los registros que coinciden con el
+        catálogo. Lee rutas del servidor, así que solo se usa desde odoo shell:
+        ``env['biblioteca.openlibrary.dump']._importar('/datos/ol_dump_editions.txt.gz')``.
+        """
+        Libro = self.env['biblioteca.libro']
+        inicio = time.perf_counter()
+
+        # 1. ISBN del catálogo -> id del libro
+        self.env.cr.execute("SELECT id, isbn FROM biblioteca_libro WHERE isbn IS NOT NULL")
+        libro_por_isbn = {normalizar_isbn(isbn): libro_id for libro_id, isbn in self.env.cr.fetchall()}
+        buscados = set(libro_por_isbn)
+        buscados.update(normalizar_isbn(isbn) for isbn in isbns or [])
+        buscados.discard('')
+
+        # 2. Índice ISBN -> edición
+        ediciones = {}
+        for isbn, datos in filtrar_ediciones(leer_dump(ruta_ediciones), buscados):
+            ediciones.setdefault(isbn, datos)
+        _logger.info("Dump de ediciones: %s de %s ISBN encontrados", len(ediciones), len(buscados))
+
+        # 3. Works y autores referenciados
+        work_keys = set()
+        autor_keys = set()
+        for datos in ediciones.values():
+            works = datos.get('works') or []
+            if works and works[0].get('key'):
+                work_keys.add(works[0]['key'])
+            autores = datos.get('authors') or []
+            if autores and autores[0].get('key'):
+                autor_keys.add(autores[0]['key'])
+
+        works = {}
+        if ruta_works and work_keys:
+            works = dict(filtrar_por_clave(leer_dump(ruta_works), '/type/work', work_keys))
+        nombres_autor = {}
+        if ruta_autores and autor_keys:
+            for clave, datos in filtrar_por_clave(leer_dump(ruta_autores), '/type/author', autor_keys):
+                if datos.get('name'):
+                    nombres_autor[clave] = datos['name']
+
+        # 4. Escritura por lotes
+        isbns_ordenados = sorted(ediciones)
+        for i in range(0, len(isbns_ordenados), tamano_lote):
+            lote = isbns_ordenados[i:i + tamano_lote]
+            vals_por_isbn = {}
+            for isbn in lote:
+                datos = ediciones[isbn]
+                vals = Libro._vals_desde_edicion(datos)
+                if vals.get('openlibrary_key'):
+                    vals.update(Libro._vals_desde_work(works.get(vals['openlibrary_key'])))
+                autores = datos.get('authors') or []
+                if autores and autores[0].get('key') in nombres_autor:
+                    vals['autor'] = (autores[0]['key'], nombres_autor[autores[0]['key']])
+                vals_por_isbn[isbn] = vals
+
+            autor_ids = self.env['biblioteca.autor'].resolve_or_create(
+                {vals['autor'] for vals in vals_por_isbn.values() if 'autor' in vals})
+            nuevos = []
+            for isbn, vals in vals_por_isbn.items():
+                if 'autor' in vals:
+                    vals['autor'] = autor_ids[vals['autor']]
+                if isbn in libro_por_isbn:
+                    Libro.browse(libro_por_isbn[isbn]).write(vals)
+                else:
+                    nuevos.append(dict(vals, isbn=isbn))
+            if nuevos:
+                Libro.create(nuevos)
+
+            self.env.flush_all()
+            self.env.invalidate_all()
+            _logger.info("Dump: %s/%s libros importados", i + len(lote), len(isbns_ordenados))
+
+        _logger.info("Importación desde dumps terminada en %.1fs", time.perf_counter() - inicio)
+        return len(ediciones)
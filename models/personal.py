@@ -2,6 +2,8 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
+from .cedula import validar_cedula, validar_cedulas
+
 class BibliotecaPersonal(models.Model):
     _name = 'biblioteca.personal'
     _description = 'Personal de la biblioteca'
@@ -65,31 +67,10 @@ class BibliotecaPersonal(models.Model):
 
     @api.constrains('cedula')
     def _check_cedula(self):
-        for record in self:
-            if record.cedula and not self.validar_cedula_ecuador(record.cedula):
-                raise ValidationError(_("La cédula ingresada no es válida."))
+        cedulas = self.filtered('cedula').mapped('cedula')
+        if not all(validar_cedulas(cedulas)):
+            raise ValidationError(_("La cédula ingresada no es válida."))
 
     def validar_cedula_ecuador(self, cedula):
         """Valida cédula ecuatoriana estándar de 10 dígitos."""
-        if not cedula or len(cedula) != 10 or not cedula.isdigit():
-            return False
-
-        provincia = int(cedula[:2])
-        if provincia < 1 or provincia > 24:
-            return False
-
-        tercer_digito = int(cedula[2])
-        if tercer_digito >= 6:
-            return False
-
-        coef = [2, 1, 2, 1, 2, 1, 2, 1, 2]
-        total = 0
-        for i in range(9):
-            valor = int(cedula[i]) * coef[i]
-            if valor >= 10:
-                valor -= 9
-            total += valor
-
-        verificador = int(cedula[9])
-        decena = ((total + 9) // 10) * 10
-        return verificador == (decena - total) % 10
+        return validar_cedula(cedula)
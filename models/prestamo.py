@@ -1,7 +1,14 @@
 # -*- coding: utf-8 -*-
 from odoo import models, fields, api, _
-from odoo.exceptions import ValidationError
+from odoo.exceptions import UserError, ValidationError
+from odoo.tools.sql import create_index
+from .instrumentacion import instrumentar
+from .libro import normalizar_isbn
 from datetime import datetime, timedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
 
 
 class BibliotecaPrestamo(models.Model):
@@ -15,7 +22,7 @@ class BibliotecaPrestamo(models.Model):
     )
 
     fecha_prestamo = fields.Datetime(string='Fecha de préstamo')
-    fecha_max_devolucion = fields.Datetime(string='Fecha máxima de devolución', readonly=True)
+    fecha_max_devolucion = fields.Datetime(string='Fecha máxima de devolución', readonly=True, index=True)
     fecha_devolucion = fields.Datetime(string='Fecha de devolución')
 
     libro_ids = fields.Many2many(
@@ -26,7 +33,26 @@ class BibliotecaPrestamo(models.Model):
         string='Libros'
     )
 
-    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', required=True)
+    # Ejemplares físicos entregados (escaneados o asignados al prestar)
+    ejemplar_ids = fields.Many2many(
+        'biblioteca.ejemplar',
+        'prestamo_ejemplar_rel',
+        'prestamo_id',
+        'ejemplar_id',
+        string='Ejemplares'
+    )
+
+    # Libros ya recibidos de un préstamo que aún no se devolvió entero
+    libro_devuelto_ids = fields.Many2many(
+        'biblioteca.libro',
+        'prestamo_libro_devuelto_rel',
+        'prestamo_id',
+        'libro_id',
+        string='Libros devueltos',
+        readonly=True
+    )
+
+    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', required=True, index=True)
     personal_id = fields.Many2one('biblioteca.personal', string='Personal que presta', required=True)
 
     estado = fields.Selection([
@@ -34,12 +60,26 @@ class BibliotecaPrestamo(models.Model):
         ('prestado', 'Prestado'),
         ('devuelto', 'Devuelto'),
         ('multa', 'Multa')
-    ], string='Estado', default='borrador')
+    ], string='Estado', default='borrador', index=True)
 
     multa_ids = fields.One2many('biblioteca.multa', 'prestamo_id', string='Multas')
     tiene_multa = fields.Boolean(string='¿Tiene multa?', compute="_compute_tiene_multa", store=True)
     multa_total = fields.Float(string='Total multa', compute="_compute_multa_total", store=True)
 
+    def init(self):
+        # Préstamos abiertos por usuario (cuenta del usuario y políticas de préstamo)
+        create_index(
+            self.env.cr, 'biblioteca_prestamo_abiertos_usuario_idx', self._table,
+            ['usuario_id', 'fecha_max_devolucion'],
+            where="estado IN ('prestado', 'multa')",
+        )
+        # Barrido de vencidos: solo préstamos 'prestado' ordenados por fecha límite
+        create_index(
+            self.env.cr, 'biblioteca_prestamo_vencidos_idx', self._table,
+            ['fecha_max_devolucion', 'id'],
+            where="estado = 'prestado'",
+        )
+
 
     @api.depends('multa_ids')
     def _compute_tiene_multa(self):
@@ -58,21 +98,33 @@ class BibliotecaPrestamo(models.Model):
             if r.fecha_prestamo:
                 r.fecha_max_devolucion = r.fecha_prestamo + timedelta(days=15)
 
+    @instrumentar('action_prestar')
     def action_prestar(self):
+        # Políticas de préstamo de todos los usuarios del lote a la vez
+        violaciones = self._verificar_politica()
+        if violaciones:
+            raise ValidationError("\n".join(error for errores in violaciones.values() for error in errores))
+
         for record in self:
+            # Los ejemplares escaneados traen su libro
+            sin_libro = record.ejemplar_ids.libro_id - record.libro_ids
+            if sin_libro:
+                record.libro_ids |= sin_libro
+
             if not record.usuario_id or not record.personal_id or not record.libro_ids:
                 raise ValidationError("Debe asignar un usuario, un personal y al menos un libro.")
 
-            # Validar inventario disponible
-            for libro in record.libro_ids:
-                if libro.ejemplares_disponibles <= 0:
-                    raise ValidationError(
-                        _("No hay ejemplares disponibles del libro: %s") % (libro.name)
-                    )
+            # Las reservas asignadas al usuario se cumplen con este préstamo
+            reservas = self.env['biblioteca.reserva'].search([
+                ('usuario_id', '=', record.usuario_id.id),
+                ('libro_id', 'in', record.libro_ids.ids),
+                ('estado', '=', 'asignada'),
+            ])
+            reservas.write({'estado': 'cumplida'})
 
-            # Descontar inventario
-            for libro in record.libro_ids:
-                libro.ejemplares -= 1
+            # Validar y descontar inventario con un solo UPDATE condicional
+            record.libro_ids._reservar_ejemplares()
+            record._entregar_ejemplares()
 
             # Si la fecha no fue seleccionada, se usa la actual
             if not record.fecha_prestamo:
@@ -81,13 +133,46 @@ class BibliotecaPrestamo(models.Model):
             record.fecha_max_devolucion = record.fecha_prestamo + timedelta(days=15)
             record.estado = 'prestado'
 
+    def _entregar_ejemplares(self):
+        """Marca como prestado un ejemplar físico de cada libro que los tenga.
+
+        Se usan los ejemplares escaneados; para el resto de libros con
+        ejemplares registrados se toma uno disponible.
+        """
+        self.ensure_one()
+        escaneados = self.ejemplar_ids
+        escaneados._verificar_disponibles()
+        if len(escaneados.libro_id) < len(escaneados):
+            raise ValidationError(_("Solo se puede prestar un ejemplar de cada libro."))
+        con_fisicos = self.libro_ids.filtered('ejemplar_ids')
+        faltantes = con_fisicos - escaneados.libro_id
+        tomados = self.env['biblioteca.ejemplar']._tomar_disponibles(faltantes)
+        if len(tomados) < len(faltantes):
+            sin_ejemplar = faltantes - tomados.libro_id
+            raise ValidationError(
+                _("No hay ejemplares disponibles del libro: %s. Puede registrar una reserva.")
+                % ", ".join(sin_ejemplar.mapped("name"))
+            )
+        entregados = escaneados | tomados
+        if entregados:
+            entregados.write({'estado': 'prestado', 'prestamo_id': self.id})
+            self.ejemplar_ids = [(6, 0, entregados.ids)]
+
+    def _verificar_politica(self):
+        """Devuelve {usuario_id: [violaciones]} para prestar estos préstamos."""
+        pendientes = self.filtered(lambda p: p.usuario_id and p.estado == 'borrador')
+        nuevos = {}
+        for prestamo in pendientes:
+            nuevos[prestamo.usuario_id.id] = nuevos.get(prestamo.usuario_id.id, 0) + 1
+        return pendientes.usuario_id.verificar_politica_prestamo(nuevos)
+
+    @instrumentar('action_devolver')
     def action_devolver(self):
+        # Los ejemplares devueltos pasan a las reservas en espera, en lote
+        libros = self.libro_ids
         for record in self:
 
-            # Devolver inventario
-            for libro in record.libro_ids:
-                libro.ejemplares += 1
-
+            # El inventario se libera al registrar la devolución (contadores)
             record.fecha_devolucion = datetime.now()
 
             # Crear multa automática si corresponde
@@ -99,18 +184,171 @@ class BibliotecaPrestamo(models.Model):
             else:
                 record.estado = 'devuelto'
 
+        # Los ejemplares físicos vuelven a estar disponibles, con un solo write
+        self.ejemplar_ids.filtered(lambda e: e.prestamo_id in self).write({
+            'estado': 'disponible',
+            'prestamo_id': False,
+        })
+
+        self.env['biblioteca.reserva']._asignar_reservas(libros)
+
  
+    # -----------------------------
+    # PRÉSTAMOS Y DEVOLUCIONES EN LOTE (kioscos)
+    # -----------------------------
+    @api.model
+    def prestar_en_lote(self, pedidos, personal_id):
+        """Crea y presta un préstamo por pedido.
+
+        ``pedidos`` es una lista de {'cedula': ..., 'isbns': [...]}. Usuarios
+        y libros se buscan una sola vez para todo el lote y el inventario se
+        valida en memoria antes de tocar la base; cada pedido se procesa en
+        su propio savepoint. Devuelve un resultado por pedido.
+        """
+        Libro = self.env['biblioteca.libro']
+        cedulas = {pedido.get('cedula') for pedido in pedidos}
+        usuarios = {u.cedula: u for u in self.env['biblioteca.usuarios'].search([('cedula', 'in', list(cedulas))])}
+        libros = Libro.buscar_por_isbns(isbn for pedido in pedidos for isbn in pedido.get('isbns') or [])
+        disponibles = {libro.id: libro.ejemplares_disponibles
+                       for libro in Libro.union(*libros.values())}
+        # Los ejemplares apartados para el propio lector no cuentan como agotados
+        asignadas = self.env['biblioteca.reserva']._read_group(
+            [('usuario_id', 'in', [u.id for u in usuarios.values()]),
+             ('libro_id', 'in', [libro.id for libro in libros.values()]),
+             ('estado', '=', 'asignada')],
+            ['usuario_id', 'libro_id'], ['__count'],
+        )
+        propias = {(usuario.id, libro.id): cantidad for usuario, libro, cantidad in asignadas}
+
+        resultados = []
+        for pedido in pedidos:
+            resultado = {'cedula': pedido.get('cedula'), 'isbns': pedido.get('isbns') or []}
+            resultados.append(resultado)
+            usuario = usuarios.get(pedido.get('cedula'))
+            isbns = [normalizar_isbn(isbn) for isbn in resultado['isbns']]
+            desconocidos = [isbn for isbn in isbns if isbn not in libros]
+            agotados = [isbn for isbn in isbns if isbn in libros and usuario
+                        and disponibles[libros[isbn].id] + propias.get((usuario.id, libros[isbn].id), 0) <= 0]
+            if not usuario:
+                resultado['error'] = _("Usuario no encontrado.")
+            elif not isbns:
+                resultado['error'] = _("Debe indicar al menos un libro.")
+            elif desconocidos:
+                resultado['error'] = _("ISBN no encontrado: %s") % ", ".join(desconocidos)
+            elif agotados:
+                resultado['error'] = _("No hay ejemplares disponibles: %s") % ", ".join(agotados)
+            if 'error' in resultado:
+                resultado['ok'] = False
+                continue
+
+            try:
+                with self.env.cr.savepoint():
+                    prestamo = self.create({
+                        'usuario_id': usuario.id,
+                        'personal_id': personal_id,
+                        'libro_ids': [(6, 0, [libros[isbn].id for isbn in isbns])],
+                    })
+                    prestamo.action_prestar()
+            except (ValidationError, UserError) as error:
+                resultado.update(ok=False, error=str(error))
+                continue
+            for isbn in isbns:
+                clave = (usuario.id, libros[isbn].id)
+                if propias.get(clave):
+                    propias[clave] -= 1
+                else:
+                    disponibles[libros[isbn].id] -= 1
+            resultado.update(ok=True, prestamo_id=prestamo.id, prestamo=prestamo.name,
+                             fecha_max_devolucion=fields.Datetime.to_string(prestamo.fecha_max_devolucion))
+        return resultados
+
+    @api.model
+    def devolver_en_lote(self, devoluciones):
+        """Registra devoluciones por ISBN.
+
+        ``devoluciones`` es una lista de {'cedula': ..., 'isbns': [...]}. Los
+        préstamos abiertos se buscan con una sola consulta. Cada libro
+        recibido se anota en su préstamo, que se devuelve cuando están todos
+        sus libros; si faltan, el resultado es 'parcial' con los ISBN
+        pendientes. Devuelve un resultado por ISBN.
+        """
+        Libro = self.env['biblioteca.libro']
+        cedulas = {devolucion.get('cedula') for devolucion in devoluciones}
+        usuarios = {u.cedula: u for u in self.env['biblioteca.usuarios'].search([('cedula', 'in', list(cedulas))])}
+        libros = Libro.buscar_por_isbns(isbn for devolucion in devoluciones for isbn in devolucion.get('isbns') or [])
+
+        abiertos = self.search([
+            ('usuario_id', 'in', [u.id for u in usuarios.values()]),
+            ('libro_ids', 'in', [libro.id for libro in libros.values()]),
+            ('estado', 'in', ('prestado', 'multa')),
+            ('fecha_devolucion', '=', False),
+        ], order='fecha_prestamo, id')
+        por_usuario_libro = {}
+        for prestamo in abiertos:
+            for libro in prestamo.libro_ids - prestamo.libro_devuelto_ids:
+                por_usuario_libro.setdefault((prestamo.usuario_id.id, libro.id), []).append(prestamo)
+
+        resultados = []
+        recibidos = {}
+        for devolucion in devoluciones:
+            usuario = usuarios.get(devolucion.get('cedula'))
+            for isbn in devolucion.get('isbns') or []:
+                resultado = {'cedula': devolucion.get('cedula'), 'isbn': isbn}
+                resultados.append(resultado)
+                libro = libros.get(normalizar_isbn(isbn))
+                # Cada libro recibido cierra un solo préstamo, el más antiguo
+                pendientes = usuario and libro and por_usuario_libro.get((usuario.id, libro.id))
+                prestamo = pendientes and pendientes.pop(0)
+                if not prestamo:
+                    resultado.update(ok=False, error=_("No hay un préstamo abierto para este libro."))
+                    continue
+                recibidos.setdefault(prestamo, Libro)
+                recibidos[prestamo] |= libro
+                resultado.update(ok=True, prestamo_id=prestamo.id, prestamo=prestamo.name)
+
+        completos = self.browse()
+        parciales = self.browse()
+        for prestamo, libros_recibidos in recibidos.items():
+            prestamo.libro_devuelto_ids |= libros_recibidos
+            if prestamo.libro_ids <= prestamo.libro_devuelto_ids:
+                completos |= prestamo
+            else:
+                parciales |= prestamo
+        completos.action_devolver()
+        parciales._recibir_libros()
+
+        for resultado in resultados:
+            if resultado['ok']:
+                prestamo = self.browse(resultado['prestamo_id'])
+                if prestamo in parciales:
+                    resultado['estado'] = 'parcial'
+                    resultado['pendientes'] = (prestamo.libro_ids - prestamo.libro_devuelto_ids).mapped('isbn')
+                else:
+                    resultado['estado'] = prestamo.estado
+        return resultados
+
+    def _recibir_libros(self):
+        """Libera los ejemplares de los libros recibidos de préstamos que siguen abiertos."""
+        self.ejemplar_ids.filtered(
+            lambda e: e.prestamo_id in self and e.libro_id in e.prestamo_id.libro_devuelto_ids
+        ).write({'estado': 'disponible', 'prestamo_id': False})
+        self.env['biblioteca.reserva']._asignar_reservas(self.libro_devuelto_ids)
+
     def _generar_multa_retraso(self):
         for record in self:
 
             if not record.fecha_max_devolucion:
-                return
+                continue
+
+            # El barrido de vencidos ya la creó: su valor se recalcula con la devolución
+            if any(multa.tipo == 'retraso' for multa in record.multa_ids):
+                continue
 
             fecha_ref = record.fecha_devolucion or fields.Datetime.now()
             retraso_dias = (fecha_ref - record.fecha_max_devolucion).days
 
             if retraso_dias <= 0:
-                return
+                continue
 
             # Crear multa por retraso
             self.env['biblioteca.multa'].create({
@@ -119,3 +357,71 @@ class BibliotecaPrestamo(models.Model):
                 'tipo': 'retraso',
                 'descripcion': 'Multa automática por retraso (%s días)' % retraso_dias,
             })
+
+    # -----------------------------
+    # CRON: PRÉSTAMOS VENCIDOS
+    # -----------------------------
+    @api.model
+    @instrumentar('verificar_vencidos')
+    def verificar_vencidos(self, tamano_lote=1000, limite_segundos=600):
+        """Genera multas de retraso para los préstamos vencidos.
+
+        Recorre los préstamos en estado 'prestado' con fecha máxima de
+        devolución pasada, por lotes ordenados por id. Cada lote se confirma
+        por separado y el último id procesado se guarda en un parámetro del
+        sistema, de modo que si el cron se corta la siguiente ejecución
+        continúa desde ese punto.
+        """
+        Parametros = self.env['ir.config_parameter'].sudo()
+        clave_cursor = 'biblioteca.verificar_vencidos.ultimo_id'
+        ultimo_id = int(Parametros.get_param(clave_cursor, 0))
+        ahora = fields.Datetime.now()
+        inicio = time.perf_counter()
+        total = 0
+
+        while True:
+            t_lote = time.perf_counter()
+            lote = self.search([
+                ('estado', '=', 'prestado'),
+                ('fecha_max_devolucion', '<', ahora),
+                ('id', '>', ultimo_id),
+            ], order='id', limit=tamano_lote)
+            if not lote:
+                # Recorrido completo: la próxima ejecución empieza de cero
+                Parametros.set_param(clave_cursor, 0)
+                break
+
+            lote._crear_multas_retraso(ahora)
+            ultimo_id = lote[-1].id
+            Parametros.set_param(clave_cursor, ultimo_id)
+            self.env.cr.commit()
+
+            total += len(lote)
+            duracion = time.perf_counter() - t_lote
+            _logger.info(
+                "verificar_vencidos: lote de %s préstamos en %.3fs (%.0f filas/s)",
+                len(lote), duracion, len(lote) / duracion if duracion else 0,
+            )
+            if time.perf_counter() - inicio > limite_segundos:
+                _logger.info("verificar_vencidos: tiempo agotado, se continúa desde id %s", ultimo_id)
+                break
+
+        duracion = time.perf_counter() - inicio
+        _logger.info(
+            "verificar_vencidos: %s préstamos vencidos en %.3fs (%.0f filas/s)",
+            total, duracion, total / duracion if duracion else 0,
+        )
+        return total
+
+    def _crear_multas_retraso(self, fecha_ref):
+        """Crea en lote las multas de retraso de los préstamos."""
+        vals_list = []
+        for record in self:
+            retraso_dias = (fecha_ref - record.fecha_max_devolucion).days
+            vals_list.append({
+                'usuario_id': record.usuario_id.id,
+                'prestamo_id': record.id,
+                'tipo': 'retraso',
+                'descripcion': 'Multa automática por retraso (%s días)' % max(retraso_dias, 1),
+            })
+        return self.env['biblioteca.multa'].create_batch(vals_list, fecha_ref=fecha_ref)
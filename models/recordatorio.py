@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api, _
+from datetime import timedelta
+import logging
+import time
+
+_logger = logging.getLogger(__name__)
+
+
+class BibliotecaRecordatorio(models.Model):
+    _name = 'biblioteca.recordatorio'
+    _description = 'Cola de recordatorios de devolución'
+    _order = 'id desc'
+
+    clave = fields.Char(string='Clave', required=True, readonly=True)
+    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', required=True, readonly=True,
+                                 index=True, ondelete='cascade')
+    correo = fields.Char(string='Correo', required=True, readonly=True)
+    asunto = fields.Char(string='Asunto', readonly=True)
+    cuerpo = fields.Text(string='Mensaje', readonly=True)
+    prestamos = fields.Integer(string='Préstamos', readonly=True)
+    estado = fields.Selection([
+        ('pendiente', 'Pendiente'),
+        ('enviando', 'Enviando'),
+        ('enviado', 'Enviado'),
+        ('error', 'Error'),
+    ], string='Estado', default='pendiente', required=True, readonly=True)
+    intentos = fields.Integer(string='Intentos', readonly=True)
+    error = fields.Text(string='Último error', readonly=True)
+    fecha_envio = fields.Datetime(string='Fecha de envío', readonly=True)
+
+    # Un recordatorio por usuario y día: volver a encolar no duplica
+    _sql_constraints = [
+        ('clave_unique', 'unique(clave)', 'El recordatorio ya está en la cola.'),
+    ]
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS biblioteca_recordatorio_pendientes_idx
+                ON biblioteca_recordatorio (id)
+             WHERE estado = 'pendiente'
+        """)
+
+    def _parametro(self, nombre, defecto):
+        return self.env['ir.config_parameter'].sudo().get_param('biblioteca.recordatorio.%s' % nombre, defecto)
+
+    # -----------------------------
+    # ENCOLAR
+    # -----------------------------
+    @api.model
+    def encolar(self, hoy=None):
+        """Encola un resumen por usuario con sus préstamos por vencer o vencidos.
+
+        Con una sola consulta se toman los préstamos abiertos que vencen
+        dentro de ``dias_aviso`` días y los vencidos, estos cada
+        ``frecuencia_vencidos`` días a partir del día siguiente al
+        vencimiento. La clave usuario + día hace que volver a ejecutarlo el
+        mismo día no encole nada nuevo.
+        """
+        hoy = hoy or fields.Date.context_today(self)
+        dias_aviso = int(self._parametro('dias_aviso', 2))
+        frecuencia = max(int(self._parametro('frecuencia_vencidos', 7)), 1)
+
+        self.env['biblioteca.prestamo'].flush_model()
+        self.env['biblioteca.usuarios'].flush_model(['correo', 'nombre_completo'])
+        self.env.cr.execute("""
+            SELECT p.usuario_id, u.correo, u.nombre_completo, p.name,
+                   p.fecha_max_devolucion::date AS vence,
+                   string_agg(l.name, ', ' ORDER BY l.name)
+              FROM biblioteca_prestamo p
+              JOIN biblioteca_usuarios u ON u.id = p.usuario_id
+         LEFT JOIN prestamo_libro_rel rel ON rel.prestamo_id = p.id
+         LEFT JOIN biblioteca_libro l ON l.id = rel.libro_id
+             WHERE p.estado IN ('prestado', 'multa')
+               AND p.fecha_devolucion IS NULL
+               AND coalesce(u.correo, '') != ''
+               AND (p.fecha_max_devolucion::date = %(aviso)s
+                    OR (p.fecha_max_devolucion::date < %(hoy)s
+                        AND (%(hoy)s - p.fecha_max_devolucion::date - 1) %% %(frecuencia)s = 0))
+          GROUP BY p.id, u.id
+          ORDER BY p.usuario_id, p.fecha_max_devolucion
+        """, {'hoy': hoy, 'aviso': hoy + timedelta(days=dias_aviso), 'frecuencia': frecuencia})
+
+        por_usuario = {}
+        for usuario_id, correo, nombre, prestamo, vence, libros in self.env.cr.fetchall():
+            datos = por_usuario.setdefault(usuario_id, {'correo': correo, 'nombre': nombre, 'lineas': []})
+            if vence < hoy:
+                linea = _("%s (%s): vencido desde el %s") % (prestamo, libros or '', vence)
+            else:
+                linea = _("%s (%s): vence el %s") % (prestamo, libros or '', vence)
+            datos['lineas'].append(linea)
+        if not por_usuario:
+            return 0
+
+        filas = [(
+            '%s:%s' % (usuario_id, hoy),
+            usuario_id,
+            datos['correo'],
+            _("Recordatorio de devolución de libros"),
+            _("Hola %s,\n\nTe recordamos tus préstamos pendientes de devolución:\n\n%s\n\nGracias.")
+            % (datos['nombre'], "\n".join("- %s" % linea for linea in datos['lineas'])),
+            len(datos['lineas']),
+        ) for usuario_id, datos in por_usuario.items()]
+        self.env.cr.execute("""
+            INSERT INTO biblioteca_recordatorio (clave, usuario_id, correo, asunto, cuerpo, prestamos,
+                                                 estado, intentos, create_uid, create_date, write_uid, write_date)
+            SELECT clave, usuario_id, correo, asunto, cuerpo, prestamos, 'pendiente', 0,
+                   %(uid)s, now() AT TIME ZONE 'UTC', %(uid)s, now() AT TIME ZONE 'UTC'
+              FROM unnest(%(claves)s::varchar[], %(usuarios)s::int[], %(correos)s::varchar[],
+                          %(asuntos)s::varchar[], %(cuerpos)s::text[], %(prestamos)s::int[])
+                   AS t(clave, usuario_id, correo, asunto, cuerpo, prestamos)
+            ON CONFLICT (clave) DO NOTHING
+        """, {
+            'claves': [fila[0] for fila in filas],
+            'usuarios': [fila[1] for fila in filas],
+            'correos': [fila[2] for fila in filas],
+            'asuntos': [fila[3] for fila in filas],
+            'cuerpos': [fila[4] for fila in filas],
+            'prestamos': [fila[5] for fila in filas],
+            'uid': self.env.uid,
+        })
+        encolados = self.env.cr.rowcount
+        _logger.info("Recordatorios: %s encolados (%s usuarios con préstamos por vencer o vencidos)",
+                     encolados, len(por_usuario))
+        return encolados
+
+    # -----------------------------
+    # ENVIAR
+    # -----------------------------
+    @api.model
+    def enviar_pendientes(self, tamano_lote=50, limite_segundos=240, mail_server_id=None):
+        """Envía la cola respetando ``por_minuto`` mensajes por minuto.
+
+        Cada lote se marca como 'enviando' y se confirma antes de enviar,
+        así dos ejecuciones no toman los mismos mensajes y un corte a mitad
+        de lote no los vuelve a enviar (quedan en 'enviando' para revisión).
+        Todo el lote usa una sola conexión SMTP.
+        """
+        IrMailServer = self.env['ir.mail_server'].sudo()
+        por_minuto = max(int(self._parametro('por_minuto', 60)), 1)
+        max_intentos = int(self._parametro('max_intentos', 3))
+        remitente = self._parametro('remitente', False) or IrMailServer._get_default_from_address()
+        pausa = 60.0 / por_minuto
+        inicio = time.perf_counter()
+        enviados = 0
+
+        while time.perf_counter() - inicio < limite_segundos:
+            self.env.cr.execute("""
+                UPDATE biblioteca_recordatorio
+                   SET estado = 'enviando', write_date = now() AT TIME ZONE 'UTC'
+                 WHERE id IN (
+                    SELECT id FROM biblioteca_recordatorio
+                     WHERE estado = 'pendiente'
+                  ORDER BY id
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED
+                 )
+             RETURNING id
+            """, [tamano_lote])
+            lote = self.browse(sorted(fila[0] for fila in self.env.cr.fetchall()))
+            self.env.cr.commit()
+            if not lote:
+                break
+
+            try:
+                smtp = IrMailServer._connect__(mail_server_id=mail_server_id)
+            except Exception as error:
+                # Sin servidor no se envió nada: el lote vuelve a la cola
+                _logger.warning("Recordatorios: no se pudo conectar al servidor de correo: %s", error)
+                lote.write({'estado': 'pendiente', 'error': str(error)})
+                self.env.cr.commit()
+                break
+            try:
+                for recordatorio in lote:
+                    t_envio = time.perf_counter()
+                    try:
+                        mensaje = IrMailServer.build_email(
+                            email_from=remitente,
+                            email_to=[recordatorio.correo],
+                            subject=recordatorio.asunto,
+                            body=recordatorio.cuerpo,
+                        )
+                        IrMailServer.send_email(mensaje, mail_server_id=mail_server_id, smtp_session=smtp)
+                    except Exception as error:
+                        _logger.warning("Recordatorio %s no enviado: %s", recordatorio.id, error)
+                        intentos = recordatorio.intentos + 1
+                        recordatorio.write({
+                            'estado': 'error' if intentos >= max_intentos else 'pendiente',
+                            'intentos': intentos,
+                            'error': str(error),
+                        })
+                    else:
+                        recordatorio.write({
+                            'estado': 'enviado',
+                            'intentos': recordatorio.intentos + 1,
+                            'fecha_envio': fields.Datetime.now(),
+                            'error': False,
+                        })
+                        enviados += 1
+                    espera = pausa - (time.perf_counter() - t_envio)
+                    if espera > 0:
+                        time.sleep(espera)
+            finally:
+                smtp.quit()
+                self.env.cr.commit()
+
+        _logger.info("Recordatorios: %s enviados en %.1fs", enviados, time.perf_counter() - inicio)
+        return enviados
+
+    def action_reintentar(self):
+        self.filtered(lambda r: r.estado in ('error', 'enviando')).write({'estado': 'pendiente', 'intentos': 0})
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools.sql import drop_view_if_exists
+
+# Importa antes los modelos del archivo: sus tablas deben existir al crear las vistas
+from .archivo import ESTADOS_PRESTAMO
+
+# Los ids de los reportes se arman con las claves de cada fila, sin funciones
+# de ventana, para que los filtros lleguen a las tablas y cada fila conserve
+# su id. Con los factores usados caben en los 53 bits que maneja el cliente
+# web mientras haya menos de 2^24 libros, 2^14 personas de personal y 2^29
+# préstamos.
+FACTOR_LIBRO = 2 ** 24
+FACTOR_PERSONAL = 2 ** 38
+
+
+class BibliotecaReportePrestamo(models.Model):
+    _name = 'biblioteca.reporte.prestamo'
+    _description = 'Análisis de préstamos por libro'
+    _auto = False
+    _order = 'fecha_prestamo desc'
+
+    fecha_prestamo = fields.Datetime(string='Fecha de préstamo', readonly=True)
+    libro_id = fields.Many2one('biblioteca.libro', string='Libro', readonly=True)
+    autor_id = fields.Many2one('biblioteca.autor', string='Autor', readonly=True)
+    categoria = fields.Char(string='Categoría', readonly=True)
+    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', readonly=True)
+    personal_id = fields.Many2one('biblioteca.personal', string='Personal', readonly=True)
+    estado = fields.Selection(ESTADOS_PRESTAMO, string='Estado', readonly=True)
+    dias_prestado = fields.Float(string='Días prestado', aggregator='avg', readonly=True)
+    archivado = fields.Boolean(string='Archivado', readonly=True)
+
+    def init(self):
+        # Una fila por libro de cada préstamo, activo o archivado. Los préstamos
+        # archivados conservan su id original, así que los ids no se repiten.
+        drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW biblioteca_reporte_prestamo AS (
+                SELECT rel.prestamo_id::bigint * %(libro)s + rel.libro_id AS id,
+                       p.fecha_prestamo,
+                       rel.libro_id,
+                       l.autor AS autor_id,
+                       l.categoria,
+                       p.usuario_id,
+                       p.personal_id,
+                       p.estado,
+                       EXTRACT(EPOCH FROM (COALESCE(p.fecha_devolucion, now() AT TIME ZONE 'UTC')
+                                           - p.fecha_prestamo)) / 86400 AS dias_prestado,
+                       false AS archivado
+                  FROM prestamo_libro_rel rel
+                  JOIN biblioteca_prestamo p ON p.id = rel.prestamo_id
+                  JOIN biblioteca_libro l ON l.id = rel.libro_id
+                 WHERE p.estado != 'borrador'
+             UNION ALL
+                SELECT a.prestamo_original_id::bigint * %(libro)s + rel.libro_id,
+                       a.fecha_prestamo,
+                       rel.libro_id,
+                       l.autor,
+                       l.categoria,
+                       a.usuario_id,
+                       a.personal_id,
+                       a.estado,
+                       EXTRACT(EPOCH FROM (a.fecha_devolucion - a.fecha_prestamo)) / 86400,
+                       true
+                  FROM prestamo_archivo_libro_rel rel
+                  JOIN biblioteca_prestamo_archivo a ON a.id = rel.prestamo_archivo_id
+                  JOIN biblioteca_libro l ON l.id = rel.libro_id
+            )
+        """, {'libro': FACTOR_LIBRO})
+
+
+class BibliotecaReporteMulta(models.Model):
+    _name = 'biblioteca.reporte.multa'
+    _description = 'Análisis de multas'
+    _auto = False
+    _order = 'fecha desc'
+
+    fecha = fields.Datetime(string='Fecha de multa', readonly=True)
+    tipo = fields.Selection(lambda self: self.env['biblioteca.multa'].TIPO_MULTA, string='Tipo de multa', readonly=True)
+    valor = fields.Float(string='Valor', readonly=True)
+    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', readonly=True)
+    prestamo_id = fields.Many2one('biblioteca.prestamo', string='Préstamo', readonly=True)
+    personal_id = fields.Many2one('biblioteca.personal', string='Personal', readonly=True)
+    prestamo_archivo_id = fields.Many2one('biblioteca.prestamo.archivo', string='Préstamo archivado',
+                                          readonly=True)
+    archivado = fields.Boolean(string='Archivado', readonly=True)
+
+    def init(self):
+        # Ids pares para las multas activas e impares para las archivadas
+        drop_view_if_exists(self.env.cr, self._table)
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW biblioteca_reporte_multa AS (
+                SELECT m.id::bigint * 2 AS id,
+                       m.fecha,
+                       m.tipo,
+                       m.valor,
+                       m.usuario_id,
+                       m.prestamo_id,
+                       p.personal_id,
+                       NULL::integer AS prestamo_archivo_id,
+                       false AS archivado
+                  FROM biblioteca_multa m
+                  JOIN biblioteca_prestamo p ON p.id = m.prestamo_id
+             UNION ALL
+                SELECT m.id::bigint * 2 + 1,
+                       m.fecha,
+                       m.tipo,
+                       m.valor,
+                       m.usuario_id,
+                       NULL,
+                       a.personal_id,
+                       a.id,
+                       true
+                  FROM biblioteca_multa_archivo m
+                  JOIN biblioteca_prestamo_archivo a ON a.id = m.prestamo_id
+            )
+        """)
+
+
+class BibliotecaReporteMensual(models.Model):
+    _name = 'biblioteca.reporte.mensual'
+    _description = 'Resumen mensual de préstamos (vista materializada)'
+    _auto = False
+    _order = 'mes desc'
+
+    mes = fields.Date(string='Mes', readonly=True)
+    libro_id = fields.Many2one('biblioteca.libro', string='Libro', readonly=True)
+    personal_id = fields.Many2one('biblioteca.personal', string='Personal', readonly=True)
+    prestamos = fields.Integer(string='Préstamos', readonly=True)
+    usuarios = fields.Integer(string='Usuarios distintos', readonly=True)
+
+    def init(self):
+        self.env.cr.execute("DROP MATERIALIZED VIEW IF EXISTS biblioteca_reporte_mensual")
+        self.env.cr.execute("""
+            CREATE MATERIALIZED VIEW biblioteca_reporte_mensual AS (
+                SELECT (EXTRACT(YEAR FROM mes)::bigint * 12 + EXTRACT(MONTH FROM mes)::bigint - 1) * %(personal)s
+                       + personal_id::bigint * %(libro)s + libro_id AS id,
+                       mes, libro_id, personal_id, prestamos, usuarios
+                  FROM (
+                    SELECT date_trunc('month', fecha_prestamo)::date AS mes,
+                           libro_id,
+                           personal_id,
+                           COUNT(*) AS prestamos,
+                           COUNT(DISTINCT usuario_id) AS usuarios
+                      FROM (
+                        SELECT p.fecha_prestamo, rel.libro_id, p.personal_id, p.usuario_id
+                          FROM prestamo_libro_rel rel
+                          JOIN biblioteca_prestamo p ON p.id = rel.prestamo_id
+                         WHERE p.estado != 'borrador'
+                     UNION ALL
+                        SELECT a.fecha_prestamo, rel.libro_id, a.personal_id, a.usuario_id
+                          FROM prestamo_archivo_libro_rel rel
+                          JOIN biblioteca_prestamo_archivo a ON a.id = rel.prestamo_archivo_id
+                      ) prestamos
+                     WHERE fecha_prestamo IS NOT NULL
+                  GROUP BY 1, 2, 3
+                  ) resumen
+            )
+        """, {'personal': FACTOR_PERSONAL, 'libro': FACTOR_LIBRO})
+        # Clave natural de cada fila; necesaria para REFRESH ... CONCURRENTLY
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX biblioteca_reporte_mensual_clave_uniq
+                ON biblioteca_reporte_mensual (mes, libro_id, personal_id)
+        """)
+        self.env.cr.execute("CREATE INDEX biblioteca_reporte_mensual_id_idx ON biblioteca_reporte_mensual (id)")
+
+    @api.model
+    def _cron_refrescar(self):
+        self.env.cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY biblioteca_reporte_mensual")
+        self.invalidate_model()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+from odoo import models, fields, api
+from odoo.tools.sql import create_index, index_exists
+from datetime import timedelta
+
+
+class BibliotecaReserva(models.Model):
+    _name = 'biblioteca.reserva'
+    _description = 'Reservas de libros sin ejemplares disponibles'
+    _order = 'fecha, id'
+
+    libro_id = fields.Many2one('biblioteca.libro', string='Libro', required=True, index=True)
+    usuario_id = fields.Many2one('biblioteca.usuarios', string='Usuario', required=True, index=True)
+    fecha = fields.Datetime(string='Fecha de reserva', default=fields.Datetime.now, required=True)
+
+    estado = fields.Selection([
+        ('espera', 'En espera'),
+        ('asignada', 'Ejemplar asignado'),
+        ('cumplida', 'Cumplida'),
+        ('vencida', 'Vencida'),
+        ('cancelada', 'Cancelada'),
+    ], string='Estado', default='espera', required=True)
+
+    fecha_asignacion = fields.Datetime(string='Fecha de asignación', readonly=True)
+    fecha_limite_retiro = fields.Datetime(string='Retirar hasta', readonly=True)
+
+    def init(self):
+        # Siguiente en la cola de cada libro
+        create_index(
+            self.env.cr, 'biblioteca_reserva_cola_idx', self._table,
+            ['libro_id', 'fecha', 'id'],
+            where="estado = 'espera'",
+        )
+        # Una sola reserva activa por usuario y libro
+        if not index_exists(self.env.cr, 'biblioteca_reserva_activa_uniq'):
+            self.env.cr.execute("""
+                CREATE UNIQUE INDEX biblioteca_reserva_activa_uniq
+                    ON biblioteca_reserva (libro_id, usuario_id)
+                 WHERE estado IN ('espera', 'asignada')
+            """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        reservas = super().create(vals_list)
+        # Si ya hay ejemplares libres la reserva se asigna al momento
+        self._asignar_reservas(reservas.libro_id)
+        return reservas
+
+    def action_cancelar(self):
+        libros = self.filtered(lambda r: r.estado == 'asignada').libro_id
+        self.filtered(lambda r: r.estado in ('espera', 'asignada')).write({'estado': 'cancelada'})
+        # El ejemplar que tenía asignado pasa al siguiente de la cola
+        self._asignar_reservas(libros)
+
+    @api.model
+    def _asignar_reservas(self, libros):
+        """Asigna los ejemplares libres de ``libros`` a las reservas en espera.
+
+        Por cada libro se toman, en orden de llegada, tantas reservas como
+        ejemplares disponibles tenga, con una sola consulta para todos los
+        libros y un solo write para todas las reservas asignadas.
+        """
+        if not libros:
+            return self.browse()
+        libros.flush_recordset(['ejemplares_disponibles'])
+        self.flush_model(['libro_id', 'estado', 'fecha'])
+        self.env.cr.execute("""
+            SELECT id
+              FROM (
+                SELECT r.id,
+                       row_number() OVER (PARTITION BY r.libro_id ORDER BY r.fecha, r.id) AS puesto,
+                       l.ejemplares_disponibles
+                  FROM biblioteca_reserva r
+                  JOIN biblioteca_libro l ON l.id = r.libro_id
+                 WHERE r.estado = 'espera'
+                   AND r.libro_id IN %s
+                   AND l.ejemplares_disponibles > 0
+              ) cola
+             WHERE puesto <= ejemplares_disponibles
+        """, [tuple(libros.ids)])
+        reservas = self.browse([fila[0] for fila in self.env.cr.fetchall()])
+        if reservas:
+            ahora = fields.Datetime.now()
+            dias = int(self.env['ir.config_parameter'].sudo().get_param('biblioteca.reserva.dias_retiro', 3))
+            reservas.write({
+                'estado': 'asignada',
+                'fecha_asignacion': ahora,
+                'fecha_limite_retiro': ahora + timedelta(days=dias),
+            })
+        return reservas
+
+    @api.model
+    def _cron_vencer_reservas(self):
+        """Vence las reservas asignadas que no se retiraron y reasigna esos ejemplares."""
+        vencidas = self.search([
+            ('estado', '=', 'asignada'),
+            ('fecha_limite_retiro', '<', fields.Datetime.now()),
+        ])
+        libros = vencidas.libro_id
+        vencidas.write({'estado': 'vencida'})
+        self._asignar_reservas(libros)
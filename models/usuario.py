@@ -2,6 +2,8 @@
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError
 
+from .cedula import validar_cedula, validar_cedulas
+
 # =============================
 # MODELO: USUARIO
 # =============================
@@ -49,37 +51,122 @@ class BibliotecaUsuario(models.Model):
         string='Multas registradas'
     )
 
+    # -----------------------------
+    # RESUMEN DE CUENTA
+    # -----------------------------
+    prestamos_abiertos = fields.Integer(
+        string='Préstamos abiertos',
+        compute='_compute_resumen_cuenta',
+        store=True
+    )
+
+    prestamos_vencidos = fields.Integer(
+        string='Préstamos vencidos',
+        compute='_compute_resumen_cuenta',
+        store=True
+    )
+
+    total_multas = fields.Float(
+        string='Multas por pagar',
+        compute='_compute_resumen_cuenta',
+        store=True
+    )
+
+    _sql_constraints = [
+        ('cedula_unique', 'unique(cedula)', 'La cédula ya existe.'),
+    ]
+
     # -----------------------------
     # VALIDACIÓN DE CÉDULA
     # -----------------------------
     @api.constrains('cedula')
     def _check_cedula(self):
-        for record in self:
-            if record.cedula and not record.validar_cedula_ecuador(record.cedula):
-                raise ValidationError(_("La cédula ingresada no es válida."))
+        cedulas = self.filtered('cedula').mapped('cedula')
+        if not all(validar_cedulas(cedulas)):
+            raise ValidationError(_("La cédula ingresada no es válida."))
 
     def validar_cedula_ecuador(self, cedula):
         """Valida cédula ecuatoriana de 10 dígitos."""
-        if not cedula or len(cedula) != 10 or not cedula.isdigit():
-            return False
-
-        provincia = int(cedula[:2])
-        if provincia < 1 or provincia > 24:
-            return False
-
-        tercer_digito = int(cedula[2])
-        if tercer_digito >= 6:
-            return False
+        return validar_cedula(cedula)
 
-        coef = [2, 1, 2, 1, 2, 1, 2, 1, 2]
-        total = 0
-
-        for i in range(9):
-            valor = int(cedula[i]) * coef[i]
-            if valor >= 10:
-                valor -= 9
-            total += valor
+    # -----------------------------
+    # CÁLCULO DEL RESUMEN
+    # -----------------------------
+    @api.depends(
+        'prestamo_ids.estado',
+        'prestamo_ids.fecha_devolucion',
+        'prestamo_ids.fecha_max_devolucion',
+        'multa_ids.valor',
+        'multa_ids.pagada',
+    )
+    def _compute_resumen_cuenta(self):
+        """Resumen por usuario con consultas agrupadas, sin leer sus préstamos ni multas."""
+        ids = self._origin.ids
+        Prestamo = self.env['biblioteca.prestamo']
+        abiertos_dominio = [
+            ('usuario_id', 'in', ids),
+            ('estado', 'in', ('prestado', 'multa')),
+            ('fecha_devolucion', '=', False),
+        ]
+        abiertos = dict(Prestamo._read_group(abiertos_dominio, ['usuario_id'], ['__count']))
+        vencidos = dict(Prestamo._read_group(
+            abiertos_dominio + [('fecha_max_devolucion', '<', fields.Datetime.now())],
+            ['usuario_id'], ['__count'],
+        ))
+        multas = dict(self.env['biblioteca.multa']._read_group(
+            [('usuario_id', 'in', ids), ('pagada', '=', False)], ['usuario_id'], ['valor:sum'],
+        ))
+        for record in self:
+            usuario = record._origin
+            record.prestamos_abiertos = abiertos.get(usuario, 0)
+            record.prestamos_vencidos = vencidos.get(usuario, 0)
+            record.total_multas = multas.get(usuario, 0.0)
 
-        verificador = int(cedula[9])
-        decena = ((total + 9) // 10) * 10
-        return verificador == (decena - total) % 10
+    # -----------------------------
+    # POLÍTICA DE PRÉSTAMO
+    # -----------------------------
+    @api.model
+    def _politica_prestamo(self):
+        """Límites configurables en Ajustes > Parámetros del sistema (0 desactiva)."""
+        Parametros = self.env['ir.config_parameter'].sudo()
+        return {
+            'max_prestamos_abiertos': int(Parametros.get_param('biblioteca.politica.max_prestamos_abiertos', 5)),
+            'max_total_multas': float(Parametros.get_param('biblioteca.politica.max_total_multas', 20)),
+            'bloquear_vencidos': Parametros.get_param('biblioteca.politica.bloquear_vencidos', 'True') == 'True',
+        }
+
+    def verificar_politica_prestamo(self, nuevos=None):
+        """Devuelve {usuario_id: [violaciones]} de los usuarios que no pueden prestar.
+
+        ``nuevos`` indica cuántos préstamos se van a abrir por usuario
+        (uno por defecto). Se usan los campos del resumen de cuenta, que
+        se leen con una sola consulta para todo el recordset. Los vencidos
+        se cuentan en el momento: el campo guardado solo se recalcula cuando
+        cambia algún préstamo del usuario y no ve los que vencieron después.
+        """
+        politica = self._politica_prestamo()
+        nuevos = nuevos or {}
+        violaciones = {}
+        vencidos = {}
+        if politica['bloquear_vencidos']:
+            vencidos = dict(self.env['biblioteca.prestamo']._read_group([
+                ('usuario_id', 'in', self._origin.ids),
+                ('estado', 'in', ('prestado', 'multa')),
+                ('fecha_devolucion', '=', False),
+                ('fecha_max_devolucion', '<', fields.Datetime.now()),
+            ], ['usuario_id'], ['__count']))
+        for usuario in self:
+            errores = []
+            abiertos = usuario.prestamos_abiertos + nuevos.get(usuario.id, 1)
+            if politica['max_prestamos_abiertos'] and abiertos > politica['max_prestamos_abiertos']:
+                errores.append(_("%s superaría el máximo de %s préstamos abiertos.")
+                               % (usuario.nombre_completo, politica['max_prestamos_abiertos']))
+            if vencidos.get(usuario._origin):
+                errores.append(_("%s tiene %s préstamos vencidos.")
+                               % (usuario.nombre_completo, vencidos[usuario._origin]))
+            if politica['max_total_multas'] and usuario.total_multas > politica['max_total_multas']:
+                errores.append(_("%s tiene %.2f en multas por pagar (máximo %.2f).")
+                               % (usuario.nombre_completo, usuario.total_multas, politica['max_total_multas']))
+            if errores:
+                violaciones[usuario.id] = errores
+        return violaciones
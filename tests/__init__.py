@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+
+from . import test_prestamo
+from . import test_benchmark
+from . import test_indices
+from . import test_concurrencia
+from . import test_kiosco
+from . import test_cedula
+from . import test_catalogo
+from . import test_openlibrary_dump
+from . import test_reserva
+from . import test_reportes
+from . import test_archivo
+from . import test_instrumentacion
+from . import test_recordatorio
+from . import test_importacion
@@ -0,0 +1,500 @@
+# -*- coding: utf-8 -*-
+"""Generador de datos de carga y benchmark del ciclo de préstamos.
+
+No es un modelo: solo lo usan las pruebas etiquetadas ``biblioteca_benchmark``
+(ver test_benchmark.py), que corren en una transacción que se deshace al final.
+"""
+from odoo import fields, release
+from datetime import timedelta
+import gzip
+import json
+import logging
+import os
+import random
+import time
+
+from ..models.cedula import _COEFICIENTES
+
+_logger = logging.getLogger(__name__)
+
+# Marca de los datos generados (ISBN, cédula de personal y nombres)
+MARCA = 'CARGA'
+
+# Reparto de estados de los préstamos generados
+MEZCLA_ESTADOS = (
+    ('borrador', 0.05),
+    ('prestado', 0.20),
+    ('devuelto', 0.65),
+    ('multa', 0.10),
+)
+
+# Operaciones medidas por el benchmark y cuántos registros toma cada una
+OPERACIONES = {
+    'action_prestar': 100,
+    'action_devolver': 100,
+    '_generar_multa_retraso': 100,
+    '_compute_counters': 1000,
+}
+
+
+def cedula_sintetica(numero):
+    """Cédula válida y única para ``numero`` < 6.000.000 (provincia 24)."""
+    base = '24%d%06d' % (numero // 1000000, numero % 1000000)
+    total = sum(d * c - 9 if d * c >= 10 else d * c
+                for d, c in zip(map(int, base), _COEFICIENTES))
+    return base + str(-total % 10)
+
+
+# -----------------------------
+# GENERADOR DE DATOS
+# -----------------------------
+def generar(env, prestamos=10000, libros=None, usuarios=None, semilla=42, tamano_lote=20000):
+    """Carga por SQL un conjunto de datos reproducible.
+
+    Por defecto hay un libro cada 10 préstamos y un usuario cada 5. Los
+    préstamos siguen ``MEZCLA_ESTADOS`` con fechas de los dos últimos
+    años; los que están en multa llevan su multa de retraso. Al final se
+    recalculan contadores de libros y resúmenes de usuarios con un UPDATE
+    por tabla. La misma semilla produce siempre los mismos datos.
+    """
+    libros = libros or max(prestamos // 10, 1)
+    usuarios = usuarios or max(prestamos // 5, 1)
+    rng = random.Random(semilla)
+    cr = env.cr
+    ahora = fields.Datetime.now()
+    inicio = time.perf_counter()
+    env.flush_all()
+
+    cr.execute("""
+        INSERT INTO biblioteca_personal (nombre, apellido, nombre_completo, codigo, cedula,
+                                         create_uid, create_date, write_uid, write_date)
+        VALUES ('Personal', 'de carga', 'Personal de carga', %(marca)s, %(cedula)s,
+                %(uid)s, %(ahora)s, %(uid)s, %(ahora)s)
+        RETURNING id
+    """, {'marca': MARCA, 'cedula': cedula_sintetica(5999999), 'uid': env.uid, 'ahora': ahora})
+    personal_id = cr.fetchone()[0]
+
+    libro_ids = []
+    for desde in range(0, libros, tamano_lote):
+        numeros = range(desde, min(desde + tamano_lote, libros))
+        cr.execute("""
+            INSERT INTO biblioteca_libro (name, isbn, categoria, ejemplares, state,
+                                          create_uid, create_date, write_uid, write_date)
+            SELECT nombre, isbn, categoria, 0, 'g', %(uid)s, %(ahora)s, %(uid)s, %(ahora)s
+              FROM unnest(%(nombres)s::varchar[], %(isbns)s::varchar[], %(categorias)s::varchar[])
+                   AS t(nombre, isbn, categoria)
+         RETURNING id
+        """, {
+            'nombres': ['Libro de carga %07d' % n for n in numeros],
+            'isbns': ['%s%07d' % (MARCA, n) for n in numeros],
+            'categorias': ['Categoría %d' % rng.randrange(20) for _n in numeros],
+            'uid': env.uid, 'ahora': ahora,
+        })
+        libro_ids += [fila[0] for fila in cr.fetchall()]
+
+    usuario_ids = []
+    for desde in range(0, usuarios, tamano_lote):
+        numeros = range(desde, min(desde + tamano_lote, usuarios))
+        cr.execute("""
+            INSERT INTO biblioteca_usuarios (nombre_completo, cedula, correo, fecha_registro,
+                                             create_uid, create_date, write_uid, write_date)
+            SELECT nombre, cedula, correo, %(ahora)s, %(uid)s, %(ahora)s, %(uid)s, %(ahora)s
+              FROM unnest(%(nombres)s::varchar[], %(cedulas)s::varchar[], %(correos)s::varchar[])
+                   AS t(nombre, cedula, correo)
+         RETURNING id
+        """, {
+            'nombres': ['%s usuario %07d' % (MARCA, n) for n in numeros],
+            'cedulas': [cedula_sintetica(n) for n in numeros],
+            'correos': ['usuario%07d@carga.invalid' % n for n in numeros],
+            'uid': env.uid, 'ahora': ahora,
+        })
+        usuario_ids += [fila[0] for fila in cr.fetchall()]
+
+    estados = [estado for estado, _peso in MEZCLA_ESTADOS]
+    pesos = [peso for _estado, peso in MEZCLA_ESTADOS]
+    for desde in range(0, prestamos, tamano_lote):
+        filas = [_prestamo_sintetico(n, rng, estados, pesos, ahora)
+                 for n in range(desde, min(desde + tamano_lote, prestamos))]
+        cr.execute("""
+            INSERT INTO biblioteca_prestamo (name, estado, fecha_prestamo, fecha_max_devolucion,
+                                             fecha_devolucion, usuario_id, personal_id,
+                                             tiene_multa, multa_total,
+                                             create_uid, create_date, write_uid, write_date)
+            SELECT name, estado, inicio, maximo, devolucion, usuario, %(personal)s,
+                   multa > 0, multa, %(uid)s, %(ahora)s, %(uid)s, %(ahora)s
+              FROM unnest(%(nombres)s::varchar[], %(estados)s::varchar[], %(inicios)s::timestamp[],
+                          %(maximos)s::timestamp[], %(devoluciones)s::timestamp[],
+                          %(usuarios)s::int[], %(multas)s::float8[])
+                   AS t(name, estado, inicio, maximo, devolucion, usuario, multa)
+         RETURNING id, name
+        """, {
+            'nombres': [fila['name'] for fila in filas],
+            'estados': [fila['estado'] for fila in filas],
+            'inicios': [fila['fecha_prestamo'] for fila in filas],
+            'maximos': [fila['fecha_max_devolucion'] for fila in filas],
+            'devoluciones': [fila['fecha_devolucion'] for fila in filas],
+            'usuarios': [rng.choice(usuario_ids) for _fila in filas],
+            'multas': [fila['multa'] for fila in filas],
+            'personal': personal_id, 'uid': env.uid, 'ahora': ahora,
+        })
+        ids = dict((name, prestamo_id) for prestamo_id, name in cr.fetchall())
+
+        rel_prestamos, rel_libros = [], []
+        for fila in filas:
+            for libro_id in rng.sample(libro_ids, min(rng.randint(1, 3), len(libro_ids))):
+                rel_prestamos.append(ids[fila['name']])
+                rel_libros.append(libro_id)
+        cr.execute("""
+            INSERT INTO prestamo_libro_rel (prestamo_id, libro_id)
+            SELECT * FROM unnest(%s::int[], %s::int[])
+        """, [rel_prestamos, rel_libros])
+
+        cr.execute("""
+            INSERT INTO biblioteca_multa (usuario_id, prestamo_id, tipo, valor, fecha, descripcion,
+                                          pagada, fecha_pago,
+                                          create_uid, create_date, write_uid, write_date)
+            SELECT p.usuario_id, p.id, 'retraso', p.multa_total,
+                   COALESCE(p.fecha_devolucion, p.fecha_max_devolucion), 'Multa de carga',
+                   -- Cuatro de cada cinco multas de préstamos devueltos ya están pagadas
+                   p.fecha_devolucion IS NOT NULL AND p.id %% 5 != 0,
+                   CASE WHEN p.id %% 5 != 0 THEN p.fecha_devolucion END,
+                   %(uid)s, %(ahora)s, %(uid)s, %(ahora)s
+              FROM biblioteca_prestamo p
+             WHERE p.id IN %(ids)s AND p.multa_total > 0
+        """, {'ids': tuple(ids.values()), 'uid': env.uid, 'ahora': ahora})
+        _logger.info("generar: %s/%s préstamos", desde + len(filas), prestamos)
+
+    _recalcular_agregados(env, ahora)
+    env.invalidate_all()
+    _logger.info("generar: %s libros, %s usuarios y %s préstamos en %.1fs",
+                 libros, usuarios, prestamos, time.perf_counter() - inicio)
+    return {'libros': libros, 'usuarios': usuarios, 'prestamos': prestamos}
+
+
+def _prestamo_sintetico(numero, rng, estados, pesos, ahora):
+    estado = rng.choices(estados, pesos)[0]
+    fila = {
+        'name': 'PREST-%s-%07d' % (MARCA, numero),
+        'estado': estado,
+        'fecha_prestamo': None,
+        'fecha_max_devolucion': None,
+        'fecha_devolucion': None,
+        'multa': 0.0,
+    }
+    if estado == 'borrador':
+        return fila
+    if estado == 'prestado':
+        # Hasta 30 días: aproximadamente la mitad está vencida
+        inicio = ahora - timedelta(days=rng.uniform(0, 30))
+    else:
+        inicio = ahora - timedelta(days=rng.uniform(16, 730))
+    maximo = inicio + timedelta(days=15)
+    fila.update(fecha_prestamo=inicio, fecha_max_devolucion=maximo)
+    if estado == 'devuelto':
+        fila['fecha_devolucion'] = inicio + timedelta(days=rng.uniform(1, 15))
+    elif estado == 'multa':
+        # La mitad ya devolvió el libro con retraso; el resto sigue sin devolverlo
+        if rng.random() < 0.5:
+            fila['fecha_devolucion'] = maximo + timedelta(days=rng.uniform(1, 20))
+        retraso = ((fila['fecha_devolucion'] or ahora) - maximo).days
+        fila['multa'] = 5.0 * max(retraso, 1)
+    return fila
+
+
+def _recalcular_agregados(env, ahora):
+    """Contadores de libros y resúmenes de usuarios de los datos de carga, en SQL."""
+    cr = env.cr
+    # Ejemplares suficientes para los préstamos abiertos más algunos libres
+    cr.execute("""
+        UPDATE biblioteca_libro l
+           SET ejemplares_prestados = COALESCE(c.prestados, 0),
+               ejemplares_en_multa = COALESCE(c.en_multa, 0),
+               ejemplares_reservados = 0,
+               ejemplares = COALESCE(c.prestados, 0) + COALESCE(c.en_multa, 0) + 1 + l.id %% 5,
+               ejemplares_disponibles = 1 + l.id %% 5
+          FROM biblioteca_libro l2
+     LEFT JOIN (
+            SELECT rel.libro_id,
+                   COUNT(*) FILTER (WHERE p.estado = 'prestado') AS prestados,
+                   COUNT(*) FILTER (WHERE p.estado = 'multa') AS en_multa
+              FROM prestamo_libro_rel rel
+              JOIN biblioteca_prestamo p ON p.id = rel.prestamo_id
+             WHERE p.estado IN ('prestado', 'multa')
+               AND p.fecha_devolucion IS NULL
+          GROUP BY rel.libro_id
+          ) c ON c.libro_id = l2.id
+         WHERE l.id = l2.id
+           AND l.isbn LIKE %s
+    """, [MARCA + '%'])
+    cr.execute("""
+        UPDATE biblioteca_usuarios u
+           SET prestamos_abiertos = COALESCE(p.abiertos, 0),
+               prestamos_vencidos = COALESCE(p.vencidos, 0),
+               total_multas = COALESCE(m.total, 0)
+          FROM biblioteca_usuarios u2
+     LEFT JOIN (
+            SELECT usuario_id,
+                   COUNT(*) AS abiertos,
+                   COUNT(*) FILTER (WHERE fecha_max_devolucion < %(ahora)s) AS vencidos
+              FROM biblioteca_prestamo
+             WHERE estado IN ('prestado', 'multa') AND fecha_devolucion IS NULL
+          GROUP BY usuario_id
+          ) p ON p.usuario_id = u2.id
+     LEFT JOIN (
+            SELECT usuario_id, SUM(valor) AS total
+              FROM biblioteca_multa
+             WHERE pagada IS NOT TRUE
+          GROUP BY usuario_id
+          ) m ON m.usuario_id = u2.id
+         WHERE u.id = u2.id
+           AND u.nombre_completo LIKE %(marca)s
+    """, {'ahora': ahora, 'marca': MARCA + ' %'})
+
+
+# Vocabulario del catálogo sintético
+PALABRAS = (
+    'sombra', 'río', 'ciudad', 'memoria', 'silencio', 'viento', 'noche', 'jardín', 'espejo',
+    'laberinto', 'fuego', 'mar', 'tiempo', 'camino', 'piedra', 'luz', 'casa', 'invierno',
+    'history', 'garden', 'shadow', 'river', 'winter', 'city', 'light', 'stone', 'dream',
+    'ocean', 'forest', 'mirror', 'journey', 'secret', 'empire', 'island', 'letters', 'war',
+)
+NOMBRES = ('Ana', 'Luis', 'María', 'Jorge', 'Elena', 'Pablo', 'Rosa', 'Julio', 'Clara', 'Mario')
+APELLIDOS = ('García', 'Borges', 'Cortázar', 'Mistral', 'Vallejo', 'Neruda', 'Storni', 'Rulfo',
+             'Onetti', 'Arguedas', 'Icaza', 'Carpentier', 'Lispector', 'Allende', 'Poniatowska')
+
+
+def generar_catalogo(env, libros=500000, autores=20000, semilla=42, tamano_lote=50000):
+    """Carga por SQL un catálogo de libros con autor, categoría, editorial y resumen.
+
+    Para comparar la búsqueda de catálogo con ``ilike``. ``texto_busqueda``
+    se calcula en el mismo INSERT, igual que lo haría el ORM.
+    """
+    rng = random.Random(semilla)
+    cr = env.cr
+    ahora = fields.Datetime.now()
+    inicio = time.perf_counter()
+    env.flush_all()
+
+    nombres = ['%s %s %s %s' % (MARCA, rng.choice(NOMBRES), rng.choice(APELLIDOS), n) for n in range(autores)]
+    cr.execute("""
+        INSERT INTO biblioteca_autor (name, nombre_normalizado, create_uid, create_date, write_uid, write_date)
+        SELECT nombre, lower(nombre), %(uid)s, %(ahora)s, %(uid)s, %(ahora)s
+          FROM unnest(%(nombres)s::varchar[]) AS t(nombre)
+     RETURNING id, name
+    """, {'nombres': nombres, 'uid': env.uid, 'ahora': ahora})
+    autores_generados = cr.fetchall()
+
+    for desde in range(0, libros, tamano_lote):
+        numeros = range(desde, min(desde + tamano_lote, libros))
+        filas = []
+        for n in numeros:
+            autor_id, autor = rng.choice(autores_generados)
+            filas.append((
+                '%s %s %s' % (rng.choice(PALABRAS).capitalize(), rng.choice(PALABRAS), n),
+                '%sC%07d' % (MARCA, n),
+                autor_id,
+                'Categoría %d' % rng.randrange(20),
+                'Editorial %d' % rng.randrange(200),
+                ' '.join(rng.choice(PALABRAS) for _i in range(12)),
+                autor,
+            ))
+        cr.execute("""
+            INSERT INTO biblioteca_libro (name, isbn, autor, categoria, editorial, description,
+                                          texto_busqueda, ejemplares, ejemplares_disponibles, state,
+                                          create_uid, create_date, write_uid, write_date)
+            SELECT nombre, isbn, autor, categoria, editorial, resumen,
+                   concat_ws(' ', autor_nombre, categoria, editorial, resumen), 1, 1, 'g',
+                   %(uid)s, %(ahora)s, %(uid)s, %(ahora)s
+              FROM unnest(%(nombres)s::varchar[], %(isbns)s::varchar[], %(autores)s::int[],
+                          %(categorias)s::varchar[], %(editoriales)s::varchar[], %(resumenes)s::text[],
+                          %(autor_nombres)s::varchar[])
+                   AS t(nombre, isbn, autor, categoria, editorial, resumen, autor_nombre)
+        """, {
+            'nombres': [fila[0] for fila in filas],
+            'isbns': [fila[1] for fila in filas],
+            'autores': [fila[2] for fila in filas],
+            'categorias': [fila[3] for fila in filas],
+            'editoriales': [fila[4] for fila in filas],
+            'resumenes': [fila[5] for fila in filas],
+            'autor_nombres': [fila[6] for fila in filas],
+            'uid': env.uid, 'ahora': ahora,
+        })
+    cr.execute("ANALYZE biblioteca_libro")
+    cr.execute("ANALYZE biblioteca_autor")
+    env.invalidate_all()
+    _logger.info("generar_catalogo: %s libros y %s autores en %.1fs",
+                 libros, autores, time.perf_counter() - inicio)
+
+
+def escribir_dumps(directorio, ediciones=2000000, semilla=42):
+    """Escribe dumps sintéticos de Open Library (ediciones, works y autores) en gzip.
+
+    Hay un work cada 4 ediciones y un autor cada 10; una de cada 20 líneas
+    de ediciones es una redirección, como en los dumps reales. Devuelve
+    las rutas de los tres archivos.
+    """
+    rng = random.Random(semilla)
+    works, autores = max(ediciones // 4, 1), max(ediciones // 10, 1)
+    rutas = {nombre: os.path.join(directorio, 'ol_dump_%s.txt.gz' % nombre)
+             for nombre in ('editions', 'works', 'authors')}
+
+    def linea(tipo, clave, datos):
+        return '%s\t%s\t1\t2024-01-01T00:00:00\t%s\n' % (tipo, clave, json.dumps(datos))
+
+    with gzip.open(rutas['editions'], 'wt', encoding='utf-8', compresslevel=1) as archivo:
+        for n in range(ediciones):
+            if n % 20 == 19:
+                archivo.write(linea('/type/redirect', '/books/OL%dR' % n, {'location': '/books/OL1M'}))
+                continue
+            archivo.write(linea('/type/edition', '/books/OL%dM' % n, {
+                'title': '%s %s %d' % (rng.choice(PALABRAS).capitalize(), rng.choice(PALABRAS), n),
+                'isbn_13': [isbn_sintetico(n)],
+                'publishers': ['Editorial %d' % rng.randrange(200)],
+                'number_of_pages': rng.randint(80, 900),
+                'publish_date': str(rng.randint(1950, 2024)),
+                'works': [{'key': '/works/OL%dW' % (n % works)}],
+                'authors': [{'key': '/authors/OL%dA' % (n % autores)}],
+            }))
+    with gzip.open(rutas['works'], 'wt', encoding='utf-8', compresslevel=1) as archivo:
+        for n in range(works):
+            archivo.write(linea('/type/work', '/works/OL%dW' % n, {
+                'subjects': ['Categoría %d' % rng.randrange(20)],
+                'description': {'type': '/type/text', 'value': ' '.join(rng.choice(PALABRAS) for _i in range(30))},
+            }))
+    with gzip.open(rutas['authors'], 'wt', encoding='utf-8', compresslevel=1) as archivo:
+        for n in range(autores):
+            archivo.write(linea('/type/author', '/authors/OL%dA' % n, {
+                'name': '%s %s %d' % (rng.choice(NOMBRES), rng.choice(APELLIDOS), n),
+            }))
+    return rutas
+
+
+def isbn_sintetico(numero):
+    """ISBN-13 con prefijo 979-9 (sin uso real) para el dump sintético."""
+    return '9799%09d' % numero
+
+
+def limpiar(env):
+    """Borra todos los datos generados por ``generar``."""
+    cr = env.cr
+    env.flush_all()
+    cr.execute("SELECT id FROM biblioteca_usuarios WHERE nombre_completo LIKE %s", [MARCA + ' %'])
+    usuario_ids = tuple(fila[0] for fila in cr.fetchall()) or (0,)
+    cr.execute("SELECT id FROM biblioteca_libro WHERE isbn LIKE %s", [MARCA + '%'])
+    libro_ids = tuple(fila[0] for fila in cr.fetchall()) or (0,)
+    cr.execute("DELETE FROM biblioteca_multa_devengo WHERE usuario_id IN %s", [usuario_ids])
+    cr.execute("DELETE FROM biblioteca_multa WHERE usuario_id IN %s", [usuario_ids])
+    cr.execute("DELETE FROM biblioteca_reserva WHERE usuario_id IN %s OR libro_id IN %s",
+               [usuario_ids, libro_ids])
+    # prestamo_libro_rel se borra en cascada
+    cr.execute("DELETE FROM biblioteca_prestamo WHERE usuario_id IN %s", [usuario_ids])
+    cr.execute("DELETE FROM biblioteca_usuarios WHERE id IN %s", [usuario_ids])
+    cr.execute("DELETE FROM biblioteca_libro WHERE id IN %s", [libro_ids])
+    cr.execute("DELETE FROM biblioteca_personal WHERE codigo = %s", [MARCA])
+    cr.execute("DELETE FROM biblioteca_autor WHERE name LIKE %s", [MARCA + ' %'])
+    env.invalidate_all()
+
+
+# -----------------------------
+# BENCHMARK
+# -----------------------------
+def benchmark(env, operaciones=None, repeticiones=3):
+    """Mide tiempo y número de consultas SQL de las operaciones de ``OPERACIONES``.
+
+    Cada repetición corre dentro de un savepoint que se deshace al
+    terminar, así todas miden sobre los mismos datos. El tiempo incluye
+    el flush final de lo que la operación deja pendiente. La política de
+    préstamo se desactiva para que no rechace los préstamos medidos.
+    """
+    cr = env.cr
+    resultados = []
+    for operacion in operaciones or OPERACIONES:
+        tamano = OPERACIONES[operacion]
+        tiempos, consultas = [], []
+        for _i in range(repeticiones):
+            env.flush_all()
+            cr.execute("SAVEPOINT biblioteca_benchmark")
+            try:
+                _desactivar_politica(env)
+                registros = _registros_benchmark(env, operacion, tamano)
+                env.flush_all()
+                consultas_antes = cr.sql_log_count
+                t_inicio = time.perf_counter()
+                getattr(registros, operacion)()
+                env.flush_all()
+                tiempos.append(time.perf_counter() - t_inicio)
+                consultas.append(cr.sql_log_count - consultas_antes)
+            finally:
+                cr.execute("ROLLBACK TO SAVEPOINT biblioteca_benchmark")
+                env.invalidate_all()
+                env.registry.clear_cache()
+        tiempos.sort()
+        resultados.append({
+            'operacion': operacion,
+            'registros': len(registros),
+            'repeticiones': repeticiones,
+            'segundos_mediana': tiempos[len(tiempos) // 2],
+            'segundos_min': tiempos[0],
+            'segundos_max': tiempos[-1],
+            'ms_por_registro': tiempos[len(tiempos) // 2] * 1000 / max(len(registros), 1),
+            'consultas': max(consultas),
+        })
+        _logger.info("benchmark %s: %s registros, %.3fs, %s consultas", operacion,
+                     len(registros), tiempos[len(tiempos) // 2], max(consultas))
+    return resultados
+
+
+def _desactivar_politica(env):
+    Parametros = env['ir.config_parameter'].sudo()
+    Parametros.set_param('biblioteca.politica.max_prestamos_abiertos', 0)
+    Parametros.set_param('biblioteca.politica.max_total_multas', 0)
+    Parametros.set_param('biblioteca.politica.bloquear_vencidos', 'False')
+
+
+def _registros_benchmark(env, operacion, tamano):
+    Prestamo = env['biblioteca.prestamo']
+    if operacion == 'action_prestar':
+        return Prestamo.search([('estado', '=', 'borrador'), ('libro_ids', '!=', False)],
+                               order='id', limit=tamano)
+    if operacion == 'action_devolver':
+        return Prestamo.search([('estado', '=', 'prestado'), ('fecha_devolucion', '=', False)],
+                               order='id', limit=tamano)
+    if operacion == '_generar_multa_retraso':
+        return Prestamo.search([('estado', '=', 'prestado'), ('fecha_devolucion', '=', False),
+                                ('fecha_max_devolucion', '<', fields.Datetime.now())],
+                               order='id', limit=tamano)
+    return env['biblioteca.libro'].search([], order='id', limit=tamano)
+
+
+def ejecutar_suite(env, escalas=(10000, 100000, 1000000), ruta=None, semilla=42, repeticiones=3):
+    """Genera cada escala (número de préstamos) desde cero y la mide.
+
+    Los resultados se devuelven y, si se indica ``ruta``, se guardan en
+    JSON para comparar entre versiones.
+    """
+    cr = env.cr
+    cr.execute("SHOW server_version")
+    modulo = env['biblioteca.libro']._module
+    informe = {
+        'modulo': modulo,
+        'version_modulo': env['ir.module.module'].search(
+            [('name', '=', modulo)], limit=1).latest_version,
+        'version_odoo': release.version,
+        'version_postgres': cr.fetchone()[0],
+        'fecha': fields.Datetime.to_string(fields.Datetime.now()),
+        'semilla': semilla,
+        'escalas': [],
+    }
+    for escala in escalas:
+        limpiar(env)
+        conteos = generar(env, prestamos=escala, semilla=semilla)
+        informe['escalas'].append({
+            'prestamos': escala,
+            'conteos': conteos,
+            'resultados': benchmark(env, repeticiones=repeticiones),
+        })
+        if ruta:
+            with open(ruta, 'w', encoding='utf-8') as archivo:
+                json.dump(informe, archivo, indent=2)
+    limpiar(env)
+    return informe
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase
+from datetime import timedelta
+
+# Cédulas ecuatorianas válidas para los datos de prueba
+CEDULAS = ['2400000010', '2400000028', '2400000036', '2400000044', '2400000051']
+
+
+class BibliotecaCase(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.personal = cls.env['biblioteca.personal'].create({
+            'nombre': 'Ana',
+            'apellido': 'Prueba',
+            'codigo': 'P-TEST',
+            'cedula': CEDULAS[0],
+        })
+        cls.usuario = cls.env['biblioteca.usuarios'].create({
+            'nombre_completo': 'Usuario de prueba',
+            'cedula': CEDULAS[1],
+            'correo': 'usuario@example.com',
+        })
+        cls.libro = cls.env['biblioteca.libro'].create({
+            'name': 'Cien años de soledad',
+            'isbn': '978-0-06-088328-7',
+            'ejemplares': 2,
+        })
+        cls.libro_2 = cls.env['biblioteca.libro'].create({
+            'name': 'Rayuela',
+            'isbn': '978-84-376-0494-7',
+            'ejemplares': 1,
+        })
+
+    def sin_commit(self):
+        """Los procesos por lotes confirman cada lote; en las pruebas no."""
+        self.patch(type(self.env.cr), 'commit', lambda cr: None)
+
+    def prestar(self, libros, usuario=None, dias_atras=0):
+        prestamo = self.env['biblioteca.prestamo'].create({
+            'usuario_id': (usuario or self.usuario).id,
+            'personal_id': self.personal.id,
+            'libro_ids': [(6, 0, libros.ids)],
+        })
+        prestamo.action_prestar()
+        if dias_atras:
+            inicio = prestamo.fecha_prestamo - timedelta(days=dias_atras)
+            prestamo.write({
+                'fecha_prestamo': inicio,
+                'fecha_max_devolucion': inicio + timedelta(days=15),
+            })
+        return prestamo
@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.tests import tagged
+from datetime import timedelta
+import logging
+import os
+import time
+
+from ..models.reportes import FACTOR_LIBRO
+from . import carga
+from .common import BibliotecaCase
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestArchivo(BibliotecaCase):
+
+    def devuelto_hace(self, libros, dias):
+        prestamo = self.prestar(libros, dias_atras=dias + 20)
+        prestamo.action_devolver()
+        prestamo.fecha_devolucion = fields.Datetime.now() - timedelta(days=dias)
+        return prestamo
+
+    def test_archiva_solo_multas_pagadas(self):
+        self.sin_commit()
+        pagado = self.devuelto_hace(self.libro, 400)
+        pagado.multa_ids.action_pagar()
+        reciente = self.devuelto_hace(self.libro, 10)
+        reciente.multa_ids.action_pagar()
+        # El último: su multa por pagar bloquearía nuevos préstamos
+        con_deuda = self.devuelto_hace(self.libro_2, 400)
+        self.env.flush_all()
+
+        self.assertEqual(self.env['biblioteca.prestamo.archivo']._cron_archivar(dias=365), 1)
+        self.assertFalse(pagado.exists())
+        self.assertTrue(con_deuda.exists())
+        self.assertTrue(reciente.exists())
+        self.assertEqual(self.usuario.total_multas, con_deuda.multa_total)
+
+        # Los reportes siguen contando el préstamo archivado, con el mismo id
+        fila = self.env['biblioteca.reporte.prestamo'].browse(pagado.id * FACTOR_LIBRO + self.libro.id)
+        self.assertTrue(fila.archivado)
+        self.assertEqual(fila.libro_id, self.libro)
+        multas = self.env['biblioteca.reporte.multa'].search([('usuario_id', '=', self.usuario.id)])
+        self.assertEqual(len(multas), 3)
+        self.assertEqual(len(multas.filtered('archivado')), 1)
+
+    def test_conserva_libro_de_devengos(self):
+        self.sin_commit()
+        prestamo = self.prestar(self.libro, dias_atras=420)
+        self.env['biblioteca.prestamo'].verificar_vencidos()
+        self.env['biblioteca.multa'].devengar(fecha_ref=fields.Datetime.now() + timedelta(days=1))
+        multa = prestamo.multa_ids
+        devengos = multa.devengo_ids
+        self.assertTrue(devengos)
+
+        prestamo.action_devolver()
+        prestamo.fecha_devolucion = fields.Datetime.now() - timedelta(days=400)
+        multa.action_pagar()
+        self.env.flush_all()
+        self.assertEqual(self.env['biblioteca.prestamo.archivo']._cron_archivar(dias=365), 1)
+
+        self.assertEqual(len(devengos.exists()), len(devengos))
+        archivada = self.env['biblioteca.multa.archivo'].search([('multa_original_id', '=', multa.id)])
+        self.assertEqual(archivada.devengo_ids, devengos)
+        self.assertFalse(devengos.multa_id)
+
+
+@tagged('post_install', '-at_install', '-standard', 'biblioteca_benchmark')
+class TestArchivoBenchmark(BibliotecaCase):
+    """Consultas diarias antes y después de archivar, sobre BIBLIOTECA_PRESTAMOS_ARCHIVO préstamos (1.000.000)."""
+
+    def operaciones(self):
+        ahora = fields.Datetime.now()
+        Prestamo = self.env['biblioteca.prestamo']
+        usuarios = self.env['biblioteca.usuarios'].search([], order='id', limit=1000)
+        libros = self.env['biblioteca.libro'].search([], order='id', limit=1000)
+        return {
+            'lista_prestamos': lambda: Prestamo.search_count([]),
+            'barrido_vencidos': lambda: Prestamo.search([
+                ('estado', '=', 'prestado'), ('fecha_max_devolucion', '<', ahora),
+            ], order='id', limit=1000),
+            'historial_usuarios': lambda: Prestamo.search_count([('usuario_id', 'in', usuarios.ids)]),
+            'resumen_usuarios': usuarios._compute_resumen_cuenta,
+            'contadores': libros._contar_prestamos,
+        }
+
+    def medir(self, repeticiones=5):
+        tiempos = {}
+        for nombre, funcion in self.operaciones().items():
+            medidas = []
+            for _i in range(repeticiones):
+                self.env.invalidate_all()
+                inicio = time.perf_counter()
+                funcion()
+                medidas.append(time.perf_counter() - inicio)
+            tiempos[nombre] = sorted(medidas)[repeticiones // 2]
+        return tiempos
+
+    def analizar(self):
+        for tabla in ('biblioteca_prestamo', 'prestamo_libro_rel', 'biblioteca_multa'):
+            self.env.cr.execute("ANALYZE %s" % tabla)
+
+    def test_archivar(self):
+        self.sin_commit()
+        carga.generar(self.env, prestamos=int(os.environ.get('BIBLIOTECA_PRESTAMOS_ARCHIVO', 1000000)))
+        self.analizar()
+        antes = self.medir()
+
+        inicio = time.perf_counter()
+        archivados = self.env['biblioteca.prestamo.archivo']._cron_archivar(dias=180)
+        duracion = time.perf_counter() - inicio
+        _logger.info("Archivo: %s préstamos en %.1fs (%.0f por segundo)",
+                     archivados, duracion, archivados / duracion)
+        self.assertTrue(archivados)
+
+        self.analizar()
+        despues = self.medir()
+        for nombre in antes:
+            _logger.info("Archivo %s: %.1f ms antes, %.1f ms después (x%.1f)", nombre,
+                         antes[nombre] * 1000, despues[nombre] * 1000, antes[nombre] / max(despues[nombre], 1e-9))
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+import os
+import tempfile
+
+from . import carga
+
+
+@tagged('post_install', '-at_install', '-standard', 'biblioteca_benchmark')
+class TestBenchmark(TransactionCase):
+    """Suite de carga del ciclo de préstamos; no corre con las pruebas normales.
+
+    ``--test-tags biblioteca_benchmark``. Las escalas salen de
+    BIBLIOTECA_ESCALAS (p. ej. "10000,100000") y el informe JSON se guarda en
+    BIBLIOTECA_BENCHMARK_JSON. Todo se deshace al terminar la prueba.
+    """
+
+    def test_suite(self):
+        escalas = [int(escala) for escala in
+                   os.environ.get('BIBLIOTECA_ESCALAS', '10000,100000,1000000').split(',')]
+        ruta = os.environ.get('BIBLIOTECA_BENCHMARK_JSON') or \
+            os.path.join(tempfile.gettempdir(), 'biblioteca_benchmark.json')
+        informe = carga.ejecutar_suite(self.env, escalas=escalas, ruta=ruta)
+        self.assertEqual([escala['prestamos'] for escala in informe['escalas']], escalas)
+        for escala in informe['escalas']:
+            self.assertEqual({r['operacion'] for r in escala['resultados']}, set(carga.OPERACIONES))
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+import logging
+import os
+import time
+
+from . import carga
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install')
+class TestCatalogo(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        autor = cls.env['biblioteca.autor'].create({'name': 'Julio Cortázar'})
+        cls.rayuela = cls.env['biblioteca.libro'].create({
+            'name': 'Rayuela',
+            'autor': autor.id,
+            'editorial': 'Sudamericana',
+            'description': 'Novela sobre un argentino en París.',
+        })
+        cls.otro = cls.env['biblioteca.libro'].create({'name': 'Ficciones'})
+
+    def test_busca_en_autor_y_resumen(self):
+        Libro = self.env['biblioteca.libro']
+        for texto in ('Cortázar', 'novela', 'Sudamericana', 'Rayuela'):
+            with self.subTest(texto=texto):
+                ids = [resultado['id'] for resultado in Libro.buscar_catalogo(texto)]
+                self.assertIn(self.rayuela.id, ids)
+                self.assertNotIn(self.otro.id, ids)
+        self.assertIn(self.rayuela, Libro.search([('busqueda_catalogo', 'ilike', 'parís')]))
+
+    def test_operador_no_soportado(self):
+        with self.assertRaises(UserError):
+            self.env['biblioteca.libro'].search([('busqueda_catalogo', 'not ilike', 'Rayuela')])
+
+    def test_indice_de_trigramas(self):
+        if not self.env.registry.has_trigram:
+            self.skipTest("pg_trgm no está instalado")
+        self.env.cr.execute("SELECT indexdef FROM pg_indexes WHERE indexname = 'biblioteca_libro__name_index'")
+        self.assertIn('gin_trgm_ops', self.env.cr.fetchone()[0])
+
+    def test_titulo_mal_escrito(self):
+        if not self.env.registry.has_trigram:
+            self.skipTest("pg_trgm no está instalado")
+        self.assertIn(self.rayuela.id, self.env['biblioteca.libro']._ids_catalogo('Rayuella'))
+
+
+@tagged('post_install', '-at_install', '-standard', 'biblioteca_benchmark')
+class TestCatalogoBenchmark(TransactionCase):
+    """Búsqueda de catálogo frente a ``ilike`` sobre BIBLIOTECA_CATALOGO libros (500.000)."""
+
+    TEXTOS = ('laberinto', 'Borges', 'winter garden', 'silencio del mar')
+
+    def medir(self, funcion, repeticiones=5):
+        tiempos = []
+        for _i in range(repeticiones):
+            self.env.invalidate_all()
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return sorted(tiempos)[repeticiones // 2]
+
+    def test_catalogo_frente_a_ilike(self):
+        carga.generar_catalogo(self.env, libros=int(os.environ.get('BIBLIOTECA_CATALOGO', 500000)))
+        Libro = self.env['biblioteca.libro']
+        for texto in self.TEXTOS:
+            caminos = {
+                # Lo que hacía la vista de búsqueda: solo el título
+                'ilike_titulo': lambda: Libro.search([('name', 'ilike', texto)], limit=20),
+                # Lo mismo que cubre el catálogo, con ilike
+                'ilike_campos': lambda: Libro.search([
+                    '|', '|', '|', '|',
+                    ('name', 'ilike', texto), ('autor.name', 'ilike', texto),
+                    ('categoria', 'ilike', texto), ('editorial', 'ilike', texto),
+                    ('description', 'ilike', texto),
+                ], limit=20),
+                'catalogo': lambda: Libro.buscar_catalogo(texto, limite=20),
+            }
+            tiempos = {nombre: self.medir(funcion) for nombre, funcion in caminos.items()}
+            _logger.info("Catálogo %r: %s", texto, ", ".join(
+                "%s %.1f ms" % (nombre, segundos * 1000) for nombre, segundos in tiempos.items()))
+            self.assertLess(tiempos['catalogo'], tiempos['ilike_campos'])
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.tests.common import BaseCase
+import logging
+import random
+import time
+
+from ..models.cedula import _validar, validar_cedula, validar_cedulas
+
+_logger = logging.getLogger(__name__)
+
+
+def validar_con_bucle(cedula):
+    """Validación original, dígito por dígito (referencia de resultados y tiempos)."""
+    if not cedula or len(cedula) != 10 or not cedula.isdigit():
+        return False
+    provincia = int(cedula[:2])
+    if provincia < 1 or provincia > 24:
+        return False
+    if int(cedula[2]) >= 6:
+        return False
+    coef = [2, 1, 2, 1, 2, 1, 2, 1, 2]
+    total = 0
+    for i in range(9):
+        valor = int(cedula[i]) * coef[i]
+        if valor >= 10:
+            valor -= 9
+        total += valor
+    decena = ((total + 9) // 10) * 10
+    return int(cedula[9]) == (decena - total) % 10
+
+
+def cedulas_aleatorias(cantidad, semilla=42):
+    """Mezcla de cédulas válidas, dígito verificador errado y basura."""
+    rng = random.Random(semilla)
+    cedulas = []
+    for _i in range(cantidad):
+        base = '%02d%d%06d' % (rng.randint(0, 30), rng.randint(0, 9), rng.randint(0, 999999))
+        cedulas.append(base + str(rng.randint(0, 9)))
+    cedulas += ['', False, '123', '17a0000001']
+    return cedulas
+
+
+@tagged('post_install', '-at_install')
+class TestCedula(BaseCase):
+
+    def test_mismos_resultados_que_el_bucle(self):
+        cedulas = cedulas_aleatorias(20000)
+        esperados = [validar_con_bucle(cedula) for cedula in cedulas]
+        self.assertTrue(any(esperados))
+        self.assertEqual([_validar(cedula) for cedula in cedulas], esperados)
+        self.assertEqual(validar_cedulas(cedulas), esperados)
+
+    def test_lote_usa_la_cache_compartida(self):
+        validar_cedula.cache_clear()
+        validar_cedulas(['1710034065', '1710034065', '0000000000'])
+        self.assertEqual(validar_cedula.cache_info().currsize, 2)
+        # Lo que valida el lote ya no se recalcula al validar un registro
+        validar_cedula('1710034065')
+        self.assertEqual(validar_cedula.cache_info().hits, 1)
+
+
+@tagged('post_install', '-at_install', '-standard', 'biblioteca_benchmark')
+class TestCedulaBenchmark(BaseCase):
+    """Por registro (bucle original y validador en caché) frente al validador por lotes."""
+
+    def medir(self, funcion, repeticiones=5):
+        tiempos = []
+        for _i in range(repeticiones):
+            validar_cedula.cache_clear()
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        return sorted(tiempos)[repeticiones // 2]
+
+    def test_por_registro_frente_a_lote(self):
+        cedulas = cedulas_aleatorias(100000)
+        # Una importación repite cédulas: un tercio son repetidas
+        cedulas += cedulas[:len(cedulas) // 2]
+        tiempos = {
+            'bucle': self.medir(lambda: [validar_con_bucle(cedula) for cedula in cedulas]),
+            'por_registro': self.medir(lambda: [validar_cedula(cedula) for cedula in cedulas]),
+            'lote': self.medir(lambda: validar_cedulas(cedulas)),
+        }
+        for nombre, segundos in tiempos.items():
+            _logger.info("Cédulas %s: %s en %.1f ms (%.0f ns por cédula)",
+                         nombre, len(cedulas), segundos * 1000, segundos * 1e9 / len(cedulas))
+        self.assertLess(tiempos['lote'], tiempos['bucle'])
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+from odoo import api, SUPERUSER_ID
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+import logging
+import threading
+import time
+
+from . import carga
+
+_logger = logging.getLogger(__name__)
+
+
+class CajasCase(TransactionCase):
+    """Cajas con su propia transacción sobre datos confirmados en la base.
+
+    Cada caja tiene que ver los datos, así que se confirman y se borran al
+    terminar.
+    """
+
+    CAJAS = 2
+    LIBROS = 1
+    EJEMPLARES = 3
+
+    def setUp(self):
+        super().setUp()
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            personal = env['biblioteca.personal'].create({
+                'nombre': 'Caja',
+                'apellido': 'Concurrente',
+                'codigo': 'P-CONCURRENCIA',
+                'cedula': carga.cedula_sintetica(5900000),
+            })
+            libros = env['biblioteca.libro'].create([{
+                'name': 'Libro concurrente %s' % n,
+                'ejemplares': self.EJEMPLARES,
+            } for n in range(self.LIBROS)])
+            usuarios = env['biblioteca.usuarios'].create([{
+                'nombre_completo': 'Lector concurrente %s' % n,
+                'cedula': carga.cedula_sintetica(5900001 + n),
+            } for n in range(self.CAJAS)])
+            self.personal_id, self.libro_ids, self.usuario_ids = personal.id, libros.ids, usuarios.ids
+        self.addCleanup(self._limpiar)
+
+    def _limpiar(self):
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            env['biblioteca.prestamo'].search([('personal_id', '=', self.personal_id)]).unlink()
+            env['biblioteca.usuarios'].browse(self.usuario_ids).unlink()
+            env['biblioteca.libro'].browse(self.libro_ids).unlink()
+            env['biblioteca.personal'].browse(self.personal_id).unlink()
+
+    def _nuevo_prestamo(self, env, usuario_id, libro_id):
+        return env['biblioteca.prestamo'].create({
+            'usuario_id': usuario_id,
+            'personal_id': self.personal_id,
+            'libro_ids': [(6, 0, [libro_id])],
+        })
+
+
+@tagged('post_install', '-at_install')
+class TestSerializacion(CajasCase):
+
+    def test_prestamo_confirmado_despues_de_la_instantanea(self):
+        libro_id = self.libro_ids[0]
+        with self.registry.cursor() as cr_a, self.registry.cursor() as cr_b:
+            env_a = api.Environment(cr_a, SUPERUSER_ID, {})
+            env_b = api.Environment(cr_b, SUPERUSER_ID, {})
+            # La primera consulta fija la instantánea de la caja A
+            self.assertEqual(env_a['biblioteca.libro'].browse(libro_id).ejemplares_disponibles, self.EJEMPLARES)
+
+            # La caja B presta el mismo libro y confirma
+            self._nuevo_prestamo(env_b, self.usuario_ids[1], libro_id).action_prestar()
+            env_b.flush_all()
+            cr_b.commit()
+
+            # A no ve ese préstamo: falla enseguida en lugar de un error de serialización
+            prestamo = self._nuevo_prestamo(env_a, self.usuario_ids[0], libro_id)
+            with self.assertRaisesRegex(ValidationError, 'otra caja'):
+                prestamo.action_prestar()
+            cr_a.rollback()
+
+            # Con una instantánea nueva el préstamo pasa
+            env_a.invalidate_all()
+            self._nuevo_prestamo(env_a, self.usuario_ids[0], libro_id).action_prestar()
+            env_a.flush_all()
+            cr_a.commit()
+            self.assertEqual(env_a['biblioteca.libro'].browse(libro_id).ejemplares_disponibles, self.EJEMPLARES - 2)
+
+    def test_ejemplar_prestado_despues_de_la_instantanea(self):
+        libro_id = self.libro_ids[0]
+        with self.registry.cursor() as cr:
+            api.Environment(cr, SUPERUSER_ID, {})['biblioteca.libro'].browse(libro_id).action_generar_ejemplares()
+        with self.registry.cursor() as cr_a, self.registry.cursor() as cr_b:
+            env_a = api.Environment(cr_a, SUPERUSER_ID, {})
+            env_b = api.Environment(cr_b, SUPERUSER_ID, {})
+            libro_a = env_a['biblioteca.libro'].browse(libro_id)
+            self.assertEqual(set(libro_a.ejemplar_ids.mapped('estado')), {'disponible'})
+
+            # B se lleva el primer ejemplar disponible y confirma
+            self._nuevo_prestamo(env_b, self.usuario_ids[1], libro_id).action_prestar()
+            env_b.flush_all()
+            cr_b.commit()
+
+            # Para A sigue disponible, pero ya no se puede bloquear
+            with self.assertRaisesRegex(ValidationError, 'otra caja'):
+                env_a['biblioteca.ejemplar']._tomar_disponibles(libro_a)
+            cr_a.rollback()
+
+            env_a.invalidate_all()
+            tomados = env_a['biblioteca.ejemplar']._tomar_disponibles(libro_a)
+            self.assertEqual(tomados.estado, 'disponible')
+
+
+@tagged('post_install', '-at_install', '-standard', 'biblioteca_benchmark')
+class TestConcurrencia(CajasCase):
+    """50 cajas prestan a la vez, cada una con su propia transacción."""
+
+    CAJAS = 50
+    LIBROS = 10
+    EJEMPLARES = 3
+
+    def _caja(self, barrera, usuario_id, libro_id, resultados, errores):
+        barrera.wait()
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            inicio = time.perf_counter()
+            try:
+                self._nuevo_prestamo(env, usuario_id, libro_id).action_prestar()
+                env.flush_all()
+                cr.commit()
+                resultados.append(('prestado', time.perf_counter() - inicio))
+            except ValidationError:
+                cr.rollback()
+                resultados.append(('rechazado', time.perf_counter() - inicio))
+            except Exception as error:
+                cr.rollback()
+                errores.append(error)
+
+    def test_cajas_simultaneas(self):
+        barrera = threading.Barrier(self.CAJAS)
+        resultados, errores = [], []
+        hilos = [threading.Thread(
+            target=self._caja,
+            args=(barrera, usuario_id, self.libro_ids[n % self.LIBROS], resultados, errores),
+        ) for n, usuario_id in enumerate(self.usuario_ids)]
+        inicio = time.perf_counter()
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        # Sin errores de serialización ni bloqueos mutuos: solo préstamos o rechazos
+        self.assertFalse(errores, errores)
+        self.assertEqual(len(resultados), self.CAJAS)
+        prestados = [segundos for estado, segundos in resultados if estado == 'prestado']
+        self.assertTrue(prestados)
+        tiempos = sorted(segundos for _estado, segundos in resultados)
+        _logger.info(
+            "%s cajas: %s préstamos, %s rechazados en %.3fs (%.1f préstamos/s, p95 %.1f ms)",
+            self.CAJAS, len(prestados), self.CAJAS - len(prestados), duracion, len(prestados) / duracion,
+            tiempos[int(len(tiempos) * 0.95) - 1] * 1000,
+        )
+
+        with self.registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            prestamos = env['biblioteca.prestamo'].search([
+                ('personal_id', '=', self.personal_id), ('estado', '=', 'prestado'),
+            ])
+            self.assertEqual(len(prestamos), len(prestados))
+            for libro in env['biblioteca.libro'].browse(self.libro_ids):
+                en_prestamo = len(prestamos.filtered(lambda p: libro in p.libro_ids))
+                # Nunca se presta más de lo que hay y los contadores cuadran
+                self.assertLessEqual(en_prestamo, self.EJEMPLARES)
+                self.assertEqual(libro.ejemplares_prestados, en_prestamo)
+                self.assertEqual(libro.ejemplares_disponibles, self.EJEMPLARES - en_prestamo)
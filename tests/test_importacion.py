@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+import base64
+import io
+
+from .common import CEDULAS, BibliotecaCase
+
+
+@tagged('post_install', '-at_install')
+class TestImportacion(BibliotecaCase):
+
+    def importar(self, tipo, texto):
+        return self.env['biblioteca.importacion'].importar_archivo(tipo, io.StringIO(texto))
+
+    def test_actualizacion_fallida_se_rechaza(self):
+        otro = self.env['biblioteca.personal'].create({
+            'nombre': 'Luis',
+            'apellido': 'Prueba',
+            'codigo': 'P-OTRO',
+            'cedula': CEDULAS[2],
+        })
+        # La primera fila choca con la cédula de P-OTRO; la segunda sigue adelante
+        resumen = self.importar('personal', (
+            "nombre,apellido,codigo,cedula\n"
+            "Ana,Prueba,P-TEST,%s\n"
+            "Luisa,Prueba,P-OTRO,%s\n"
+        ) % (CEDULAS[2], CEDULAS[2]))
+        self.assertEqual(resumen['actualizados'], 1)
+        self.assertEqual([linea for linea, _motivo in resumen['rechazos']], [2])
+        self.assertEqual(self.personal.cedula, CEDULAS[0])
+        self.assertEqual(otro.nombre, 'Luisa')
+
+    def test_autor_desconocido_se_rechaza(self):
+        resumen = self.importar('libro', (
+            "name,isbn,autor\n"
+            "Sin autor conocido,978-0-00-000001-1,/authors/OL999999999A\n"
+            "Ficciones,978-0-00-000002-8,  jorge LUIS borges \n"
+            "El Aleph,978-0-00-000003-5,Jorge Luis Borges\n"
+        ))
+        self.assertEqual(resumen['creados'], 2)
+        self.assertEqual([linea for linea, _motivo in resumen['rechazos']], [2])
+        libros = self.env['biblioteca.libro'].search([('name', 'in', ['Ficciones', 'El Aleph'])])
+        self.assertEqual(len(libros.autor), 1)
+
+    def test_asistente_lee_el_adjunto(self):
+        contenido = "nombre_completo,cedula\nLectora importada,%s\n" % CEDULAS[3]
+        asistente = self.env['biblioteca.importacion'].create({
+            'tipo': 'usuarios',
+            'archivo': base64.b64encode(contenido.encode()),
+            'nombre_archivo': 'usuarios.csv',
+        })
+        asistente.action_importar()
+        self.assertEqual(asistente.creados, 1)
+        self.assertTrue(self.env['biblioteca.usuarios'].search([('cedula', '=', CEDULAS[3])]))
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from odoo import fields
+from odoo.sql_db import Cursor
+from odoo.tests import tagged
+from odoo.tools import SQL
+import json
+import os
+from unittest.mock import patch
+
+from . import carga
+from .common import BibliotecaCase
+
+# Tablas del ciclo de préstamo que nunca deben recorrerse enteras
+TABLAS = {
+    'biblioteca_prestamo', 'prestamo_libro_rel', 'biblioteca_multa', 'biblioteca_libro',
+    'biblioteca_usuarios', 'biblioteca_ejemplar', 'biblioteca_reserva',
+}
+
+
+class PlanesMixin:
+    """EXPLAIN de las consultas reales de cada operación."""
+
+    def capturar(self, funcion):
+        """Ejecuta ``funcion`` y devuelve, ya interpoladas, las SELECT que envía a la base."""
+        consultas = []
+        execute = Cursor.execute
+
+        def capturar(cr, query, params=None, log_exceptions=True):
+            if isinstance(query, SQL):
+                query, params = query.code, query.params
+            if query.lstrip().upper().startswith(('SELECT', 'WITH')):
+                consultas.append(cr.mogrify(query, params).decode())
+            return execute(cr, query, params, log_exceptions)
+
+        with patch.object(Cursor, 'execute', capturar):
+            funcion()
+        return consultas
+
+    def dominio(self, modelo, dominio, order=None, limit=None):
+        consulta = self.env[modelo]._search(dominio, order=order, limit=limit).select()
+        return [self.env.cr.mogrify(consulta.code, consulta.params).decode()]
+
+    def recorridos(self, consulta):
+        """Tablas vigiladas que el plan recorre con Seq Scan."""
+        self.env.cr.execute("EXPLAIN (FORMAT JSON) " + consulta)
+        plan = self.env.cr.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        tablas, pendientes = set(), [plan[0]['Plan']]
+        while pendientes:
+            nodo = pendientes.pop()
+            if nodo['Node Type'] == 'Seq Scan' and nodo.get('Relation Name') in TABLAS:
+                tablas.add(nodo['Relation Name'])
+            pendientes.extend(nodo.get('Plans', ()))
+        return tablas
+
+    def assertSinSeqScan(self, consultas):
+        self.assertTrue(consultas, "No se capturó ninguna consulta")
+        for consulta in consultas:
+            self.assertFalse(self.recorridos(consulta), "Seq Scan en:\n%s" % consulta)
+
+    def consultas_calientes(self):
+        """Consultas de contadores, barrido de vencidos, vistas de lista y caja."""
+        libros = self.env['biblioteca.libro'].search([], order='id', limit=50)
+        usuarios = self.env['biblioteca.usuarios'].search([], order='id', limit=50)
+        ahora = fields.Datetime.now()
+        ejemplar = self.env['biblioteca.ejemplar'].search([], limit=1)
+        return {
+            'contadores': self.capturar(lambda: (libros._contar_prestamos(), libros._contar_ejemplares())),
+            'resumen_usuario': self.capturar(usuarios._compute_resumen_cuenta),
+            'barrido_vencidos': self.dominio('biblioteca.prestamo', [
+                ('estado', '=', 'prestado'), ('fecha_max_devolucion', '<', ahora), ('id', '>', 0),
+            ], order='id', limit=1000),
+            'abiertos_usuario': self.dominio('biblioteca.prestamo', [
+                ('usuario_id', 'in', usuarios.ids), ('estado', 'in', ('prestado', 'multa')),
+            ]),
+            'multas_usuario': self.dominio('biblioteca.multa', [('usuario_id', 'in', usuarios.ids)]),
+            'multas_prestamo': self.dominio('biblioteca.multa', [
+                ('prestamo_id', '=', 1), ('tipo', '=', 'retraso'),
+            ]),
+            'lista_prestamos': self.dominio('biblioteca.prestamo', [], limit=80),
+            # Sin funciones de ventana el filtro del reporte llega a prestamo_libro_rel
+            'reporte_libro': self.dominio('biblioteca.reporte.prestamo', [('libro_id', 'in', libros[:5].ids)]),
+            'isbn': self.capturar(lambda: self.env['biblioteca.libro'].buscar_por_isbns(['978-0-06-088328-7'])),
+            'escaner': self.capturar(lambda: self.env['biblioteca.ejemplar'].escanear(ejemplar.codigo_barras or 'X')),
+            'cola_reservas': self.capturar(lambda: self.env['biblioteca.reserva']._asignar_reservas(libros)),
+        }
+
+
+@tagged('post_install', '-at_install')
+class TestIndices(PlanesMixin, BibliotecaCase):
+    """Con los escaneos secuenciales desactivados, un Seq Scan indica que falta un índice."""
+
+    def setUp(self):
+        super().setUp()
+        self.libro.action_generar_ejemplares()
+        self.prestar(self.libro, dias_atras=20)
+        self.env.flush_all()
+        self.env.cr.execute("SET LOCAL enable_seqscan = off")
+
+    def test_consultas_calientes(self):
+        for nombre, consultas in self.consultas_calientes().items():
+            with self.subTest(consulta=nombre):
+                self.assertSinSeqScan(consultas)
+
+    def test_indice_isbn_unico(self):
+        self.env.cr.execute("SELECT indisunique FROM pg_index WHERE indexrelid = %s::regclass",
+                            ['biblioteca_libro_isbn_normalizado_uniq'])
+        self.assertEqual(self.env.cr.fetchone(), (True,))
+
+
+@tagged('post_install', '-at_install', '-standard', 'biblioteca_benchmark')
+class TestIndicesCarga(PlanesMixin, BibliotecaCase):
+    """Los mismos planes sobre una base sembrada, con las estadísticas reales.
+
+    El volumen sale de BIBLIOTECA_PRESTAMOS_EXPLAIN (1.000.000 por defecto).
+    """
+
+    def test_consultas_calientes(self):
+        carga.generar(self.env, prestamos=int(os.environ.get('BIBLIOTECA_PRESTAMOS_EXPLAIN', 1000000)))
+        for tabla in sorted(TABLAS):
+            self.env.cr.execute(SQL("ANALYZE %s", SQL.identifier(tabla)))
+        for nombre, consultas in self.consultas_calientes().items():
+            with self.subTest(consulta=nombre):
+                self.assertSinSeqScan(consultas)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import AccessError
+from odoo.tests import new_test_user, tagged
+from odoo.tests.common import TransactionCase
+
+from ..models.instrumentacion import PARAMETRO_ACTIVA
+
+
+@tagged('post_install', '-at_install')
+class TestInstrumentacion(TransactionCase):
+
+    def test_solo_administradores(self):
+        bibliotecario = new_test_user(self.env, login='bibliotecario', groups='base.group_user')
+        Instrumentacion = self.env['biblioteca.instrumentacion']
+        Parametros = self.env['ir.config_parameter'].sudo()
+        Parametros.set_param(PARAMETRO_ACTIVA, 'False')
+
+        with self.assertRaises(AccessError):
+            Instrumentacion.with_user(bibliotecario).action_activar()
+        self.assertEqual(Parametros.get_param(PARAMETRO_ACTIVA), 'False')
+
+        administrador = new_test_user(self.env, login='administrador', groups='base.group_system')
+        Instrumentacion.with_user(administrador).action_activar()
+        self.assertEqual(Parametros.get_param(PARAMETRO_ACTIVA), 'True')
+        Instrumentacion.with_user(administrador).action_desactivar()
+        self.assertEqual(Parametros.get_param(PARAMETRO_ACTIVA), 'False')
+
+    def test_resumen_con_ids_estables(self):
+        Instrumentacion = self.env['biblioteca.instrumentacion']
+        Resumen = self.env['biblioteca.instrumentacion.resumen']
+        Instrumentacion._registrar('prueba_b', 'biblioteca.libro', 1, 0.01, 3, 0)
+        resumen_b = Resumen.search([('accion', '=', 'prueba_b')])
+
+        # Una acción nueva que se ordena antes no cambia el id de las demás
+        Instrumentacion._registrar('prueba_a', 'biblioteca.libro', 1, 0.01, 3, 0)
+        self.env.invalidate_all()
+        self.assertEqual(Resumen.search([('accion', '=', 'prueba_b')]).id, resumen_b.id)
+        self.assertEqual(resumen_b.llamadas, 1)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.tests.common import HttpCase
+import logging
+import os
+import time
+
+from . import carga
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('post_install', '-at_install', '-standard', 'biblioteca_benchmark')
+class TestKiosco(HttpCase):
+    """Carga del buzón de devolución contra /biblioteca/api/devolver.
+
+    BIBLIOTECA_DEVOLUCIONES préstamos (2000 por defecto) se devuelven en
+    lotes de BIBLIOTECA_LOTE_DEVOLUCIONES (100) ISBN por petición. La prueba
+    falla por debajo de BIBLIOTECA_DEVOLUCIONES_POR_SEGUNDO (100).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.total = int(os.environ.get('BIBLIOTECA_DEVOLUCIONES', 2000))
+        self.tamano_lote = int(os.environ.get('BIBLIOTECA_LOTE_DEVOLUCIONES', 100))
+        Parametros = self.env['ir.config_parameter'].sudo()
+        Parametros.set_param('biblioteca.politica.max_prestamos_abiertos', 0)
+        Parametros.set_param('biblioteca.politica.bloquear_vencidos', 'False')
+
+        personal = self.env['biblioteca.personal'].create({
+            'nombre': 'Kiosco',
+            'apellido': 'Buzón',
+            'codigo': 'P-KIOSCO',
+            'cedula': carga.cedula_sintetica(5800000),
+        })
+        libros = self.env['biblioteca.libro'].create([{
+            'name': 'Libro de kiosco %s' % n,
+            'isbn': '979-%09d' % n,
+            'ejemplares': self.total,
+        } for n in range(50)])
+        usuarios = self.env['biblioteca.usuarios'].create([{
+            'nombre_completo': 'Lector de kiosco %s' % n,
+            'cedula': carga.cedula_sintetica(5800001 + n),
+        } for n in range(self.total // 4)])
+        # Préstamos de dos libros: el buzón recibe cada libro por separado
+        pedidos = [{
+            'cedula': usuarios[n % len(usuarios)].cedula,
+            'isbns': [libros[n % 50].isbn, libros[(n + 1) % 50].isbn],
+        } for n in range(self.total // 2)]
+        resultados = self.env['biblioteca.prestamo'].prestar_en_lote(pedidos, personal.id)
+        self.assertTrue(all(resultado['ok'] for resultado in resultados))
+        self.devoluciones = [
+            {'cedula': pedido['cedula'], 'isbns': [isbn]} for pedido in pedidos for isbn in pedido['isbns']
+        ]
+        self.env.flush_all()
+
+    def test_buzon_devolucion(self):
+        self.authenticate('admin', 'admin')
+        inicio = time.perf_counter()
+        resultados = []
+        for desde in range(0, len(self.devoluciones), self.tamano_lote):
+            respuesta = self.make_jsonrpc_request('/biblioteca/api/devolver', {
+                'devoluciones': self.devoluciones[desde:desde + self.tamano_lote],
+            })
+            resultados += respuesta['resultados']
+        duracion = time.perf_counter() - inicio
+        por_segundo = len(resultados) / duracion
+        _logger.info("Buzón: %s devoluciones en %.2fs (%.0f por segundo, lotes de %s)",
+                     len(resultados), duracion, por_segundo, self.tamano_lote)
+
+        self.assertEqual(len(resultados), len(self.devoluciones))
+        self.assertTrue(all(resultado['ok'] for resultado in resultados))
+        self.assertFalse(self.env['biblioteca.prestamo'].search_count([
+            ('personal_id.codigo', '=', 'P-KIOSCO'), ('fecha_devolucion', '=', False),
+        ]))
+        self.assertGreaterEqual(por_segundo, float(os.environ.get('BIBLIOTECA_DEVOLUCIONES_POR_SEGUNDO', 100)))
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+from odoo.tests.common import TransactionCase
+import logging
+import os
+import resource
+import tempfile
+import time
+
+from . import carga
+
+_logger = logging.getLogger(__name__)
+
+
+class DumpCase(TransactionCase):
+
+    def escribir_dumps(self, ediciones):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        return carga.escribir_dumps(directorio.name, ediciones=ediciones)
+
+    def importar(self, rutas, isbns=None):
+        return self.env['biblioteca.openlibrary.dump']._importar(
+            rutas['editions'], rutas['works'], rutas['authors'], isbns=isbns)
+
+
+@tagged('post_install', '-at_install')
+class TestOpenLibraryDump(DumpCase):
+
+    def test_enriquece_y_crea(self):
+        rutas = self.escribir_dumps(40)
+        existente = self.env['biblioteca.libro'].create({'name': 'Sin datos', 'isbn': carga.isbn_sintetico(3)})
+        # La línea 19 es una redirección: su ISBN no está en el dump
+        importados = self.importar(rutas, isbns=[carga.isbn_sintetico(5), carga.isbn_sintetico(19)])
+        self.assertEqual(importados, 2)
+
+        self.assertNotEqual(existente.name, 'Sin datos')
+        self.assertEqual(existente.openlibrary_key, '/works/OL3W')
+        self.assertTrue(existente.editorial)
+        self.assertTrue(existente.categoria)
+        self.assertTrue(existente.description)
+        self.assertTrue(existente.autor.name)
+
+        nuevo = self.env['biblioteca.libro'].search([('isbn', '=', carga.isbn_sintetico(5))])
+        self.assertEqual(nuevo.openlibrary_key, '/works/OL5W')
+        self.assertFalse(self.env['biblioteca.libro'].search([('isbn', '=', carga.isbn_sintetico(19))]))
+
+
+@tagged('post_install', '-at_install', '-standard', 'biblioteca_benchmark')
+class TestOpenLibraryDumpBenchmark(DumpCase):
+    """Importación desde un dump sintético de BIBLIOTECA_DUMP_EDICIONES ediciones (3.000.000).
+
+    Con works y autores son unos 4 millones de líneas; se importan
+    BIBLIOTECA_DUMP_LIBROS libros (10.000) repartidos por todo el dump.
+    """
+
+    def test_dump_sintetico(self):
+        ediciones = int(os.environ.get('BIBLIOTECA_DUMP_EDICIONES', 3000000))
+        libros = int(os.environ.get('BIBLIOTECA_DUMP_LIBROS', 10000))
+        inicio = time.perf_counter()
+        rutas = self.escribir_dumps(ediciones)
+        _logger.info("Dump sintético escrito en %.1fs", time.perf_counter() - inicio)
+
+        paso = max(ediciones // libros, 1)
+        isbns = [carga.isbn_sintetico(n) for n in range(0, ediciones, paso) if n % 20 != 19][:libros]
+        lineas = ediciones + max(ediciones // 4, 1) + max(ediciones // 10, 1)
+        memoria_antes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        inicio = time.perf_counter()
+        importados = self.importar(rutas, isbns=isbns)
+        duracion = time.perf_counter() - inicio
+        memoria = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - memoria_antes) / 1024
+        _logger.info("Dump: %s líneas, %s libros en %.1fs (%.0f líneas/s), memoria máxima +%.0f MB",
+                     lineas, importados, duracion, lineas / duracion, memoria)
+
+        self.assertEqual(importados, len(isbns))
+        # Los archivos se recorren sin cargarlos: la memoria depende de los libros, no del dump
+        self.assertLess(memoria, 512)
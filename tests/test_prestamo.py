@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+from odoo.exceptions import UserError, ValidationError
+from odoo.tests import tagged
+
+from .common import BibliotecaCase
+
+
+@tagged('post_install', '-at_install')
+class TestPrestamo(BibliotecaCase):
+
+    def test_vencido_devuelto_una_sola_multa(self):
+        """El barrido crea la multa de retraso y la devolución no crea otra."""
+        self.sin_commit()
+        prestamo = self.prestar(self.libro, dias_atras=20)
+
+        self.env['biblioteca.prestamo'].verificar_vencidos()
+        self.assertEqual(prestamo.estado, 'multa')
+        self.assertEqual(len(prestamo.multa_ids), 1)
+
+        prestamo.action_devolver()
+        multas = prestamo.multa_ids.filtered(lambda m: m.tipo == 'retraso')
+        self.assertEqual(len(multas), 1)
+        dias = (prestamo.fecha_devolucion - prestamo.fecha_max_devolucion).days
+        self.assertEqual(prestamo.multa_total, 5.0 * max(dias, 1))
+        self.assertEqual(self.usuario.total_multas, prestamo.multa_total)
+
+    def test_devolucion_con_retraso_sin_barrido(self):
+        prestamo = self.prestar(self.libro, dias_atras=20)
+        prestamo.action_devolver()
+        self.assertEqual(prestamo.estado, 'multa')
+        self.assertEqual(len(prestamo.multa_ids), 1)
+
+    def test_devolucion_a_tiempo(self):
+        prestamo = self.prestar(self.libro)
+        prestamo.action_devolver()
+        self.assertEqual(prestamo.estado, 'devuelto')
+        self.assertFalse(prestamo.multa_ids)
+
+    def test_devolucion_parcial_en_lote(self):
+        """Un préstamo de dos libros no se cierra hasta recibir los dos."""
+        prestamo = self.prestar(self.libro | self.libro_2)
+        Prestamo = self.env['biblioteca.prestamo']
+        cedula = self.usuario.cedula
+
+        resultado, = Prestamo.devolver_en_lote([{'cedula': cedula, 'isbns': [self.libro.isbn]}])
+        self.assertTrue(resultado['ok'])
+        self.assertEqual(resultado['estado'], 'parcial')
+        self.assertEqual(resultado['pendientes'], [self.libro_2.isbn])
+        self.assertEqual(prestamo.estado, 'prestado')
+        self.assertFalse(prestamo.fecha_devolucion)
+        # El libro recibido ya está disponible; el que falta sigue prestado
+        self.assertEqual(self.libro.ejemplares_disponibles, 2)
+        self.assertEqual(self.libro_2.ejemplares_disponibles, 0)
+
+        # Volver a pasar el mismo libro no encuentra otro préstamo
+        resultado, = Prestamo.devolver_en_lote([{'cedula': cedula, 'isbns': [self.libro.isbn]}])
+        self.assertFalse(resultado['ok'])
+
+        resultado, = Prestamo.devolver_en_lote([{'cedula': cedula, 'isbns': [self.libro_2.isbn]}])
+        self.assertEqual(resultado['estado'], 'devuelto')
+        self.assertTrue(prestamo.fecha_devolucion)
+        self.assertEqual(self.libro_2.ejemplares_disponibles, 1)
+
+    def test_multas_pagadas_no_bloquean(self):
+        """Solo las multas por pagar cuentan para el límite de la política."""
+        self.sin_commit()
+        prestamo = self.prestar(self.libro, dias_atras=20)
+        self.env['biblioteca.prestamo'].verificar_vencidos()
+        # Mientras el préstamo siga abierto la multa de retraso sigue creciendo
+        with self.assertRaises(UserError):
+            prestamo.multa_ids.action_pagar()
+
+        prestamo.action_devolver()
+        self.assertGreater(self.usuario.total_multas, 20)
+        with self.assertRaises(ValidationError):
+            self.prestar(self.libro_2)
+
+        prestamo.multa_ids.action_pagar()
+        self.assertTrue(all(prestamo.multa_ids.mapped('pagada')))
+        self.assertEqual(self.usuario.total_multas, 0)
+        self.assertEqual(self.prestar(self.libro_2).estado, 'prestado')
+
+    def test_recalcular_contadores_en_lote(self):
+        """Recalcular no hace más consultas con más libros."""
+        self.prestar(self.libro)
+        libros = self.env['biblioteca.libro'].create([
+            {'name': 'Libro %s' % n, 'ejemplares': 2} for n in range(20)
+        ])
+        todos = self.libro | self.libro_2 | libros
+        self.env.flush_all()
+        self.env.cr.execute("UPDATE biblioteca_libro SET ejemplares_disponibles = 99 WHERE id IN %s",
+                            [tuple(todos.ids)])
+
+        consultas = []
+        for recordset in (self.libro | self.libro_2, todos):
+            self.env.invalidate_all()
+            antes = self.env.cr.sql_log_count
+            recordset.recalcular_contadores()
+            consultas.append(self.env.cr.sql_log_count - antes)
+        self.assertEqual(consultas[0], consultas[1])
+
+        self.env.invalidate_all()
+        self.assertEqual(self.libro.ejemplares_disponibles, 1)
+        self.assertEqual(self.libro.ejemplares_prestados, 1)
+        self.assertEqual(set(libros.mapped('ejemplares_disponibles')), {2})
+
+    def test_politica_ve_vencidos_sin_recalcular(self):
+        """Un préstamo que vence sin que nada lo toque bloquea igual."""
+        prestamo = self.prestar(self.libro)
+        self.env.flush_all()
+        # Vence con el paso del tiempo: ningún write dispara el recálculo
+        self.env.cr.execute(
+            "UPDATE biblioteca_prestamo SET fecha_max_devolucion = now() - interval '1 day' WHERE id = %s",
+            [prestamo.id])
+        self.env.invalidate_all()
+        self.assertEqual(self.usuario.prestamos_vencidos, 0)
+
+        violaciones = self.usuario.verificar_politica_prestamo()
+        self.assertIn('vencidos', violaciones[self.usuario.id][0])
+        with self.assertRaises(ValidationError):
+            self.prestar(self.libro_2)
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+import email
+import email.policy
+import socketserver
+import threading
+
+from .common import CEDULAS, BibliotecaCase
+
+
+class ManejadorSMTP(socketserver.StreamRequestHandler):
+    """Lo justo del protocolo SMTP para que smtplib entregue mensajes."""
+
+    def responder(self, linea):
+        self.wfile.write(linea.encode() + b'\r\n')
+
+    def handle(self):
+        remitente, destinatarios = None, []
+        self.responder('220 localhost SMTP de prueba')
+        for linea in self.rfile:
+            comando = linea.decode('ascii', 'replace').strip()
+            verbo = comando[:4].upper()
+            if verbo in ('EHLO', 'HELO'):
+                self.responder('250 localhost')
+            elif verbo == 'MAIL':
+                remitente, destinatarios = comando.split(':', 1)[1].strip(' <>'), []
+                self.responder('250 OK')
+            elif verbo == 'RCPT':
+                destinatario = comando.split(':', 1)[1].strip(' <>')
+                if destinatario in self.server.rechazados:
+                    self.responder('550 Buzón inexistente')
+                else:
+                    destinatarios.append(destinatario)
+                    self.responder('250 OK')
+            elif verbo == 'DATA':
+                self.responder('354 Fin con <CRLF>.<CRLF>')
+                datos = []
+                for linea_datos in self.rfile:
+                    if linea_datos.rstrip(b'\r\n') == b'.':
+                        break
+                    # Quitar el punto duplicado por el cliente (dot-stuffing)
+                    datos.append(linea_datos[1:] if linea_datos.startswith(b'..') else linea_datos)
+                mensaje = email.message_from_bytes(b''.join(datos), policy=email.policy.default)
+                self.server.recibidos.append((remitente, destinatarios, mensaje))
+                self.responder('250 OK')
+            elif verbo == 'QUIT':
+                self.responder('221 Adiós')
+                return
+            else:
+                # RSET, NOOP
+                self.responder('250 OK')
+
+
+@tagged('post_install', '-at_install')
+class TestRecordatorio(BibliotecaCase):
+
+    def setUp(self):
+        super().setUp()
+        self.servidor = socketserver.ThreadingTCPServer(('127.0.0.1', 0), ManejadorSMTP)
+        self.servidor.daemon_threads = True
+        self.servidor.recibidos = []
+        self.servidor.rechazados = set()
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+
+        self.mail_server = self.env['ir.mail_server'].create({
+            'name': 'SMTP de prueba',
+            'smtp_host': '127.0.0.1',
+            'smtp_port': self.servidor.server_address[1],
+            'smtp_encryption': 'none',
+        })
+        Parametros = self.env['ir.config_parameter'].sudo()
+        Parametros.set_param('biblioteca.recordatorio.por_minuto', 6000)
+        Parametros.set_param('biblioteca.recordatorio.remitente', 'biblioteca@example.com')
+        # En modo de prueba Odoo no abre conexiones SMTP
+        self.patch(type(self.env['ir.mail_server']), '_is_test_mode', lambda self: False)
+        self.sin_commit()
+
+        self.otro = self.env['biblioteca.usuarios'].create({
+            'nombre_completo': 'Otro lector',
+            'cedula': CEDULAS[2],
+            'correo': 'otro@example.com',
+        })
+        sin_correo = self.env['biblioteca.usuarios'].create({
+            'nombre_completo': 'Lector sin correo',
+            'cedula': CEDULAS[3],
+        })
+        # Vencido ayer, vence en dos días y vencido sin correo
+        self.prestar(self.libro, dias_atras=16)
+        self.prestar(self.libro_2, usuario=self.otro, dias_atras=13)
+        self.prestar(self.libro, usuario=sin_correo, dias_atras=16)
+
+    def enviar(self):
+        Recordatorio = self.env['biblioteca.recordatorio']
+        self.assertEqual(Recordatorio.encolar(), 2)
+        Recordatorio.enviar_pendientes(mail_server_id=self.mail_server.id)
+        return Recordatorio.search([])
+
+    def test_envia_por_smtp(self):
+        recordatorios = self.enviar()
+        self.assertEqual(set(recordatorios.mapped('estado')), {'enviado'})
+
+        recibidos = {destinatarios[0]: mensaje for _remitente, destinatarios, mensaje in self.servidor.recibidos}
+        self.assertEqual(set(recibidos), {'usuario@example.com', 'otro@example.com'})
+        self.assertIn('biblioteca@example.com', recibidos['usuario@example.com']['From'])
+        self.assertEqual(recibidos['usuario@example.com']['Subject'], 'Recordatorio de devolución de libros')
+        self.assertIn('vencido desde', recibidos['usuario@example.com'].get_body().get_content())
+        self.assertIn('vence el', recibidos['otro@example.com'].get_body().get_content())
+
+        # El mismo día no se vuelve a encolar
+        self.assertEqual(self.env['biblioteca.recordatorio'].encolar(), 0)
+
+    def test_destinatario_rechazado(self):
+        self.servidor.rechazados.add('otro@example.com')
+        recordatorios = self.enviar()
+        rechazado = recordatorios.filtered(lambda r: r.correo == 'otro@example.com')
+        self.assertEqual(rechazado.estado, 'error')
+        self.assertEqual(rechazado.intentos, 3)
+        self.assertTrue(rechazado.error)
+        self.assertEqual((recordatorios - rechazado).estado, 'enviado')
+        self.assertEqual([destinatarios for _remitente, destinatarios, _mensaje in self.servidor.recibidos],
+                         [['usuario@example.com']])
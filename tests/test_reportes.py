@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from ..models.reportes import FACTOR_LIBRO
+from .common import BibliotecaCase, CEDULAS
+
+
+@tagged('post_install', '-at_install')
+class TestReportes(BibliotecaCase):
+
+    def test_ids_estables(self):
+        prestamo = self.prestar(self.libro | self.libro_2)
+        self.env.flush_all()
+        filas = self.env['biblioteca.reporte.prestamo'].search([('libro_id', 'in', (self.libro | self.libro_2).ids)])
+        self.assertEqual(
+            sorted(filas.ids),
+            sorted(prestamo.id * FACTOR_LIBRO + libro.id for libro in self.libro | self.libro_2),
+        )
+
+    def test_resumen_mensual(self):
+        Mensual = self.env['biblioteca.reporte.mensual']
+        self.prestar(self.libro)
+        self.env.flush_all()
+        Mensual._cron_refrescar()
+        fila = Mensual.search([('libro_id', '=', self.libro.id)])
+        self.assertEqual(fila.prestamos, 1)
+        id_anterior = fila.id
+
+        # Otro préstamo del mismo libro, mes y personal: misma fila, mismo id
+        self.prestar(self.libro, usuario=self.env['biblioteca.usuarios'].create({
+            'nombre_completo': 'Otro lector',
+            'cedula': CEDULAS[2],
+        }))
+        self.env.flush_all()
+        Mensual._cron_refrescar()
+        fila = Mensual.search([('libro_id', '=', self.libro.id)])
+        self.assertEqual(fila.id, id_anterior)
+        self.assertEqual((fila.prestamos, fila.usuarios), (2, 2))
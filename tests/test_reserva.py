@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+from odoo.tests import tagged
+
+from .common import BibliotecaCase, CEDULAS
+
+
+@tagged('post_install', '-at_install')
+class TestReserva(BibliotecaCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.lector = cls.env['biblioteca.usuarios'].create({
+            'nombre_completo': 'Lector en espera',
+            'cedula': CEDULAS[2],
+        })
+
+    def reservar(self, libro):
+        return self.env['biblioteca.reserva'].create({'libro_id': libro.id, 'usuario_id': self.lector.id})
+
+    def test_mas_ejemplares_asigna_reserva(self):
+        self.prestar(self.libro_2)
+        reserva = self.reservar(self.libro_2)
+        self.assertEqual(reserva.estado, 'espera')
+
+        self.libro_2.ejemplares = 2
+        self.assertEqual(reserva.estado, 'asignada')
+        self.assertEqual(self.libro_2.ejemplares_disponibles, 0)
+
+    def test_generar_ejemplares_asigna_solo_los_libres(self):
+        self.prestar(self.libro_2)
+        reserva = self.reservar(self.libro_2)
+
+        # El único ejemplar nuevo se lo queda el préstamo abierto
+        self.libro_2.action_generar_ejemplares()
+        self.assertEqual(self.libro_2.ejemplar_ids.mapped('estado'), ['prestado'])
+        self.assertEqual(reserva.estado, 'espera')
+
+        self.env['biblioteca.ejemplar'].create({'libro_id': self.libro_2.id})
+        self.assertEqual(reserva.estado, 'asignada')
+
+    def test_ejemplar_recuperado_asigna_reserva(self):
+        self.libro_2.action_generar_ejemplares()
+        ejemplar = self.libro_2.ejemplar_ids
+        ejemplar.estado = 'perdido'
+        reserva = self.reservar(self.libro_2)
+        self.assertEqual(reserva.estado, 'espera')
+
+        ejemplar.estado = 'disponible'
+        self.assertEqual(reserva.estado, 'asignada')
+
+    def test_kiosco_entrega_la_reserva_asignada(self):
+        prestamo = self.prestar(self.libro_2)
+        reserva = self.reservar(self.libro_2)
+        prestamo.action_devolver()
+        self.assertEqual(reserva.estado, 'asignada')
+        self.assertEqual(self.libro_2.ejemplares_disponibles, 0)
+
+        # El ejemplar apartado es solo para el lector que lo reservó
+        resultados = self.env['biblioteca.prestamo'].prestar_en_lote([
+            {'cedula': self.usuario.cedula, 'isbns': [self.libro_2.isbn]},
+            {'cedula': self.lector.cedula, 'isbns': [self.libro_2.isbn]},
+        ], self.personal.id)
+        self.assertEqual([resultado['ok'] for resultado in resultados], [False, True])
+        self.assertEqual(reserva.estado, 'cumplida')
+        self.assertEqual(self.libro_2.ejemplares_prestados, 1)